@@ -0,0 +1,181 @@
+import os
+import sys
+import multiprocessing
+import sdf_cache
+import sdf_output
+import gen_sdf_from_verilog
+import gen_sdf_from_vhdl
+
+generators = {'verilog' : gen_sdf_from_verilog, 'vhdl' : gen_sdf_from_vhdl}
+languages = {'v' : 'verilog', 'verilog' : 'verilog', 'vhd' : 'vhdl', 'vhdl' : 'vhdl'}
+
+def help ():
+    print("""
+Usage:
+------
+
+Process many project directories in one invocation. All the files of all the projects are
+parsed by one shared pool of worker processes, and one sdf.csv file is written per project.
+
+   Example:
+   python gen_sdf_batch.py <manifest_file_path> [--jobs N] [--cache-dir DIR] [--cache-size MB] [--no-cache] [--write-buffer KB] [--sqlite PATH]
+
+   - <manifest_file_path>: Path to the manifest file listing the projects.
+   - --jobs N, -j N : Number of worker processes shared by all the projects (default: one per CPU).
+   - --cache-dir DIR, --cache-size MB, --no-cache : Parse cache options, as in gen_sdf_from_verilog.py.
+   - --write-buffer KB : Size of the write buffer of the sdf.csv files, as in gen_sdf_from_verilog.py.
+   - --sqlite PATH : Also write the rows of every project (Verilog and VHDL) to one SQLite database,
+     as in gen_sdf_from_verilog.py.
+
+Manifest File:
+--------------
+One project per line, with fields separated by ';' (empty lines and lines starting with '#' are ignored):
+
+  language ; input_directory ; output_file ; excluded_directories ; excluded_files ; define_list
+
+  - language: verilog (or v) for .v files, vhdl (or vhd) for .vhd files.
+  - input_directory: Directory of the project.
+  - output_file: Optional. Path to the output sdf.csv file, the default is '<input_directory>/sdf.csv'.
+  - excluded_directories, excluded_files, define_list: Optional. Comma separated lists, as in the
+    configuration files (define_list is only used for Verilog projects).
+
+  Example:
+  verilog ; /data/uart/rtl ; /data/uart/sdf.csv ; sim,tb ; ; XILINX_FPGA
+  vhdl ; /data/i2c/rtl/vhdl
+
+Notes:
+------
+- Files are scheduled by decreasing size so that the large files do not delay the end of the run.
+- Each sdf.csv file is identical to the one written by the single project scripts.
+""")
+
+# Split a comma separated manifest field into a list
+def split_field(field) :
+    return [value.strip() for value in field.split(',') if value.strip()]
+
+# Return the projects of the manifest file : [[language,input_directory,output_file,excluded_directories,excluded_files,define_list],...]
+def extract_manifest(manifest_file) :
+    projects = []
+    with open(manifest_file, "r") as f:
+        for line_number, line in enumerate(f, 1) :
+            line = line.strip()
+            if not line or line.startswith('#') :
+                continue
+            fields = [field.strip().strip('"') for field in line.split(';')]
+            fields = fields + ['']*(6-len(fields))
+            language, input_directory, output_file, excluded_directories, excluded_files, define_list = fields[:6]
+            if language.lower() not in languages :
+                print(f"Error: Unknown language '{language}' on line {line_number} of {manifest_file}, the project is skipped.")
+                continue
+            if not input_directory :
+                print(f"Error: No input directory on line {line_number} of {manifest_file}, the project is skipped.")
+                continue
+            if not output_file :
+                output_file = os.path.join(input_directory, "sdf.csv")
+            projects.append([languages[language.lower()], input_directory, output_file, split_field(excluded_directories), split_field(excluded_files), split_field(define_list)])
+    return projects
+
+# Parse a file of a project in a worker : return [project_index,file_index,parse_result] (see parse_file_task of the generators)
+def batch_parse_task(task) :
+    project_index, file_index, language, file_path, define_list, cache_directory = task
+    if language == 'verilog' :
+        return [project_index, file_index, gen_sdf_from_verilog.parse_file_task((file_path, define_list, cache_directory))]
+    return [project_index, file_index, gen_sdf_from_vhdl.parse_file_task((file_path, cache_directory))]
+
+# Resolve the connectivity of a parsed project and write its sdf.csv file, and its rows to the SQLite database if database_path is given
+# prefilter_counts are the [files scanned,files skipped] of the project by the pre-filter of its generator (see prefilter_file)
+def write_project(project, file_list, parse_results, cache_directory=None, database_path=None, prefilter_counts=(0, 0)) :
+    language, input_directory, output_file, excluded_directories, excluded_files, define_list = project
+    generator = generators[language]
+    generator.prefilter_counts[:] = prefilter_counts
+    generator.warnings_set.clear() # Warnings are logged once per project, as in a single project run
+    print(f"Project : {input_directory} -> {output_file}")
+    record_sinks = generator.open_record_sinks(os.path.abspath(input_directory), None, database_path)
+    if language == 'verilog' :
+        generator.write_parsed_files(file_list, parse_results, output_file, record_sinks)
+    else :
+        generator.write_parsed_files(file_list, parse_results, output_file, input_directory, cache_directory, record_sinks)
+    generator.print_summary(output_file)
+
+# Parse all the files of all the projects with one pool of jobs processes, each project is written as soon as all its files are parsed
+def process_projects(projects, jobs=1, cache_directory=None, cache_size=sdf_cache.default_cache_size, database_path=None) :
+    file_lists = []
+    tasks = []
+    skipped_files = [] # [project_index,file_index] of the files skipped by the pre-filter
+    prefilter_counts = []
+    for project_index, (language, input_directory, output_file, excluded_directories, excluded_files, define_list) in enumerate(projects) :
+        if not os.path.exists(input_directory) :
+            print(f"The specified directory {input_directory} does not exist.\n")
+            file_lists.append([])
+            prefilter_counts.append([0, 0])
+            continue
+        file_list = generators[language].find_files(input_directory, excluded_directories, excluded_files)
+        file_lists.append(file_list)
+        prefilter_counts.append([len(file_list), 0])
+        for file_index, (file_name, file_path) in enumerate(file_list) :
+            if not generators[language].prefilter_file(file_path) :
+                skipped_files.append([project_index, file_index])
+                prefilter_counts[project_index][1] += 1
+                continue
+            try :
+                file_size = os.path.getsize(file_path)
+            except OSError :
+                file_size = 0
+            tasks.append([file_size, project_index, file_index, language, file_path, define_list])
+    # Largest files first, so that the pool stays busy until the end of the run
+    tasks.sort(key=lambda task: -task[0])
+    tasks = [(project_index, file_index, language, file_path, define_list, cache_directory) for file_size, project_index, file_index, language, file_path, define_list in tasks]
+
+    parse_results = [[None]*len(file_list) for file_list in file_lists]
+    remaining_files = [len(file_list) for file_list in file_lists]
+    for project_index, file_index in skipped_files :
+        parse_results[project_index][file_index] = generators[projects[project_index][0]].skipped_parse_result()
+        remaining_files[project_index] -= 1
+    for project_index in range(len(projects)) : # Projects without file, or whose files are all skipped
+        if remaining_files[project_index] == 0 and os.path.exists(projects[project_index][1]) :
+            write_project(projects[project_index], file_lists[project_index], parse_results[project_index], cache_directory, database_path, prefilter_counts[project_index])
+            parse_results[project_index] = None
+    pool = multiprocessing.Pool(min(jobs, len(tasks))) if jobs > 1 and len(tasks) > 1 else None
+    try :
+        results = pool.imap_unordered(batch_parse_task, tasks) if pool else map(batch_parse_task, tasks)
+        for project_index, file_index, parse_result in results :
+            parse_results[project_index][file_index] = parse_result
+            remaining_files[project_index] -= 1
+            if remaining_files[project_index] == 0 :
+                write_project(projects[project_index], file_lists[project_index], parse_results[project_index], cache_directory, database_path, prefilter_counts[project_index])
+                parse_results[project_index] = None # Release the parsed form of the written project
+    finally :
+        if pool :
+            pool.terminate()
+    if cache_directory :
+        sdf_cache.evict(cache_directory, cache_size)
+
+# Main program
+def main():
+    arguments, options = gen_sdf_from_verilog.extract_options(sys.argv)
+    if len(arguments) < 2 or arguments[1] == "-help" :
+        help()
+        return 0
+    if "-j" not in sys.argv and "--jobs" not in sys.argv :
+        options['jobs'] = os.cpu_count() or 1
+    if options['stream'] :
+        print("--stream is not supported in batch mode, it is ignored")
+    if options['incremental'] or options['watch'] :
+        print("--incremental and --watch are not supported in batch mode, they are ignored")
+    for option in ('columnar', 'hierarchy') :
+        if options[option] :
+            print(f"--{option} is not supported in batch mode, it is ignored")
+    if options['profile'] :
+        print("--profile is not supported in batch mode, it is ignored")
+    projects = extract_manifest(arguments[1])
+    print(f"Manifest : {arguments[1]} ({len(projects)} projects)")
+    print(f"Jobs : {options['jobs']}")
+    print(f"Parse cache : {options['cache_directory'] or 'disabled'}")
+    print(f"SQLite output : {options['sqlite'] or 'disabled'}")
+    sdf_output.buffer_size = options['write_buffer']
+    process_projects(projects, options['jobs'], options['cache_directory'], options['cache_size'], options['sqlite'])
+
+
+
+if __name__ == "__main__":
+    main()
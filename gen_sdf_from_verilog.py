@@ -1,17 +1,39 @@
 import re
-import csv
 import os
 import sys
+import multiprocessing
+import sdf_cache
+import sdf_incremental
+import sdf_records
+import sdf_columnar
+import sdf_sqlite
+import sdf_output
+import sdf_profile
+import sdf_hierarchy
+import sdf_width
+import sdf_parameters
 
 DEBUG = True
 warnings_set = set() # Store warnings that have already been logged
 
 default_config_file = r".\config_verilog.txt"
+parser_version = "verilog-7" # Change it when the parsed form of parse_code changes, to invalidate the parse cache
+# Stages timed by --profile (see sdf_profile) : [function_name,position of the file argument (None : file of the calling stage)]
+profile_stages = [['find_files',None], ['prefilter_file',0], ['parse_file',0], ['sdf_cache.read_source',None], ['sdf_cache.load',None], ['sdf_cache.store',None],
+    ['parse_code',None], ['remove_comments',None], ['manage_define',None], ['find_modules',None], ['parse_module',None], ['register_module',None],
+    ['extract_submodule_list',None], ['extract_signal_records',0], ['write_file_block',1], ['sdf_cache.evict',None]]
+
+captured_warnings = None # Warnings of the current worker task, logged later by the main process (see parse_file_task)
+design_unit_keywords = [b'module'] # A file without any of them has no module, it is not parsed (see prefilter_file)
+prefilter_counts = [0, 0] # [files scanned,files skipped] by prefilter_file
+hierarchy_graph = None # Hierarchy graph of the run (--hierarchy PATH), the modules are added to it when their instances are resolved (see sdf_hierarchy)
 
 # Log warnings without logging the same message more than once
 def log_warning(message):
     global warnings_set
-    if message not in warnings_set:
+    if captured_warnings is not None:
+        captured_warnings.append(message)
+    elif message not in warnings_set:
         print(f"WARNING : {message}")
         warnings_set.add(message)   
 
@@ -84,6 +106,57 @@ There are two main usage scenarios:
 
    - <config_file_path>: Path to the configuration file (e.g., "/path/to/config.txt").
 
+Options:
+--------
+Options can be added to both usages.
+
+   --jobs N, -j N : Parse the files with N worker processes (0 uses one process per CPU).
+                    The default is 1. The sdf.csv file is identical to the one of a serial run.
+   --cache-dir DIR : Directory of the parse cache (default: ~/.cache/sdf_generator). The parsed
+                     form of each file is stored there, keyed by the file content, the parser
+                     version and define_list, so unchanged files are not parsed again.
+   --cache-size MB : Size limit of the parse cache, least recently used entries are removed
+                     above it (default: 512).
+   --no-cache      : Disable the parse cache.
+   --profile       : Report the wall time and the number of calls of each stage (preprocessing, parsing,
+                     resolution, csv writing, ...), the slowest files and the match counts of the regular
+                     expressions, and write them to <output>.profile.json. The files are parsed in the main
+                     process (--jobs is ignored). Without --profile nothing is instrumented.
+   --profile-top N : Number of files of the slowest files table (default: 10).
+   --profile-file NAME : Also record the calls made for the file NAME with cProfile, the statistics are
+                     written to <output>.NAME.prof (python -m pstats <output>.NAME.prof). Implies --profile.
+   --write-buffer KB : Size of the write buffer of the output file (default: 1024). The output is
+                     written to a temporary file which replaces sdf.csv at the end of the run, so an
+                     interrupted run never leaves a half-written sdf.csv.
+   --stream        : Streaming mode for very large files (e.g. gate-level netlists). Files are read
+                     line by line twice and the rows of each module are written before the next
+                     module is read, so the memory used is bounded by the largest module.
+                     --jobs and the parse cache are not used in this mode.
+   --incremental   : Only parse the files changed since the previous run (and the files instantiating
+                     a module whose ports changed), the rows of the other files are copied from the
+                     previous sdf.csv file. A manifest is kept next to the output (sdf.csv.manifest),
+                     the first run (or a run with another define_list) parses every file.
+   --watch         : Keep running and regenerate sdf.csv incrementally each time .v files are added,
+                     changed or removed (the files are polled every second, a burst of saves is
+                     processed once). The parsed files stay in memory, only the changed files are
+                     parsed again. The output file is replaced atomically. Stop it with Ctrl+C.
+   --columnar PATH : Also write the signals to a columnar file, with a file_name column instead of the
+                     file_name(...) rows and list columns for the src/dst names. The format is chosen
+                     by the extension: .parquet or .arrow/.feather (Arrow IPC, can be memory mapped),
+                     which require pyarrow, or .npz (NumPy arrays of codes and string tables), which
+                     requires numpy. Not available with --stream, --incremental and --watch.
+   --sqlite PATH   : Also write the signals to a SQLite database (tables files, modules, signals and
+                     endpoints, view signal_rows). The .v rows of the project (input directory) are
+                     replaced, the other projects and languages are kept, so the Verilog and VHDL generators and
+                     the batch mode can fill one shared database. Not available with --stream,
+                     --incremental and --watch.
+   --hierarchy PATH : Also write the design hierarchy graph (modules, instances and the nets bound to
+                     their ports, in integer arrays) to PATH. It is analysed without re-parsing with
+                     python sdf_hierarchy.py PATH [--top] [--unused [TOP]] [--undefined] [--fanout N]
+                     [--instances MODULE]. The ports bound by an instance are sized with its #(...)
+                     overrides.
+                     Not available with --stream, --incremental and --watch.
+
 Configuration File:
 -------------------
 The configuration file must be written in the following format to ensure proper functionality:
@@ -103,16 +176,52 @@ This format allows the user to define:
 Notes:
 ------
 - To modify the default configuration file, update the `default_config_file` variable in the script.
+- The size column is evaluated with the default values of the parameter and localparam declarations of each module
+  (e.g. [WIDTH-1:0] is 8 when WIDTH is 8), a size which still depends on other names stays symbolic.
 - Ensure that the configuration file is formatted correctly to avoid processing errors.
 """)
     
 
 # Remove comments from Verilog code to avoid disrupting regex functionality
 def remove_comments(verilog_code):                                                            
-    verilog_code = re.sub(r'//.*', '', verilog_code)                                                
-    verilog_code = re.sub(r'/\*.*?\*/', '', verilog_code, flags=re.DOTALL)                           
-    verilog_code = re.sub(r'function\s.*?endfunction', '', verilog_code, flags=re.DOTALL) 
-    return verilog_code
+    return '\n'.join(remove_comments_lines(verilog_code.split('\n')))
+
+# Remove comments and functions from Verilog code lines (a line iterator), yield the resulting lines
+# The line breaks inside block comments and functions are removed, as the code around them is joined
+def remove_comments_lines(lines) :
+    comment_pattern = r'//|/\*|\*/|\bfunction(?=\s|$)|\bendfunction\b'
+    in_comment = False
+    in_function = False
+    code_parts = []
+    for line in lines :
+        position = 0
+        for match in re.finditer(comment_pattern, line) :
+            token = match.group()
+            if in_comment :
+                if token == '*/' :
+                    in_comment = False
+                    position = match.end()
+                continue
+            if not in_function :
+                code_parts.append(line[position:match.start()])
+            position = match.end()
+            if token == '//' :
+                position = len(line)
+                break
+            elif token == '/*' :
+                in_comment = True
+            elif token == 'function' :
+                in_function = True
+            elif token == 'endfunction' :
+                in_function = False
+            elif not in_function : # */ outside of a comment is kept
+                code_parts.append(token)
+        if not (in_comment or in_function) :
+            code_parts.append(line[position:])
+            yield ''.join(code_parts)
+            code_parts = []
+    if code_parts :
+        yield ''.join(code_parts)
     
 # Extract the module name from Verilog code
 def find_module_name(verilog_code):
@@ -128,58 +237,68 @@ def find_modules(verilog_code):
         return [(match[1].lower(), match[0]) for match in matches]
     return 0
 
-# Return the size of the signal in bits based on its type 
-def size_of_signal(signal_type):
-    size_pattern = r'\[\s*(\d+)\s*(?:-\s*(\d+))?\s*:\s*(\d+)\s*\]'
-    size_pattern_generic = r'\[\s*((?:\w+)|(?:\(.*?\))|(?:[\d\w]+\s*[\*\/]\s*[\d\w]+)|(?:[\w]+\s*[\+\-]\s*[\w]+))\s*([\-\+]\s*\d+)?\s*([\-\+]\s*\d+)?\s*:\s*(\d+)\s*\]'
-    integer_pattern = r'integer(.*?)'
-    if (match:=re.search(integer_pattern,signal_type,re.DOTALL | re.IGNORECASE)):
-        signal_size = '32'
-    elif (match:=re.search(size_pattern,signal_type,re.DOTALL | re.IGNORECASE)):
-        signal_size = str(int(match.group(1))-(int(match.group(2)) if match.group(2) is not None else 0)-int(match.group(3))+1)
-    elif (match:=re.search(size_pattern_generic,signal_type,re.DOTALL | re.IGNORECASE)) :
-        if((int(match.group(2).replace(" ","")) if match.group(2) is not None else 0)+(int(match.group(3).replace(" ","")) if match.group(3) is not None else 0)+1-int(match.group(4))) == 0 :
-            signal_size = match.group(1)
-        elif ((int(match.group(2).replace(" ","")) if match.group(2) is not None else 0)+(int(match.group(3).replace(" ","")) if match.group(3) is not None else 0)+1-int(match.group(4))) < 0 :
-            signal_size = match.group(1)+str(1+(int(match.group(2).replace(" ","")) if match.group(2) is not None else 0)+(int(match.group(3).replace(" ","")) if match.group(3) is not None else 0)-int(match.group(4)))
-        elif ((int(match.group(2).replace(" ","")) if match.group(2) is not None else 0)+(int(match.group(3).replace(" ","")) if match.group(3) is not None else 0)+1-int(match.group(4))) > 0 :
-            signal_size = match.group(1)+"+"+str(1+(int(match.group(2).replace(" ","")) if match.group(2) is not None else 0)+(int(match.group(3).replace(" ","")) if match.group(3) is not None else 0)-int(match.group(4)))
-    elif ((signal_type.strip().lower()=='wire')|(signal_type.strip().lower()=='reg')) :
-        signal_size = '1'
-    else :
-        signal_size = 'unknown'
-        if(DEBUG == True) :
-            # When debug mode is enabled
-            log_warning(f'size of {signal_type} is unknown')  
+# Return the size of the signal in bits based on its type, the parameters of constants are replaced by their value (see sdf_width.signal_width)
+def size_of_signal(signal_type, constants=None):
+    signal_size = sdf_width.signal_width(signal_type,constants)
+    if signal_size == 'unknown' and DEBUG :
+        log_warning(f'size of {signal_type} is unknown')
     return signal_size
 
-# Manage ifdef, ifndef with define_list : return the code without undefined code section
+# Manage `ifdef, `ifndef, `elsif, `else, `endif (nested) and `define, `undef in a single pass over the lines : return the code without undefined code section
 def manage_define(verilog_code,define_list) :
-    pattern_clean = r"^`(?!ifdef|ifndef|else|include)\w.*"
-    verilog_code = re.sub(pattern_clean, "", verilog_code, flags=re.MULTILINE|re.IGNORECASE) # Deleate lines with '`' wich is not followed by ifdef,ifned,else and endif
-    ifdef_pattern = r'`ifdef\s*(\w+)\s*([^`]*)(?:`else([^`]*))?`endif'
-    ifndef_pattern = r'`ifndef\s*(\w+)\s*([^`]*)(?:`else([^`]*))?`endif'
-    while((re.search(ifdef_pattern,verilog_code,re.IGNORECASE|re.DOTALL)!=None)|(re.search
-                                                                                 (ifndef_pattern,verilog_code,re.IGNORECASE|re.DOTALL)!=None)):
-        match_1 = re.search(ifdef_pattern,verilog_code,re.IGNORECASE|re.DOTALL)         
-        if match_1 :
-            if any(match_1.group(1) in define_element for define_element in define_list):
-                verilog_code = re.sub(ifdef_pattern,match_1.group(2),verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-            else : 
-                if (match_1.group(3)==None) :
-                    verilog_code = re.sub(ifdef_pattern,'',verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-                else :
-                    verilog_code = re.sub(ifdef_pattern,match_1.group(3),verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-        match_2 = re.search(ifndef_pattern,verilog_code,re.IGNORECASE|re.DOTALL)
-        if match_2:
-            if any(match_2.group(1) in define_element for define_element in define_list):
-                if (match_2.group(3)==None) :
-                    verilog_code = re.sub(ifndef_pattern,'',verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-                else :
-                    verilog_code = re.sub(ifndef_pattern,match_2.group(3),verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-            else : 
-                verilog_code = re.sub(ifndef_pattern,match_2.group(2),verilog_code,count=1,flags=re.DOTALL|re.IGNORECASE)
-    return verilog_code
+    return '\n'.join(preprocess_lines(verilog_code.split('\n'),define_list))
+
+# Line iterator version of manage_define : yield the lines of the defined code sections
+def preprocess_lines(lines,define_list) :
+    directive_pattern = r'`(?:(ifdef|ifndef|elsif|define|undef)\b[ \t]*(\w*)|(else|endif)\b)'
+    defines = set(define.strip() for define in define_list if define.strip())
+    conditions = [] # One [parent_active,branch_taken] element for each open `ifdef/`ifndef
+    active = True
+    define_continued = False # True while the lines of a multi-line `define are skipped
+    for line in lines :
+        if define_continued :
+            define_continued = line.rstrip().endswith('\\')
+            continue
+        if '`' not in line :
+            if active :
+                yield line
+            continue
+        code_parts = []
+        position = 0
+        for match in re.finditer(directive_pattern,line,re.IGNORECASE) :
+            if active :
+                code_parts.append(line[position:match.start()])
+            position = match.end()
+            directive, name = (match.group(1) or match.group(3)).lower(), match.group(2)
+            if directive in ('ifdef','ifndef') :
+                condition = (name in defines) != (directive == 'ifndef')
+                conditions.append([active,condition])
+                active = active and condition
+            elif not conditions and directive in ('elsif','else','endif') :
+                log_warning(f"`{directive} without `ifdef/`ifndef is ignored")
+            elif directive == 'elsif' :
+                condition = (not conditions[-1][1]) and (name in defines)
+                conditions[-1][1] = conditions[-1][1] or condition
+                active = conditions[-1][0] and condition
+            elif directive == 'else' :
+                active = conditions[-1][0] and not conditions[-1][1]
+                conditions[-1][1] = True
+            elif directive == 'endif' :
+                active = conditions.pop()[0]
+            elif directive == 'define' :
+                if active :
+                    defines.add(name)
+                define_continued = line.rstrip().endswith('\\')
+                position = len(line) # The value of the macro is not kept in the code
+                break
+            elif directive == 'undef' :
+                if active :
+                    defines.discard(name)
+        if active :
+            code_parts.append(line[position:])
+        line = ''.join(code_parts)
+        if line.strip() and not re.match(r'`(?!include)\w',line,re.IGNORECASE) : # Lines with '`' wich is not followed by include are deleated
+            yield line
     
 # Return the following type of list : [[module_1_name,[[port_1_name,direction(in/out/inout),type],...]],...]
 def extract_module(module_name, module_code):
@@ -208,53 +327,252 @@ def extract_module(module_name, module_code):
 
     return module
 
+# Return the port names of a module header in their order : module name [#(...)] (a, b, c); or (input [7:0] a, output b); (the last name of each
+# port of the list), [] if the module has no port list
+def find_header_ports(module_code) :
+    tokens = tokenize_verilog(module_code[:module_code.find(';')])
+    matches = match_brackets(tokens)
+    i = 2 # module name
+    if i+1 < len(tokens) and tokens[i] == '#' and tokens[i+1] == '(' and matches[i+1] != -1 :
+        i = matches[i+1] + 1
+    if i >= len(tokens) or tokens[i] != '(' or matches[i] == -1 :
+        return []
+    return [tokens[end-1].lower() for start, end in split_arguments(tokens, matches, i+1, matches[i]) if is_identifier(tokens[end-1])]
+
+# Return the ports of a module in the order of its header (port_order, see find_header_ports), the ports missing from the header follow
+# in their declaration order : positional connections are resolved with this order
+def ordered_ports(ports, port_order) :
+    positions = {}
+    for position, port_name in enumerate(port_order) :
+        positions.setdefault(port_name, position)
+    return sorted(ports, key=lambda port: positions.get(port[0], len(positions)))
+
+# Add a module to the registry : {module_name : {port_name : [port_name,direction,type],...},...} (the first definition of a module or port is kept)
+# The ports are given in the order of the module header (see ordered_ports), the positional connections use the order of the registry
+def register_module(module_registry, module_name, ports) :
+    if module_name in module_registry :
+        return
+    port_index = {}
+    for port in ports :
+        port_index.setdefault(port[0], port)
+    module_registry[module_name] = port_index
+
 # Return the following type of list  : [port_name,direction,type] if the port is found else warning 
-def find_port(port_name, module_name,module_list) : 
-    for i in range (len(module_list)) :
-        if (module_list[i][1][0] == module_name) :
-            for j in range(len(module_list[i][1][1])) :
-                if module_list[i][1][1][j][0] == port_name : 
-                    return module_list[i][1][1][j]
-            log_warning(f"port {port_name} of module {module_name} is not found \n \n")
-            return ['','unknow']
-    log_warning(f"module {module_name} is not found")
-    return ['','unknow']
+def find_port(port_name, module_name,module_registry) : 
+    port_index = module_registry.get(module_name)
+    if port_index is None :
+        log_warning(f"module {module_name} is not found")
+        return ['','unknow']
+    port = port_index.get(port_name)
+    if port is None :
+        log_warning(f"port {port_name} of module {module_name} is not found \n \n")
+        return ['','unknow']
+    return port
     
-# Extract all submodules from code, return : [[inst_1,sub_module_name,submodule_ports],...]
-def extract_submodule_list(verilog_code, module_list) :
-    sub_module_pattern = r'(?:(?:\w+)\s*#\s*\(\s*parameter )|(\w+)\s*(?:#\s*\((?:.*?(?:\(.*?\)\s*)*)*\))?\s*(\w+)\s*\(\s*\.(.*?)(?:\)\s*\);)'
-    signal_inst_pattern = r'\s*\.(\w+)\s*\(\s*(\w+)\s*(?:\[.*?\])?\s*\)'
+# Verilog reserved words (including gate primitives), they can not be the module or the instance name of a submodule
+verilog_keywords = set("""always and assign automatic begin buf bufif0 bufif1 case casex casez cell cmos config deassign default defparam design disable
+edge else end endcase endconfig endfunction endgenerate endmodule endprimitive endspecify endtable endtask event for force forever fork function
+generate genvar highz0 highz1 if ifnone incdir include initial inout input instance integer join large liblist library localparam macromodule
+medium module nand negedge nmos nor noshowcancelled not notif0 notif1 or output parameter pmos posedge primitive pull0 pull1 pulldown pullup
+pulsestyle_ondetect pulsestyle_onevent rcmos real realtime reg release repeat rnmos rpmos rtran rtranif0 rtranif1 scalared showcancelled signed
+small specify specparam strong0 strong1 supply0 supply1 table task time tran tranif0 tranif1 tri tri0 tri1 triand trior trireg unsigned use uwire
+vectored wait wand weak0 weak1 while wire wor xnor xor always_comb always_ff always_latch bit byte int logic longint shortint return""".split())
 
-    matches = re.findall(sub_module_pattern, verilog_code, re.IGNORECASE | re.DOTALL)
-    try:
-        matches.remove(('','',''))
-    except ValueError:
-        pass 
+# Split Verilog code into tokens : sized/unsized numbers, identifiers (including escaped and system identifiers), strings and single symbols
+def tokenize_verilog(verilog_code) :
+    token_pattern = r"(?:\d[\d_]*\s*)?'[sS]?[bBoOdDhH]\s*[\w?]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?|[A-Za-z_$][\w$]*|\\\S+|\"(?:\\.|[^\"\\])*\"|\S"
+    return re.findall(token_pattern, verilog_code)
 
-    submodules_inst = []
-    for i in range (len(matches)) :
+# Return the index of the matching closing bracket for each opening (, [ and { token (-1 when it is not closed)
+def match_brackets(tokens) :
+    closing_brackets = {')' : '(', ']' : '[', '}' : '{'}
+    matches = [-1]*len(tokens)
+    opened = []
+    for i in range(len(tokens)) :
+        if tokens[i] in ('(','[','{') :
+            opened.append(i)
+        elif tokens[i] in closing_brackets :
+            # Unbalanced brackets are dropped until the matching opening bracket is found
+            while opened and tokens[opened[-1]] != closing_brackets[tokens[i]] :
+                opened.pop()
+            if opened :
+                matches[opened.pop()] = i
+    return matches
+
+# Return True if the token can be a module or instance name
+def is_identifier(token) :
+    return (token[:1].isalpha() or token[:1] in ('_','\\')) and token.lower() not in verilog_keywords
+
+# Return the nets of a port connection expression (tokens[start:end]) : a net with bit/part-selects, or a concatenation of them (other expressions have no net)
+def find_expression_nets(tokens, matches, start, end) :
+    if end - start >= 1 and is_identifier(tokens[start]) :
+        i = start + 1
+        while i < end and tokens[i] == '[' and matches[i] != -1 :
+            i = matches[i] + 1
+        return [tokens[start]] if i == end else []
+    if end - start >= 2 and tokens[start] == '{' and matches[start] == end - 1 :
+        nets = []
+        for part_start, part_end in split_arguments(tokens, matches, start+1, end-1) :
+            if part_end - part_start >= 2 and tokens[part_start+1] == '{' and matches[part_start+1] == part_end - 1 :
+                part_start += 1 # Replication : {N{net}}
+            nets.extend(find_expression_nets(tokens, matches, part_start, part_end))
+        return nets
+    return []
+
+# Split tokens[start:end] on the commas which are not nested in brackets : return [[argument_start,argument_end],...]
+def split_arguments(tokens, matches, start, end) :
+    arguments = []
+    argument_start = i = start
+    while i < end :
+        if tokens[i] in ('(','[','{') and matches[i] != -1 :
+            i = matches[i]
+        elif tokens[i] == ',' :
+            arguments.append([argument_start,i])
+            argument_start = i + 1
+        i += 1
+    if end > start :
+        arguments.append([argument_start,end])
+    return arguments
+
+# Return the port connections of tokens[start:end] : [[port,signal],...] (port is the position of the connection for positional port connections)
+def parse_port_connections(tokens, matches, start, end) :
+    connections = []
+    arguments = split_arguments(tokens, matches, start, end)
+    for position in range(len(arguments)) :
+        argument_start, argument_end = arguments[position]
+        if argument_end - argument_start >= 3 and tokens[argument_start] == '.' and tokens[argument_start+2] == '(' :
+            # Named port connection : .port(expression)
+            port = tokens[argument_start+1].lower()
+            expression_end = matches[argument_start+2]
+            if expression_end == -1 :
+                continue
+            for signal in find_expression_nets(tokens, matches, argument_start+3, expression_end) :
+                connections.append([port,signal.lower()])
+        elif argument_start < argument_end and tokens[argument_start] != '.' :
+            for signal in find_expression_nets(tokens, matches, argument_start, argument_end) :
+                connections.append([position,signal.lower()])
+    return connections
+
+# Return the parameter overrides of tokens[start:end] (#(...) of an instantiation) : [[parameter,expression],...] (parameter is the position of the
+# override for positional overrides, expression is the text of the value without white spaces)
+def parse_parameter_overrides(tokens, matches, start, end) :
+    overrides = []
+    arguments = split_arguments(tokens, matches, start, end)
+    for position in range(len(arguments)) :
+        argument_start, argument_end = arguments[position]
+        if argument_end - argument_start >= 3 and tokens[argument_start] == '.' and tokens[argument_start+2] == '(' :
+            expression_end = matches[argument_start+2]
+            if expression_end != -1 and expression_end > argument_start+3 :
+                overrides.append([tokens[argument_start+1].lower(), join_tokens(tokens[argument_start+3:expression_end])])
+        elif argument_start < argument_end :
+            overrides.append([position, join_tokens(tokens[argument_start:argument_end])])
+    return overrides
 
-        module_name,module_inst,ports = matches[i][0].strip().lower(),matches[i][1].strip().lower(), matches[i][2].strip().lower()
-        ports = '.'+ports+')'  # the first . is captured by the regex
+# Return the text of tokens without white spaces (a sized number can be split by white spaces : 8 'h FF)
+def join_tokens(tokens) :
+    return ''.join(''.join(token.split()) for token in tokens)
+
+# Recognize a module instantiation starting at tokens[i] : module_name [#(parameters)|#delay] inst_1 [range] (ports) [, inst_2 [range] (ports)] ;
+# Return the index of the token following the instantiation and its instances [[inst,module_name,ports,overrides],...] (see parse_parameter_overrides),
+# or 0 and [] if there is no instantiation at tokens[i]
+def parse_instantiation(tokens, matches, i) :
+    def token(j) :
+        return tokens[j] if j < len(tokens) else ''
+    module_name = token(i)
+    if not is_identifier(module_name) :
+        return 0, []
+    j = i + 1
+    overrides = []
+    if token(j) == '#' :
+        if token(j+1) == '(' :
+            if matches[j+1] == -1 :
+                return 0, []
+            overrides = parse_parameter_overrides(tokens, matches, j+2, matches[j+1])
+            j = matches[j+1] + 1
+        else :
+            overrides = [[0, join_tokens([token(j+1)])]] # #value : value of the first parameter
+            j += 2
+    instances = []
+    while True :
+        instance_name = token(j)
+        if not is_identifier(instance_name) :
+            return 0, []
+        j += 1
+        if token(j) == '[' : # Array of instances
+            if matches[j] == -1 :
+                return 0, []
+            j = matches[j] + 1
+        if token(j) != '(' or matches[j] == -1 :
+            return 0, []
+        instances.append([instance_name.lower(), module_name.lower(), parse_port_connections(tokens, matches, j+1, matches[j]), overrides])
+        j = matches[j] + 1
+        if token(j) == ';' :
+            return j + 1, instances
+        if token(j) != ',' :
+            return 0, []
+        j += 1
+
+# Extract all submodules from the tokens of a code section, return : [[inst_1,sub_module_name,[[port_1,signal_1],...],overrides],...] (port directions are not resolved)
+# Every instantiation is recognized in a bounded number of steps thanks to the matching brackets table
+def find_submodules(tokens, matches) :
+    submodules = []
+    i = 0
+    while i < len(tokens) :
+        next_token, instances = parse_instantiation(tokens, matches, i)
+        if next_token :
+            submodules.extend(instances)
+            i = next_token
+        else :
+            i += 1
+    return submodules
+
+# Types and qualifiers which can follow parameter or localparam before the parameter names
+parameter_types = set("integer real realtime time signed unsigned reg logic bit byte shortint int longint".split())
+
+# Return the parameters declared in the tokens of a module code section (header #(...) and body) : [[name,expression,overridable],...] in their
+# declaration order (see sdf_parameters), a parameter is overridable, a localparam is not
+def find_parameters(tokens, matches) :
+    parameters = []
+    for keyword_index in [i for i, token in enumerate(tokens) if len(token) in (9, 10) and token.lower() in ('parameter', 'localparam')] :
+        keyword = tokens[keyword_index].lower()
+        i = keyword_index + 1
+        while i < len(tokens) :
+            while i < len(tokens) and (tokens[i].lower() in parameter_types or tokens[i] == '[') :
+                i = matches[i] + 1 if tokens[i] == '[' and matches[i] != -1 else i + 1
+            if i+1 >= len(tokens) or not is_identifier(tokens[i]) or tokens[i+1] != '=' :
+                break
+            name = tokens[i].lower()
+            expression_start = j = i + 2
+            while j < len(tokens) and tokens[j] not in (',', ';', ')') :
+                j = matches[j] + 1 if tokens[j] in ('(', '[', '{') and matches[j] != -1 else j + 1
+            parameters.append([name, join_tokens(tokens[expression_start:j]), keyword == 'parameter'])
+            i = j
+            if i+1 >= len(tokens) or tokens[i] != ',' or tokens[i+1].lower() in ('parameter', 'localparam') :
+                break
+            i += 1 # Next name of the same declaration : parameter A = 1, B = 2
+    return parameters
+
+# Resolve the port directions of the submodules found by find_submodules, return : [[inst_1,sub_module_name,submodule_ports],...]
+def extract_submodule_list(submodules, module_registry) :
+    submodules_inst = []
+    for module_inst, module_name, ports, overrides in submodules :
         submodule_ports = []
-        port_lines = ports.split(',')
-        for line in port_lines:
-            matches_2 = re.search(signal_inst_pattern,line,re.IGNORECASE | re.DOTALL )
-            if matches_2 :
-                signal_full = matches_2[2]
-                port = matches_2[1]
-                signal_match = re.match(r'(\w+)', signal_full)
-                signal = signal_match.group(1) if signal_match else signal_full
-                submodule_ports.append([port.strip().lower(),signal.strip().lower(),find_port(port,module_name,module_list)[1]])
+        port_names = None
+        for port, signal in ports :
+            if isinstance(port, int) : # Positional port connection : use the order of the module's ports
+                if port_names is None :
+                    port_names = list(module_registry.get(module_name,{}))
+                port = port_names[port] if port < len(port_names) else str(port)
+            submodule_ports.append([port,signal,find_port(port,module_name,module_registry)[1]])
         submodules_inst.append([
-            module_inst.lower(),
-            module_name.lower(),
+            module_inst,
+            module_name,
             submodule_ports ])
     return submodules_inst
 
-# Extract internal signals for each module code section
-def extract_internal_signals (module_code,module_name,submodule_list):
-    signals = []
+# Return the internal signal declarations of a module code section : [[signal_type,signal_name,signal_size],...], the sizes are computed with
+# the constant table of the module (see sdf_parameters)
+def find_signal_declarations(module_code, constants=None) :
     signal_declarations_full = []
     multiple_signal_pattern    = r'\b(?:input|output|inout)\b\s*(?:wire|reg).*?[\),;]|(\bwire\b\s*(?:signed|unsigned)?|\breg\b\s*(?:signed|unsigned)?)\s*(\[\s*[\w\d\s\:\-\+\(\)/\*]+\])?\s*((?:(?!input\b|output\b|inout\b)\w+)(?:\s*,\s*((?!input\b|output\b|inout\b)\w+))*)'
     code_lines = module_code.split(';')
@@ -264,26 +582,41 @@ def extract_internal_signals (module_code,module_name,submodule_list):
             name_list = (result.group(3) if result.group(1) is not None else "").split(',')
             for i in range (len(name_list)):
                 signal_declarations_full.append([(result.group(1) if result.group(1) is not None else "").strip() +" "+(result.group(2) if result.group(2) is not None else "").strip(),name_list[i]])
-    # Deleate empty signals
-    signal_declarations = [sublist for sublist in signal_declarations_full if sublist != [' ', '']]
+    # Deleate empty signals, the size is computed once with the declaration : [[signal_type,signal_name,signal_size],...]
+    return [sublist+[size_of_signal(sublist[0],constants)] for sublist in signal_declarations_full if sublist != [' ', '']]
+
+# Index the port connections of the submodules by net : {net_name : [instance_src_name,module_src_name,instance_dst_name,module_dst_name],...}
+def build_net_index(submodule_list) :
+    net_index = {}
+    for instance, submodule, ports  in submodule_list :
+        for port in ports : 
+            connections = net_index.get(port[1])
+            if connections is None :
+                connections = net_index[port[1]] = [[],[],[],[]]
+            if ((port [2] == 'input') | (port [2] == 'inout')) : 
+                connections[2].append(instance)
+                connections[3].append(submodule)
+            if ((port [2] == 'output' )| (port [2] == 'inout')) :
+                connections[0].append(instance)
+                connections[1].append(submodule)
+    return net_index
 
-    for signal_type, signal_name in signal_declarations: 
+# Extract internal signals for each module code section
+def extract_internal_signals (signal_declarations,module_name,net_index):
+    signals = []
+
+    for signal_type, signal_name, signal_size in signal_declarations: 
         instance_scr_name = []
         instance_dst_name = []
         module_dst_name = []
         module_src_name = []
-        signal_size = size_of_signal(signal_type)
-
-        for instance, submodule, ports  in submodule_list :
-            for port in ports : 
-                if (port[1]==signal_name.strip().lower()) :
-                    if ((port [2] == 'input') | (port [2] == 'inout')) : 
-                        instance_dst_name.append(instance)
-                        module_dst_name.append(submodule)
-                    
-                    if ((port [2] == 'output' )| (port [2] == 'inout')) :
-                        instance_scr_name.append(instance)
-                        module_src_name.append(submodule)
+
+        connections = net_index.get(signal_name.strip().lower())
+        if connections :
+            instance_scr_name.extend(connections[0])
+            module_src_name.extend(connections[1])
+            instance_dst_name.extend(connections[2])
+            module_dst_name.extend(connections[3])
         if (instance_dst_name == []) : 
             instance_dst_name.append(module_name) 
             module_dst_name.append(module_name)
@@ -294,36 +627,26 @@ def extract_internal_signals (module_code,module_name,submodule_list):
     return signals
 
 # Extract signals from module ports for each module code section : [[port_name_1,dir,size,instance_src_name,module_src_name,instance_dst_name,module_dst_name],[port_name_2,dir,...],...]
-def extract_external_signals (module_list,module_name,submodule_list) :
+def extract_external_signals (module,module_name,net_index,constants=None) :
     signals = []
-    module = []
-    for i in range (len(module_list)) :
-        if (module_list[i][1][0]==module_name.strip().lower()) :
-            module = module_list[i][1][1]
-    if (module==[]) :
-        log_warning(f'module {module_name} is not found')
     for port in module :
         instance_scr_name = []
         instance_dst_name = []
         module_dst_name = []
         module_src_name = []
-        signal_size=size_of_signal(port[2])
+        signal_size=size_of_signal(port[2],constants)
         if((port[1] == 'input') | (port[1] == 'inout')) :
             module_src_name.append('input')
             instance_scr_name.append('input')
         if ((port[1] == 'output') | (port[1] == 'inout')) : 
             module_dst_name.append('output')
             instance_dst_name.append('output')
-        for instance, component, ports  in submodule_list :
-            for port_a in ports : 
-                if (port_a[1]==port[0]) :
-                    if ((port_a [2] == 'input') | (port_a [2] == 'inout')) : 
-                        instance_dst_name.append(instance)
-                        module_dst_name.append(component)
-
-                    if ((port_a [2] == 'output' )| (port_a [2] == 'inout')) :
-                        instance_scr_name.append(instance)
-                        module_src_name.append(component)
+        connections = net_index.get(port[0])
+        if connections :
+            instance_scr_name.extend(connections[0])
+            module_src_name.extend(connections[1])
+            instance_dst_name.extend(connections[2])
+            module_dst_name.extend(connections[3])
         if (instance_dst_name == []) : 
             instance_dst_name.append(module_name) 
             module_dst_name.append(module_name)
@@ -344,98 +667,462 @@ def remove_redundant_signals (internal_signals,external_signals) :
     return internal_signals, external_signals
 
 
+# Resolve the connectivity of the parsed modules of a file : return its signal records [SignalRecord,...] (see sdf_records)
+# The sizes are the ones of the default parameter values of each module, the overrides of the instances are given to the hierarchy graph
+def extract_signal_records(file_name, modules, module_registry) :
+    signal_records = []
+    for module_name,ports,submodules,signal_declarations,parameters,port_order in modules :
+        constants = sdf_parameters.module_constants(parameters)
+        submodule_list = extract_submodule_list(submodules,module_registry)
+        if hierarchy_graph is not None :
+            hierarchy_graph.add_module(file_name,module_name,submodule_list,parameters,ports,[sdf_parameters.evaluate_overrides(submodule[3],constants) for submodule in submodules])
+        net_index = build_net_index(submodule_list)
+        internal_signals = extract_internal_signals(signal_declarations,module_name,net_index)
+        external_signals = extract_external_signals(ports,module_name,net_index,constants)
+        internal_signals,external_signals = remove_redundant_signals(internal_signals,external_signals)
+        for signal in external_signals:
+            signal_records.append(sdf_records.SignalRecord(file_name,module_name,signal[0],signal[1],signal[2],signal[3],signal[4],signal[5],signal[6]))
+        for signal in internal_signals:
+            signal_records.append(sdf_records.SignalRecord(file_name,"Internal",signal[0],signal[1],signal[2],signal[3],signal[4],signal[5],signal[6]))
+    return signal_records
 
-        
-def convert_to_csv_string(value): # (eg : [a,b,c] => "a,b,c")
-    if isinstance(value, (list, tuple)):
-        return ",".join(map(str, value))  
-    return str(value)
-
-
-def write_signals_to_csv(input_file_name,output_file, verilog_code, module_list):
-        if find_modules(verilog_code):
-            with open(output_file, mode='a', newline='') as file_csv:
-                writer = csv.writer(file_csv)
-                writer = csv.writer(file_csv,delimiter= ';')
-                writer.writerow([f"file_name({input_file_name})"])
-                writer.writerow(["component", "signal_name", "type", "size","instance src", "component_src", "instance_dst", "component_dst"])
-                for module_name,module_code in find_modules(verilog_code) :
-                    submodule_list = extract_submodule_list(module_code,module_list)
-                    internal_signals = extract_internal_signals(module_code,module_name,submodule_list)
-                    external_signals = extract_external_signals(module_list,module_name,submodule_list)
-                    internal_signals,external_signals = remove_redundant_signals(internal_signals,external_signals)
-                    for signal in external_signals:
-                        writer.writerow([
-                        module_name,
-                        signal[0],
-                        signal[1],
-                        signal[2],
-                        convert_to_csv_string(signal[3]),
-                        convert_to_csv_string(signal[4]),
-                        convert_to_csv_string(signal[5]),
-                        convert_to_csv_string(signal[6])
-                    ])
-                    for signal in internal_signals:
-                        writer.writerow([
-                            "Internal",
-                            signal[0],
-                            signal[1],
-                            signal[2],
-                            convert_to_csv_string(signal[3]),
-                            convert_to_csv_string(signal[4]),
-                            convert_to_csv_string(signal[5]),
-                            convert_to_csv_string(signal[6])
-                        ])
-
-def process_files_in_directory(directory_path, output_txt_path, define_list,excluded_directories,excluded_files):
-    module_list = []
+def write_signals_to_csv(input_file_name,writer, signal_records):
+        write_file_block(writer,input_file_name,signal_records)
+
+# Write the block of a file (file name row, header row and the rows of its signal records) with a csv writer
+def write_file_block(writer, input_file_name, signal_records) :
+    writer.writerow([f"file_name({input_file_name})"])
+    writer.writerow(sdf_records.csv_header)
+    writer.writerows(map(sdf_records.csv_row, signal_records))
+
+# Preprocess and parse the code of a .v file : return [[module_name,ports,submodules,signal_declarations,parameters,port_order],...]
+def parse_code(verilog_code_full, define_list) :
+    verilog_code = remove_comments(verilog_code_full)
+    verilog_code = manage_define(verilog_code,define_list)
+    modules = []
+    for module_name,module_code in (find_modules(verilog_code) or []) :
+        modules.append(parse_module(module_name,module_code))
+    return modules
+
+# Parse a module code section : return [module_name,ports,submodules,signal_declarations,parameters,port_order] (the strings are interned, see sdf_records.intern_strings)
+# ports are in their declaration order (the order of the rows), port_order is the order of the header (see find_header_ports)
+# The code is tokenized once for the submodules and the parameters, the sizes of the signal declarations use the default parameter values
+def parse_module(module_name, module_code) :
+    tokens = tokenize_verilog(module_code)
+    matches = match_brackets(tokens)
+    parameters = find_parameters(tokens,matches)
+    return sdf_records.intern_strings([
+        module_name,
+        extract_module(module_name,module_code)[1],
+        find_submodules(tokens,matches),
+        find_signal_declarations(module_code,sdf_parameters.module_constants(parameters)),
+        parameters,
+        find_header_ports(module_code)])
+
+# Read a .v file line by line and yield its modules one at a time : (module_name,module_code), the memory used is bounded by the largest module
+def stream_modules(file_path, define_list) :
+    with open(file_path, "r") as file:
+        module_lines = []
+        for line in preprocess_lines(remove_comments_lines(file_line.rstrip('\n') for file_line in file),define_list) :
+            if not module_lines and not re.search(r'module', line, re.IGNORECASE) :
+                continue # Code outside of modules is not kept
+            match = re.search(r'endmodule', line, re.IGNORECASE)
+            while match :
+                module_lines.append(line[:match.end()])
+                yield from (find_modules('\n'.join(module_lines)) or [])
+                module_lines = []
+                line = line[match.end():]
+                match = re.search(r'endmodule', line, re.IGNORECASE)
+            if module_lines or re.search(r'module', line, re.IGNORECASE) :
+                module_lines.append(line)
+
+# Streaming mode for very large files (e.g. gate-level netlists) : the files are read twice line by line, first for the module registry, then for the signals
+# The rows of each module are written before the next module is read, so the memory used is bounded by the largest module instead of the largest file
+def process_files_streaming(file_list, output_txt_path, define_list) :
+    sdf_records.new_name_table()
+    module_registry = {}
+    file_list = [[file_name,file_path] for file_name,file_path in file_list if prefilter_file(file_path)]
+    for file_name,file_path in file_list :
+        try :
+            for module_name,module_code in stream_modules(file_path,define_list) :
+                register_module(module_registry,module_name,ordered_ports(extract_module(module_name,module_code)[1],find_header_ports(module_code)))
+        except FileNotFoundError:
+            print(f"Error: File '{file_path}' not found.")
+    with sdf_output.CsvSink(output_txt_path) as csv_sink:
+        writer = csv_sink.writer
+        for file_name,file_path in file_list :
+            header_written = False
+            try :
+                for module_name,module_code in stream_modules(file_path,define_list) :
+                    if not header_written :
+                        writer.writerow([f"file_name({file_name})"])
+                        writer.writerow(sdf_records.csv_header)
+                        header_written = True
+                    writer.writerows(sdf_records.csv_row(signal_record) for signal_record in extract_signal_records(file_name,[parse_module(module_name,module_code)],module_registry))
+            except FileNotFoundError:
+                pass # Already reported by the module registry pass
+
+# Read and parse a .v file once, the parsed form (and its warnings) is reused from the cache directory when the content of the file and define_list are unchanged
+def parse_file(file_path, define_list, cache_directory=None) :
+    global captured_warnings
+    verilog_code_full, content_hash = sdf_cache.read_source(file_path,bool(cache_directory))
+    key = None
+    cached = None
+    if cache_directory :
+        key = sdf_cache.cache_key(content_hash,parser_version,set(define.strip() for define in define_list if define.strip()))
+        cached = sdf_cache.load(cache_directory,key)
+    if cached is None :
+        outer_warnings, captured_warnings = captured_warnings, []
+        try :
+            modules = parse_code(verilog_code_full,define_list)
+        finally :
+            warnings, captured_warnings = captured_warnings, outer_warnings
+        cached = [modules,warnings]
+        if key :
+            sdf_cache.store(cache_directory,key,cached)
+    for warning in cached[1] :
+        log_warning(warning)
+    return cached[0]
+
+# Run parse_file in a worker : return [modules,warnings] (modules is None if the file is not found), the warnings are logged by the main process
+def parse_file_task(task) :
+    global captured_warnings
+    file_path, define_list, cache_directory = task
+    captured_warnings = []
+    try :
+        modules = parse_file(file_path,define_list,cache_directory)
+    except FileNotFoundError :
+        modules = None
+    warnings, captured_warnings = captured_warnings, None
+    return [modules,warnings]
+
+# Return False if the file has no module, without decoding it (include-only files, ...) : its parsed form is then [] and it is not
+# preprocessed nor parsed, the files are counted in prefilter_counts
+def prefilter_file(file_path) :
+    has_module = sdf_cache.contains_keywords(file_path,design_unit_keywords)
+    prefilter_counts[0] += 1
+    prefilter_counts[1] += not has_module
+    return has_module
+
+# Return the parse result of a file skipped by prefilter_file (see parse_file_task)
+def skipped_parse_result() :
+    return [[],[]]
+
+# Yield the parse results of the files in the order of parse_flags : the next one of parse_results for a parsed file, skipped_parse_result()
+# for a file skipped by prefilter_file
+def merge_skipped_files(parse_flags, parse_results) :
+    for parsed in parse_flags :
+        yield next(parse_results) if parsed else skipped_parse_result()
+
+# Parse the files with a pool of jobs processes : yield [modules,warnings] for each file in the order of file_paths
+def parse_files(file_paths, define_list, jobs=1, cache_directory=None) :
+    parse_flags = [prefilter_file(file_path) for file_path in file_paths]
+    tasks = [(file_path,define_list,cache_directory) for file_path,parsed in zip(file_paths,parse_flags) if parsed]
+    if jobs > 1 and len(tasks) > 1 :
+        with multiprocessing.Pool(min(jobs,len(tasks))) as pool :
+            yield from merge_skipped_files(parse_flags,pool.imap(parse_file_task, tasks, chunksize=max(1,len(tasks)//(jobs*4))))
+    else :
+        yield from merge_skipped_files(parse_flags,map(parse_file_task, tasks))
+
+# Return the .v files of the directory in os.walk order : [[file_name,file_path],...]
+def find_files(directory_path, excluded_directories, excluded_files) :
+    file_list = []
+    for root, dirs, files in os.walk(directory_path):
+        dirs[:] = [d for d in dirs if d not in excluded_directories]
+        files[:] = [f for f in files if f not in excluded_files]      
+        for file_name in files:
+            if file_name.lower().endswith(".v"):                                                           
+                file_list.append([file_name,os.path.join(root, file_name)])
+    return file_list
+
+# Build the module registry from the parsed files (parse_results in the order of file_list), then resolve their connectivity
+# Yield [file_name,signal_records] for each file with at least one module
+def resolve_parsed_files(file_list, parse_results) :
+    sdf_records.new_name_table()
+    module_registry = {}
+    parsed_files = [] # Parsed intermediate form : [[file_name,modules],...] (see parse_file)
+    file_name = None
+    try : 
+        for (file_name,file_path),(modules,warnings) in zip(file_list,parse_results) :
+            for warning in warnings :
+                log_warning(warning)
+            if modules is None :
+                print(f"Error: File '{file_path}' not found.")
+                continue
+            for module_name,ports,submodules,signal_declarations,parameters,port_order in modules :
+                register_module(module_registry,module_name,ordered_ports(ports,port_order))
+            parsed_files.append([file_name,modules])
+    except KeyboardInterrupt :
+        print (f"Module of file : {file_name} is extacted")
+        raise # The connectivity is not resolved with a partial module registry
+    for file_name,modules in parsed_files :
+        if modules :
+            yield [file_name,extract_signal_records(file_name,modules,module_registry)]
+
+# Return the record sinks of a project : columnar file (see sdf_columnar) and SQLite database (see sdf_sqlite), each one receives the signal records of the files with add and is closed at the end
+# (or discarded with discard when the run is interrupted)
+def open_record_sinks(project, columnar_path=None, database_path=None) :
+    record_sinks = []
+    if columnar_path :
+        record_sinks.append(sdf_columnar.ColumnarTable(columnar_path))
+    if database_path :
+        record_sinks.append(sdf_sqlite.SignalDatabase(database_path,project,"verilog"))
+    return record_sinks
+
+# Write the signals of the parsed files (parse_results in the order of file_list) to the csv file (see sdf_output.CsvSink), and to the record sinks (see open_record_sinks)
+# On Ctrl+C the csv file and the record sinks are discarded (the previous outputs are kept) and KeyboardInterrupt is raised again
+def write_parsed_files(file_list, parse_results, output_txt_path, record_sinks=()) :
+    file_name = None
+    try :
+        with sdf_output.CsvSink(output_txt_path) as csv_sink:
+            for file_name,signal_records in resolve_parsed_files(file_list,parse_results) :
+                write_signals_to_csv(file_name,csv_sink.writer,signal_records)
+                for record_sink in record_sinks :
+                    record_sink.add(signal_records)
+    except KeyboardInterrupt :
+        print (f"Signals of file : {file_name} are extacted")
+        for record_sink in record_sinks :
+            record_sink.discard()
+        raise
+    for record_sink in record_sinks :
+        record_sink.close()
+
+# Library API : yield the signal records (see sdf_records.SignalRecord) of a .v file, or of the .v files of a directory, in the order of the sdf.csv rows
+# e.g. for record in extract_verilog("rtl", defines=["XILINX_FPGA"]) : print(record.signal_name, record.size)
+def extract_verilog(path, defines=(), excluded_directories=(), excluded_files=(), jobs=1, cache_directory=None) :
+    if os.path.isdir(path) :
+        file_list = find_files(path,list(excluded_directories),list(excluded_files))
+    else :
+        file_list = [[os.path.basename(path),path]]
+    parse_results = parse_files([file_path for file_name,file_path in file_list],list(defines),jobs,cache_directory)
+    for file_name,signal_records in resolve_parsed_files(file_list,parse_results) :
+        yield from signal_records
+
+# Parse the files (see parse_files) and add their modules to parsed_modules : {file_path : modules}
+# In watch mode (see watch_directory) the modules of the files unchanged since they were parsed are taken from watch_state instead, the
+# modules of the parsed files are kept in it : return the number of files taken from watch_state
+def parse_files_into(file_paths, define_list, jobs, cache_directory, parsed_modules, watch_state=None) :
+    kept_count = 0
+    if watch_state is not None :
+        kept_modules, file_paths = sdf_incremental.split_kept_files(watch_state['parsed_files'],watch_state['snapshot'],file_paths)
+        parsed_modules.update(kept_modules)
+        kept_count = len(kept_modules)
+    for file_path,(modules,warnings) in zip(file_paths,parse_files(file_paths,define_list,jobs,cache_directory)) :
+        for warning in warnings :
+            log_warning(warning)
+        if modules is None :
+            print(f"Error: File '{file_path}' not found.")
+        else :
+            parsed_modules[file_path] = modules
+            if watch_state is not None and file_path in watch_state['snapshot'] :
+                watch_state['parsed_files'][file_path] = [watch_state['snapshot'][file_path],modules]
+    return kept_count
+
+# Incremental mode : only the files changed since the previous run are parsed again, the blocks of the other files are copied from the previous csv file
+# The files instantiating a module whose ports changed (or which was added or removed) are parsed again too, since find_port feeds their rows
+# The byte range of each file block is kept in the manifest of the csv file (see sdf_incremental), without manifest every file is parsed
+# Return the new manifest, it can be given back as manifest to skip reading it from the disk (watch mode)
+# watch_state is the state kept in memory by the watch mode between two regenerations (see watch_directory), None otherwise
+def process_files_incremental(file_list, output_txt_path, define_list, jobs=1, cache_directory=None, manifest=None, watch_state=None) :
+    sdf_records.new_name_table()
+    context = [parser_version] + sorted(set(define.strip() for define in define_list if define.strip()))
+    manifest = sdf_incremental.load_manifest(output_txt_path,context,manifest) or {'sources' : {}, 'blocks' : []}
+    previous_blocks = {block[1] : block for block in manifest['blocks']} # [file_name,file_path,start,end,[[module_name,ports],...],instantiated module names]
+    previous_ports = {}
+    for block in manifest['blocks'] :
+        for module_name,ports in block[4] :
+            previous_ports.setdefault(module_name,ports)
+
+    sources = {}
+    for file_name,file_path in file_list :
+        try :
+            sources[file_path] = sdf_incremental.source_state(file_path,manifest['sources'].get(file_path))
+        except OSError :
+            print(f"Error: File '{file_path}' not found.")
+    parsed_modules = {} # {file_path : modules} of the files parsed in this run
+    kept_count = parse_files_into([file_path for file_name,file_path in file_list if file_path in sources and (file_path not in previous_blocks or sdf_incremental.source_changed(sources[file_path],manifest['sources'].get(file_path)))],define_list,jobs,cache_directory,parsed_modules,watch_state)
+
+    file_modules = {} # {file_path : [[module_name,ports],...]}
+    module_ports = {}
+    for file_name,file_path in file_list :
+        if file_path in parsed_modules :
+            file_modules[file_path] = [[module_name,ordered_ports(ports,port_order)] for module_name,ports,submodules,signal_declarations,parameters,port_order in parsed_modules[file_path]]
+        elif file_path in sources and file_path in previous_blocks :
+            file_modules[file_path] = previous_blocks[file_path][4]
+        for module_name,ports in file_modules.get(file_path,[]) :
+            module_ports.setdefault(module_name,ports)
+    changed_modules = set(module_name for module_name in set(module_ports)|set(previous_ports) if module_ports.get(module_name) != previous_ports.get(module_name))
+    kept_count += parse_files_into([file_path for file_name,file_path in file_list if file_path in file_modules and file_path not in parsed_modules and changed_modules.intersection(previous_blocks[file_path][5])],define_list,jobs,cache_directory,parsed_modules,watch_state)
+    if watch_state is None :
+        print(f"Incremental : {len(parsed_modules)} of {len(file_list)} files parsed, {len(changed_modules)} modules changed")
+    else :
+        print(f"Incremental : {len(parsed_modules)-kept_count} of {len(file_list)} files parsed, {kept_count} resolved again from memory, {len(changed_modules)} modules changed")
+
+    if watch_state is not None and watch_state['module_registry'] is not None and not changed_modules :
+        module_registry = watch_state['module_registry'] # The ports of the modules are the ones of the previous regeneration
+    else :
+        module_registry = {}
+        for module_name,ports in module_ports.items() :
+            register_module(module_registry,module_name,ports)
+    if watch_state is not None :
+        watch_state['module_registry'] = module_registry
+        watch_state['parsed_files'] = {file_path : kept_file for file_path,kept_file in watch_state['parsed_files'].items() if file_path in file_modules}
+    blocks = []
+    # The previous output file is closed before the sink replaces it
+    with sdf_output.CsvSink(output_txt_path) as csv_sink:
+        previous_output = open(output_txt_path,'rb') if manifest['blocks'] else None
+        try :
+            file_csv = csv_sink.file
+            writer = csv_sink.writer
+            for file_name,file_path in file_list :
+                if file_path not in file_modules :
+                    continue
+                start = file_csv.tell()
+                if file_path in parsed_modules :
+                    modules = parsed_modules[file_path]
+                    if modules :
+                        write_file_block(writer,file_name,extract_signal_records(file_name,modules,module_registry))
+                    instantiated = sorted(set(submodule[1] for module_name,ports,submodules,signal_declarations,parameters,port_order in modules for submodule in submodules))
+                else :
+                    previous_block = previous_blocks[file_path]
+                    sdf_incremental.copy_block(previous_output,file_csv,previous_block[2],previous_block[3])
+                    instantiated = previous_block[5]
+                blocks.append([file_name,file_path,start,file_csv.tell(),file_modules[file_path],instantiated])
+        finally :
+            if previous_output :
+                previous_output.close()
+    return sdf_incremental.store_manifest(output_txt_path,context,sources,blocks)
+
+# Watch mode : regenerate the csv file incrementally each time .v files are added, changed or removed, until Ctrl+C
+# The manifest (module ports and block ranges), the modules of the parsed files and the module registry stay in memory between two regenerations :
+# only the changed files are parsed again (even without parse cache), the files instantiating a module whose ports changed are resolved again
+# from their modules in memory. The directory is walked once per poll, a regeneration uses the file list of the walk of its snapshot
+# The output is replaced atomically
+def watch_directory(directory_path, output_txt_path, define_list, excluded_directories, excluded_files, jobs=1, cache_directory=None, cache_size=sdf_cache.default_cache_size) :
+    file_list = [] # File list of the last walk
+    def list_files() :
+        file_list[:] = find_files(directory_path,excluded_directories,excluded_files)
+        return [file_path for file_name,file_path in file_list]
+    manifest = None
+    watch_state = {'snapshot' : None, 'parsed_files' : {}, 'module_registry' : None} # parsed_files : {file_path : [state,modules]} (see sdf_incremental.split_kept_files)
+    try :
+        watch_state['snapshot'] = sdf_incremental.snapshot(list_files())
+        while True :
+            manifest = process_files_incremental(list(file_list),output_txt_path,define_list,jobs,cache_directory,manifest,watch_state)
+            if cache_directory :
+                sdf_cache.evict(cache_directory,cache_size)
+            print_summary(output_txt_path)
+            print(f"Watching {directory_path} (Ctrl+C to stop)")
+            watch_state['snapshot'] = sdf_incremental.wait_for_changes(list_files,watch_state['snapshot'])
+    except KeyboardInterrupt :
+        print ("Watch mode is stopped")
+
+def process_files_in_directory(directory_path, output_txt_path, define_list,excluded_directories,excluded_files,jobs=1,cache_directory=None,cache_size=sdf_cache.default_cache_size,stream=False,incremental=False,watch=False,columnar_path=None,database_path=None,hierarchy_path=None):
+    global hierarchy_graph
     if not os.path.exists(directory_path):
         print(f"The specified directory {directory_path} does not exist.\n")
-    else:
-        try : 
-            open(output_txt_path, 'w').close()                                                                             
-            for root, dirs, files in os.walk(directory_path):
-                dirs[:] = [d for d in dirs if d not in excluded_directories]
-                files[:] = [f for f in files if f not in excluded_files]      
-                for file_name in files:
-                    if file_name.lower().endswith(".v"):                                                           
-                        file_path = os.path.join(root, file_name)
-                        try:
-                            with open(file_path, "r") as file:
-                                verilog_code_full = file.read()
-                                verilog_code = remove_comments(verilog_code_full)
-                                verilog_code = manage_define(verilog_code,define_list)
-                                if find_modules(verilog_code):
-                                    for module_name,module_code in find_modules(verilog_code) :
-                                        module_list.append([file_name,extract_module(module_name,module_code)]) 
-                        except FileNotFoundError:
-                            print(f"Error: File '{file_path}' not found.")
+    elif stream :
+        try :
+            process_files_streaming(find_files(directory_path,excluded_directories,excluded_files),output_txt_path,define_list)
         except KeyboardInterrupt :
-            print (f"Module of file : {file_name} is extacted")
+            print ("Streaming extraction is interrupted")
+        print_summary(output_txt_path)
+    elif watch :
+        watch_directory(directory_path,output_txt_path,define_list,excluded_directories,excluded_files,jobs,cache_directory,cache_size)
+    elif incremental :
+        process_files_incremental(find_files(directory_path,excluded_directories,excluded_files),output_txt_path,define_list,jobs,cache_directory)
+        if cache_directory :
+            sdf_cache.evict(cache_directory,cache_size)
+        print_summary(output_txt_path)
+    else:
+        # Each file is read, preprocessed and parsed only once (in parallel when jobs > 1), connectivity is resolved afterwards from the parsed form and the module registry
+        file_list = find_files(directory_path,excluded_directories,excluded_files)
+        parse_results = parse_files([file_path for file_name,file_path in file_list],define_list,jobs,cache_directory)
+        if hierarchy_path :
+            hierarchy_graph = sdf_hierarchy.HierarchyGraph(hierarchy_path)
         try :
-            for root, dirs, files in os.walk(directory_path):
-                dirs[:] = [d for d in dirs if d not in excluded_directories]
-                files[:] = [f for f in files if f not in excluded_files]      
-                # Extract all modules in directory in modules
-                for file_name in files:
-
-                    if file_name.lower().endswith(".v"):                                                           
-                        file_path = os.path.join(root, file_name)
-                        try:
-                            with open(file_path, "r") as file:
-                                verilog_code_full = file.read()
-                                verilog_code = remove_comments(verilog_code_full)
-                                verilog_code = manage_define(verilog_code,define_list)
-                                write_signals_to_csv(file_name,output_txt_path,verilog_code,module_list)
-                        except FileNotFoundError:
-                            print(f"Error: File '{file_path}' not found.")
+            write_parsed_files(file_list,parse_results,output_txt_path,open_record_sinks(os.path.abspath(directory_path),columnar_path,database_path))
         except KeyboardInterrupt :
-            print (f"Signals of file : {file_name} are extacted")          
+            print (f"Extraction is interrupted, {output_txt_path} is not replaced")
+            hierarchy_graph = None
+            return
+        if hierarchy_graph is not None :
+            hierarchy_graph.close()
+            hierarchy_graph = None
+        if cache_directory :
+            sdf_cache.evict(cache_directory,cache_size)
+        print_summary(output_txt_path)
+
+# Print the number of files skipped by prefilter_file since the previous summary
+def print_prefilter_summary() :
+    if prefilter_counts[0] :
+        print(f"Pre-filter : {prefilter_counts[1]} of {prefilter_counts[0]} .v files have no module, they are not parsed")
+        prefilter_counts[:] = [0, 0]
+
+def print_summary(output_txt_path) :
+    print_prefilter_summary()
+    if not os.path.exists(output_txt_path) or os.path.getsize(output_txt_path) == 0 :
+        print(f".v files was not found. Or there is simply no .v file in project.\n")
+    else :
+        print(f".v parsing done successfully\n")    
 
-        if os.path.getsize(output_txt_path) == 0 :
-            print(f".v files was not found. Or there is simply no .v file in project.\n")
+# Remove the options from the arguments : return arguments, options ({'jobs' : number of parsing processes, 'cache_directory' : parse cache directory or None, 'cache_size' : cache size limit in MB, 'stream' : streaming mode, 'incremental' : incremental mode, 'watch' : watch mode, 'columnar' : columnar output path or None, 'sqlite' : SQLite database path or None, 'write_buffer' : write buffer size of the csv file in KB, 'profile' : instrumentation of the run, 'profile_top' : number of slowest files reported, 'profile_file' : file name of the cProfile dump or None, 'hierarchy' : hierarchy graph path or None})
+def extract_options(arguments) :
+    options = {'jobs' : 1, 'cache_directory' : sdf_cache.default_cache_directory, 'cache_size' : sdf_cache.default_cache_size, 'stream' : False, 'incremental' : False, 'watch' : False, 'columnar' : None, 'sqlite' : None, 'write_buffer' : sdf_output.default_buffer_size, 'profile' : False, 'profile_top' : sdf_profile.slowest_file_count, 'profile_file' : None, 'hierarchy' : None}
+    remaining_arguments = []
+    i = 0
+    while i < len(arguments) :
+        if arguments[i] in ("--jobs", "-j", "--cache-size", "--write-buffer", "--profile-top") :
+            if i+1 >= len(arguments) or not arguments[i+1].isdigit() :
+                print (f"{arguments[i]} must be followed by a number")
+                sys.exit(1)
+            if arguments[i] == "--cache-size" :
+                options['cache_size'] = int(arguments[i+1])
+            elif arguments[i] == "--write-buffer" :
+                options['write_buffer'] = int(arguments[i+1])
+            elif arguments[i] == "--profile-top" :
+                options['profile_top'] = int(arguments[i+1])
+            else :
+                options['jobs'] = int(arguments[i+1]) or os.cpu_count() or 1 # 0 : one job per cpu
+            i += 2
+        elif arguments[i] == "--cache-dir" :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a directory")
+                sys.exit(1)
+            options['cache_directory'] = arguments[i+1]
+            i += 2
+        elif arguments[i] in ("--columnar", "--sqlite", "--hierarchy") :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a file path")
+                sys.exit(1)
+            options[arguments[i][2:]] = arguments[i+1]
+            i += 2
+        elif arguments[i] == "--profile-file" :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a file name")
+                sys.exit(1)
+            options['profile'] = True
+            options['profile_file'] = arguments[i+1]
+            i += 2
+        elif arguments[i] == "--profile" :
+            options['profile'] = True
+            i += 1
+        elif arguments[i] == "--no-cache" :
+            options['cache_directory'] = None
+            i += 1
+        elif arguments[i] == "--stream" :
+            options['stream'] = True
+            i += 1
+        elif arguments[i] == "--incremental" :
+            options['incremental'] = True
+            i += 1
+        elif arguments[i] == "--watch" :
+            options['watch'] = True
+            i += 1
         else :
-            print(f".v parsing done successfully\n")    
+            remaining_arguments.append(arguments[i])
+            i += 1
+    return remaining_arguments, options
 
 
 
@@ -447,19 +1134,20 @@ def main():
         print('DEBUG Mode enable')
     else : 
         print('DEBUG Mode disable')
-    if len(sys.argv) > 1 :
-        if (sys.argv[1] == "-help") :
+    arguments, options = extract_options(sys.argv)
+    if len(arguments) > 1 :
+        if (arguments[1] == "-help") :
             help()
             return 0
-        for arg in sys.argv :
+        for arg in arguments :
             if arg.endswith(".txt") :
                 print (f"Config file : {arg}")
                 config=extract_config(arg,config)
         input_directory,output_file,excluded_directories,excluded_files,define_list=config
-        for arg in sys.argv :
+        for arg in arguments :
             if arg.endswith(".csv") :
                 output_file=arg
-        for arg in sys.argv : 
+        for arg in arguments : 
             if not (arg.endswith(".txt")|arg.endswith(".csv")|arg.endswith(".py")) :
                 input_directory = arg
         config = (input_directory,output_file,excluded_directories,excluded_files,define_list)
@@ -476,7 +1164,28 @@ def main():
     print (f"Excluded_directories {excluded_directories}")
     print (f"Excluded_files {excluded_files}")   
     print (f"Define list : {define_list}")
-    process_files_in_directory(input_directory,output_file,define_list,excluded_directories,excluded_files)
+    print (f"Jobs : {options['jobs']}")
+    print (f"Parse cache : {options['cache_directory'] or 'disabled'}")
+    print (f"Streaming mode : {options['stream']}")
+    print (f"Incremental mode : {options['incremental']}")
+    print (f"Watch mode : {options['watch']}")
+    for option in ('columnar', 'sqlite', 'hierarchy') :
+        if options[option] and (options['stream'] or options['incremental'] or options['watch']) :
+            print (f"--{option} is not supported with --stream, --incremental or --watch, it is ignored")
+            options[option] = None
+    print (f"Columnar output : {options['columnar'] or 'disabled'}")
+    print (f"SQLite output : {options['sqlite'] or 'disabled'}")
+    print (f"Hierarchy graph : {options['hierarchy'] or 'disabled'}")
+    sdf_output.buffer_size = options['write_buffer']
+    print (f"Profile : {options['profile']}")
+    if options['profile'] :
+        if options['jobs'] > 1 :
+            print ("--profile parses the files in the main process, --jobs is ignored")
+            options['jobs'] = 1
+        sdf_profile.enable(sys.modules[__name__],profile_stages,options['profile_file'])
+    process_files_in_directory(input_directory,output_file,define_list,excluded_directories,excluded_files,options['jobs'],options['cache_directory'],options['cache_size'],options['stream'],options['incremental'],options['watch'],options['columnar'],options['sqlite'],options['hierarchy'])
+    if options['profile'] :
+        sdf_profile.report(output_file+".profile.json",f"{output_file}.{options['profile_file']}.prof",options['profile_top'])
 
 
 
@@ -2,16 +2,42 @@ import re
 import csv
 import os
 import sys
+import multiprocessing
+import sdf_cache
+import sdf_incremental
+import sdf_records
+import sdf_columnar
+import sdf_sqlite
+import sdf_output
+import sdf_profile
+import sdf_hierarchy
+import sdf_width
+import sdf_parameters
 
 DEBUG = True
 warnings_set = set() # Store warnings that have already been logged
 
 default_config_file = r".\config_vhdl.txt"
+parser_version = "vhdl-6" # Change it when the parsed form of parse_code changes, to invalidate the parse cache
+
+package_index = {} # {package_name : [file_path,...]} of the directory being processed (see build_package_index)
+package_excluded_directories = ['bench', 'sim', 'testbench'] # Directories where the package files are not looked up
+package_components = {} # Memoized components of each package : {package_name : components}
+captured_warnings = None # Warnings of the current worker task, logged later by the main process (see parse_file_task)
+design_unit_keywords = [b'entity', b'component'] # A file without any of them has no entity and declares no component, it is not parsed (see prefilter_file)
+prefilter_counts = [0, 0] # [files scanned,files skipped] by prefilter_file
+hierarchy_graph = None # Hierarchy graph of the run (--hierarchy PATH), the modules are added to it when their instances are resolved (see sdf_hierarchy)
+# Stages timed by --profile (see sdf_profile) : [function_name,position of the file argument (None : file of the calling stage)]
+profile_stages = [['find_files',None], ['build_package_index',None], ['prefilter_file',0], ['parse_file',0], ['sdf_cache.read_source',None], ['sdf_cache.load',None], ['sdf_cache.store',None],
+    ['parse_code',None], ['remove_comments',None], ['scan_design_units',None], ['find_package',None], ['extract_port_map',None],
+    ['extract_signal_records',0], ['write_file_block',1], ['sdf_cache.evict',None]]
 
 # Log warnings without logging the same message more than once
 def log_warning(message):
     global warnings_set
-    if message not in warnings_set:
+    if captured_warnings is not None:
+        captured_warnings.append(message)
+    elif message not in warnings_set:
         print(f"WARNING : {message}")
         warnings_set.add(message)  
 
@@ -78,6 +104,53 @@ There are two main usage scenarios:
 
    - <config_file_path>: Path to the configuration file (e.g., "/path/to/config.txt").
 
+Options:
+--------
+Options can be added to both usages.
+
+   --jobs N, -j N : Parse the files with N worker processes (0 uses one process per CPU).
+                    The default is 1. The sdf.csv file is identical to the one of a serial run.
+   --cache-dir DIR : Directory of the parse cache (default: ~/.cache/sdf_generator). The parsed
+                     form of each file is stored there, keyed by the file content and the parser
+                     version, so unchanged files are not parsed again.
+   --cache-size MB : Size limit of the parse cache, least recently used entries are removed
+                     above it (default: 512).
+   --no-cache      : Disable the parse cache.
+   --profile       : Report the wall time and the number of calls of each stage (preprocessing, parsing,
+                     resolution, csv writing, ...), the slowest files and the match counts of the regular
+                     expressions, and write them to <output>.profile.json. The files are parsed in the main
+                     process (--jobs is ignored). Without --profile nothing is instrumented.
+   --profile-top N : Number of files of the slowest files table (default: 10).
+   --profile-file NAME : Also record the calls made for the file NAME with cProfile, the statistics are
+                     written to <output>.NAME.prof (python -m pstats <output>.NAME.prof). Implies --profile.
+   --write-buffer KB : Size of the write buffer of the output file (default: 1024). The output is
+                     written to a temporary file which replaces sdf.csv at the end of the run, so an
+                     interrupted run never leaves a half-written sdf.csv.
+   --incremental   : Only parse the files changed since the previous run (and the files using a
+                     package whose files changed), the rows of the other files are copied from the
+                     previous sdf.csv file. A manifest is kept next to the output (sdf.csv.manifest),
+                     the first run parses every file.
+   --watch         : Keep running and regenerate sdf.csv incrementally each time .vhd files are added,
+                     changed or removed (the files are polled every second, a burst of saves is
+                     processed once). The parsed files stay in memory, only the changed files are
+                     parsed again. The output file is replaced atomically. Stop it with Ctrl+C.
+   --columnar PATH : Also write the signals to a columnar file, with a file_name column instead of the
+                     file_name(...) rows and list columns for the src/dst names. The format is chosen
+                     by the extension: .parquet or .arrow/.feather (Arrow IPC, can be memory mapped),
+                     which require pyarrow, or .npz (NumPy arrays of codes and string tables), which
+                     requires numpy. Not available with --incremental and --watch.
+   --sqlite PATH   : Also write the signals to a SQLite database (tables files, modules, signals and
+                     endpoints, view signal_rows). The .vhd rows of the project (input directory) are
+                     replaced, the other projects and languages are kept, so the Verilog and VHDL generators and
+                     the batch mode can fill one shared database. Not available with --incremental
+                     and --watch.
+   --hierarchy PATH : Also write the design hierarchy graph (modules, instances and the nets bound to
+                     their ports, in integer arrays) to PATH. It is analysed without re-parsing with
+                     python sdf_hierarchy.py PATH [--top] [--unused [TOP]] [--undefined] [--fanout N]
+                     [--instances MODULE]. The ports bound by an instance are sized with its generic map
+                     overrides.
+                     Not available with --incremental and --watch.
+
 Configuration File:
 -------------------
 The configuration file must be written in the following format to ensure proper functionality:
@@ -96,6 +169,8 @@ This format allows the user to define:
 Notes:
 ------
 - To modify the default configuration file, update the `default_config_file` variable in the script.
+- The size column is evaluated with the default values of the generic and constant declarations of each entity
+  (e.g. (WIDTH-1 downto 0) is 8 when WIDTH is 8), a size which still depends on other names stays symbolic.
 - Ensure that the configuration file is formatted correctly to avoid processing errors.
 """)
     
@@ -105,6 +180,108 @@ def remove_comments(vhdl_code):
     code = re.sub(r'--.*', '', vhdl_code)
     return code
 
+design_unit_pattern = re.compile(r'''
+      (?P<open>\()|(?P<close>\))|(?P<semicolon>;)
+    | \b(?=[abcefip])(?:
+          entity\s+(?P<entity>\w+)\s+is\b
+        | architecture\s+(?P<architecture>\w+)\s+of\s+\w+\s+is\b
+        | package\s+(?:body\s+)?(?P<package>\w+)\s+is\b
+        | end\b(?:\s+(?P<end_kind>\w+))?(?P<end>)
+        | (?P<keyword>component|function|procedure|process|begin|is|port\s+map)\b)''', re.IGNORECASE | re.VERBOSE)
+unit_end_kinds = {'component', 'process', 'function', 'procedure', 'entity', 'architecture', 'package'}
+non_unit_ends = {'if', 'loop', 'case', 'generate', 'record', 'units', 'block', 'protected', 'for'}
+
+# Close the innermost open unit of one of the kinds (and the units opened inside it), return the closed unit or None
+def close_unit(open_units, kinds) :
+    for i in range(len(open_units)-1, -1, -1) :
+        if open_units[i][0] in kinds :
+            unit = open_units[i]
+            del open_units[i:]
+            return unit
+    return None
+
+# Split the code (without comments) into design units in one pass : [[kind,name,start,end],...] in the order of their start
+# kind is entity, architecture, package, component, function, procedure, process or instance (a port map), code[start:end] is the source of the unit
+def scan_design_units(vhdl_code) :
+    units = []
+    open_units = []
+    closing_unit = None # Unit closed by an end keyword, its end is the next ';'
+    pending_subprogram = None # Function or procedure which is only a declaration until its 'is' is found
+    pending_instance = None # Instance which ends at the next ';'
+    statement_start = 0
+    depth = 0 # Parenthesis depth, the ';' of the port and parameter lists do not end a statement
+    code_end = len(vhdl_code)
+    for match in design_unit_pattern.finditer(vhdl_code) :
+        token = match.lastgroup
+        if token == 'open' :
+            depth += 1
+        elif token == 'close' :
+            if depth > 0 :
+                depth -= 1
+        elif depth > 0 :
+            continue
+        elif token == 'semicolon' :
+            if pending_subprogram is not None :
+                units.remove(pending_subprogram) # Declaration without body (e.g. in a package)
+                pending_subprogram = None
+            if pending_instance is not None :
+                pending_instance[3] = match.end()
+                pending_instance = None
+            if closing_unit is not None :
+                closing_unit[3] = match.end()
+                closing_unit = None
+            statement_start = match.end()
+        elif token in ('entity', 'architecture', 'package') :
+            unit = [token, match.group(token), match.start(), code_end]
+            units.append(unit)
+            open_units.append(unit)
+            statement_start = match.end()
+        elif token == 'end' :
+            end_kind = (match.group('end_kind') or '').lower()
+            if end_kind in unit_end_kinds :
+                closing_unit = close_unit(open_units, [end_kind])
+            elif end_kind not in non_unit_ends : # end [name];
+                closing_unit = close_unit(open_units, ['entity', 'architecture', 'package', 'function', 'procedure'])
+        else :
+            keyword = match.group('keyword').lower()
+            if keyword == 'begin' :
+                statement_start = match.end()
+            elif keyword == 'is' :
+                if pending_subprogram is not None :
+                    open_units.append(pending_subprogram)
+                    pending_subprogram = None
+            elif keyword == 'process' :
+                unit = ['process', None, statement_start, code_end]
+                units.append(unit)
+                open_units.append(unit)
+            elif keyword == 'component' :
+                if not vhdl_code[statement_start:match.start()].rstrip().endswith(':') : # Not an instance (label : component name port map)
+                    unit = ['component', None, match.start(), code_end]
+                    units.append(unit)
+                    open_units.append(unit)
+            elif keyword in ('function', 'procedure') :
+                pending_subprogram = [keyword, None, match.start(), code_end]
+                units.append(pending_subprogram)
+            elif pending_instance is None : # port map
+                pending_instance = ['instance', None, statement_start, code_end]
+                units.append(pending_instance)
+    return units
+
+# Return the source of the units of the given kinds : [unit_code,...]
+def unit_sources(vhdl_code, units, kinds) :
+    return [vhdl_code[start:end] for kind, name, start, end in units if kind in kinds]
+
+# Return the source outside of the entities, architectures and packages (library and use clauses) : [code,...]
+def context_sources(vhdl_code, units) :
+    sources = []
+    position = 0
+    for kind, name, start, end in units :
+        if kind in ('entity', 'architecture', 'package') and start >= position :
+            sources.append(vhdl_code[position:start])
+            position = end
+    sources.append(vhdl_code[position:])
+    return sources
+
 # Extract the entity name from VHDL code
 def find_entity_name(vhdl_code):
     entity_pattern = r'\bentity\s+(\w+)\s+is\b'
@@ -112,34 +289,22 @@ def find_entity_name(vhdl_code):
     return match.group(1) if match else None
 
 
-# Return the size of the signal in bits based on its type (Note: Generic names in the signal type are not replaced by assigned values) 
-def signal_type_to_size(signal_type):
-    size_pattern = r'(?:std_logic_vector|std_ulogic_vector|unsigned)\s*\(\s*(\d+)\s*(?:-\s*(\d+))?\s*downto\s*(\d+)\s*\)'
-    size_pattern_generic = r'(?:std_logic_vector|std_ulogic_vector|unsigned)\s*\(\s*((?:\w+)|(?:\(.*?\)))\s*(?:-\s*(\d+))?\s*(?:-\s*(\d+))?\s*downto\s*(\d+)\s*\)'
-    size_pattern_range = r'(?:std_logic_vector|std_ulogic_vector|unsigned)\s*\(\s*(\w+)\'range\s*\)'
-    integer_pattern = r'integer(.*?)'
-    if ((signal_type.strip().lower()=='std_logic')|(signal_type.strip().lower()=='std_ulogic')) :
-        signal_size = '1'
-    elif(signal_type.strip().lower() == 'byte') : 
-        signal_size = '8'
-    elif (match:=re.search(integer_pattern,signal_type,re.DOTALL | re.IGNORECASE)):
-        signal_size = '32'
-    elif (match:=re.search(size_pattern,signal_type,re.DOTALL | re.IGNORECASE)):
-        signal_size = str(int(match.group(1))-(int(match.group(2)) if match.group(2) is not None else 0)-int(match.group(3))+1)
-    elif (match:=re.search(size_pattern_generic,signal_type,re.DOTALL | re.IGNORECASE)) :
-        if((-(int(match.group(2)) if match.group(2) is not None else 0)-(int(match.group(3)) if match.group(3) is not None else 0)+1-int(match.group(4)))==0) :
-            signal_size = match.group(1)
-        else : 
-            signal_size = match.group(1)+str(1-(int(match.group(2)) if match.group(2) is not None else 0)-(int(match.group(3)) if match.group(3) is not None else 0)-int(match.group(4)))
-    elif(match:=re.search(size_pattern_range,signal_type,re.DOTALL | re.IGNORECASE)) :
-        signal_size = f"{match.group(1)} size"
-    else :
-        signal_size = 'unknown' 
-        if(DEBUG) :
-            # When debug mode is enabled
-            log_warning(f'size of {signal_type} is unknown')
+# Return the size of the signal in bits based on its type (see sdf_width.signal_width) : the generic and constant names are replaced by their
+# value in constants, and the size of x'range by the size of the signal or port x in object_sizes ({name : size})
+def signal_type_to_size(signal_type, constants=None, object_sizes=None):
+    signal_size = sdf_width.signal_width(signal_type,constants)
+    if object_sizes and signal_size.endswith(' size') :
+        object_size = object_sizes.get(signal_size[:-len(' size')].lower())
+        if object_size not in (None, 'unknown') :
+            signal_size = object_size
+    if signal_size == 'unknown' and DEBUG :
+        log_warning(f'size of {signal_type} is unknown')
     return signal_size
 
+# Return the sizes of the ports of an entity for their x'range references (see signal_type_to_size) : {port_name : size}
+def port_object_sizes(ports, constants=None) :
+    return {port_name : signal_type_to_size(port_type,constants) for port_name, direction, port_type in ports}
+
 # Return a list of functions, each element containing the function name and its code 
 def extract_process(vhdl_code) : 
     
@@ -161,13 +326,13 @@ def extract_functions(vhdl_code) :
     return function_list
 
 # Return a list with [variable_name, variable_type, variable_size, process/function/instance name]
-def extract_variables(list) :
-    variable_pattern = r'variable\s*(\w+)\s*:\s*([\w\s\(\)\'\+\-]+);?'
+def extract_variables(list, constants=None, object_sizes=None) :
+    variable_pattern = r'variable\s*(\w+)\s*:\s*([\w\s\(\)\'\+\-\*/]+);?'
     variables = []
     for i in range(len(list)) :
         matches = re.findall(variable_pattern,list[i][1],re.DOTALL|re.IGNORECASE)
         for j in range(len(matches)) :
-            variables.append([matches[j][0],matches[j][1],signal_type_to_size(matches[j][1]),list[i][0]])
+            variables.append([matches[j][0],matches[j][1],signal_type_to_size(matches[j][1],constants,object_sizes),list[i][0]])
     return variables
                          
 
@@ -184,7 +349,7 @@ def extract_component_ports(vhdl_code):
         port_declarations = []
         port_lines = port_lines.split(';')
         for line in port_lines :
-            multiple_port_pattern    = r'((?:\w+\s*,\s*)*\w+)\s*:\s*(\bin\b|\bout\b|inout)\s*([\w\s\(\)\'+-]+)\s*'
+            multiple_port_pattern    = r'((?:\w+\s*,\s*)*\w+)\s*:\s*(\bin\b|\bout\b|inout)\s*([\w\s\(\)\'+*/-]+)\s*'
             result = re.search(multiple_port_pattern,line,re.IGNORECASE|re.DOTALL)
             if result :
                 name_list = result.group(1).split(',')
@@ -206,10 +371,32 @@ def extract_component_ports(vhdl_code):
         components.append(component)
     return components
 
+# Return the generics of an entity : [[generic_name,default_value,True],...] (see sdf_parameters), default_value is '' without default value
+def extract_generics(vhdl_code) :
+    generics = []
+    match = re.search(r'\bgeneric\s*\(', vhdl_code, re.IGNORECASE)
+    if match :
+        generic_lines = sdf_width.parenthesized(vhdl_code, match.end()-1) or ''
+        for line in generic_lines.split(';') :
+            result = re.match(r'\s*(?:constant\s+)?((?:\w+\s*,\s*)*\w+)\s*:\s*([^;]*?)(?::=\s*(.*?))?\s*$', line, re.IGNORECASE|re.DOTALL)
+            if result :
+                for generic_name in result.group(1).split(',') :
+                    generics.append([generic_name.strip().lower(), (result.group(3) or '').strip(), True])
+    return generics
+
+# Return the constants declared with a value : [[constant_name,value,False],...] (see sdf_parameters)
+def find_constants(vhdl_code) :
+    constants = []
+    constant_pattern = r'\bconstant\s+((?:\w+\s*,\s*)*\w+)\s*:[^;]*?:=\s*([^;]*);'
+    for names, value in re.findall(constant_pattern, vhdl_code, re.IGNORECASE|re.DOTALL) :
+        for constant_name in names.split(',') :
+            constants.append([constant_name.strip().lower(), value.strip(), False])
+    return constants
+
 # Return a list of ports: [[port_name, direction (in/out/inout), type],...]
 def extract_module_ports(vhdl_code):
 
-    port_pattern = r'entity\s+\w+\s+is(?:.*?)port\s*\((.*?)end\s+'
+    port_pattern = r'entity\s+\w+\s+is(?:.*?)port\s*\((.*?)\bend\b'
     match = re.search(port_pattern, vhdl_code, re.IGNORECASE | re.DOTALL)
 
     ports = []
@@ -218,7 +405,7 @@ def extract_module_ports(vhdl_code):
         port_lines = match.group(1)
         port_lines = port_lines.split(';')
         for line in port_lines :
-            multiple_port_pattern    = r'((?:\w+\s*,\s*)*\w+)\s*:\s*(\bin\b|\bout\b|inout)\s*([\w\s\(\)\'+-]+)\s*'
+            multiple_port_pattern    = r'((?:\w+\s*,\s*)*\w+)\s*:\s*(\bin\b|\bout\b|inout)\s*([\w\s\(\)\'+*/-]+)\s*'
             result = re.search(multiple_port_pattern,line,re.IGNORECASE|re.DOTALL)
             if result :
                 name_list = result.group(1).split(',')
@@ -238,34 +425,51 @@ def extract_module_ports(vhdl_code):
     return ports
 
 
-# Extract internal signals for each module code section
-def extract_internal_signals(vhdl_code,port_map_list, entity_name):
-    signals = []
+# Index the port connections of the instances by net : {net_name : [instance_src_name,module_src_name,instance_dst_name,module_dst_name],...}
+def build_net_index(port_map_list) :
+    net_index = {}
+    for instance, component, ports  in port_map_list :
+        for port in ports : 
+            connections = net_index.get(port[1])
+            if connections is None :
+                connections = net_index[port[1]] = [[],[],[],[]]
+            if ((port [2] == 'in') | (port [2] == 'inout')) : 
+                connections[2].append(instance)
+                connections[3].append(component)
+            if ((port [2] == 'out' )| (port [2] == 'inout')) :
+                connections[0].append(instance)
+                connections[1].append(component)
+    return net_index
+
+# Return the internal signal declarations : [[signal_name,signal_type,signal_size],...] (see signal_type_to_size), the size of each signal
+# is added to object_sizes
+def find_signal_declarations(vhdl_code, constants=None, object_sizes=None) :
     matches = []    
-    multiple_signal_pattern = r'signal\s+((?:\w+\s*,\s*)*\w+)\s*:\s*([\w\s\(\)\'+-]+)\s*;?'
+    multiple_signal_pattern = r'signal\s+((?:\w+\s*,\s*)*\w+)\s*:\s*([\w\s\(\)\'+*/-]+)\s*;?'
     matches_2 = re.findall(multiple_signal_pattern,vhdl_code,re.IGNORECASE|re.DOTALL)
     for matche_2 in matches_2 : 
         matche_2_list = matche_2[0].split(',')
         for j in range (len(matche_2_list)) :
-            matches.append([matche_2_list[j],matche_2[1]])
+            signal_size = signal_type_to_size(matche_2[1],constants,object_sizes)
+            if object_sizes is not None :
+                object_sizes.setdefault(matche_2_list[j].strip().lower(),signal_size)
+            matches.append([matche_2_list[j],matche_2[1],signal_size])
+    return matches
 
-    
-    for signal_name, signal_type in matches: 
+# Extract internal signals for each module code section
+def extract_internal_signals(signal_declarations,net_index, entity_name):
+    signals = []
+    for signal_name, signal_type, signal_size in signal_declarations: 
         instance_scr_name = []
         instance_dst_name = []
         module_dst_name = []
         module_src_name = []
-        signal_size = signal_type_to_size(signal_type)
-        for instance, component, ports  in port_map_list :
-            for port in ports : 
-                if (port[1]==signal_name.strip().lower()) :
-                    if ((port [2] == 'in') | (port [2] == 'inout')) : 
-                        instance_dst_name.append(instance)
-                        module_dst_name.append(component)
-                    
-                    if ((port [2] == 'out' )| (port [2] == 'inout')) :
-                        instance_scr_name.append(instance)
-                        module_src_name.append(component)
+        connections = net_index.get(signal_name.strip().lower())
+        if connections :
+            instance_scr_name.extend(connections[0])
+            module_src_name.extend(connections[1])
+            instance_dst_name.extend(connections[2])
+            module_dst_name.extend(connections[3])
         if (instance_dst_name == []) : 
             instance_dst_name.append(entity_name) 
             module_dst_name.append(entity_name)
@@ -276,31 +480,27 @@ def extract_internal_signals(vhdl_code,port_map_list, entity_name):
     
     return signals
 
-# Extract signals from module ports for each module code section
-def extract_external_signals (module, port_map_list,entity_name) :
+# Extract signals from module ports for each module code section, the sizes of x'range are the ones of the ports in object_sizes (see port_object_sizes)
+def extract_external_signals (module, net_index,entity_name,constants=None,object_sizes=None) :
     signals = []
     for port in module :
         instance_scr_name = []
         instance_dst_name = []
         module_dst_name = []
         module_src_name = []
-        signal_size = signal_type_to_size(port[2])
+        signal_size = signal_type_to_size(port[2],constants,object_sizes)
         if((port[1] == 'in') | (port[1] == 'inout')) :
             module_src_name.append('input')
             instance_scr_name.append('input')
         if ((port[1] == 'out') | (port[1] == 'inout')) : 
             module_dst_name.append('output')
             instance_dst_name.append('output')
-        for instance, component, ports  in port_map_list :
-            for port_a in ports : 
-                if (port_a[1]==port[0]) :
-                    if ((port_a [2] == 'in') | (port_a [2] == 'inout')) : 
-                        instance_dst_name.append(instance)
-                        module_dst_name.append(component)
-                    
-                    if ((port_a [2] == 'out' )| (port_a [2] == 'inout')) :
-                        instance_scr_name.append(instance)
-                        module_src_name.append(component)
+        connections = net_index.get(port[0])
+        if connections :
+            instance_scr_name.extend(connections[0])
+            module_src_name.extend(connections[1])
+            instance_dst_name.extend(connections[2])
+            module_dst_name.extend(connections[3])
         if (instance_dst_name == []) : 
             instance_dst_name.append(entity_name) 
             module_dst_name.append(entity_name)
@@ -319,13 +519,22 @@ def dir_finding(component_name,port_name,component_list) :
                     return port[1]
                 
 
-# Return a list of component instance : [[instance,component,[port,signal,dir(in/out/inout)],...],...]
-def extract_port_map(vhdl_code, component_list) :
-    port_map_pattern = r'(\w+)\s*:\s*(\w+)\s+(?:generic\s+map\s*\(.*?\)\s*)?port\s+map\s*\((.*?)\)\s*;'
+# Return a list of component instance : [[instance,component,[[port,signal],...],overrides],...] (port is None when the port map is positional)
+# overrides is the generic map : [[generic,value],...] (generic is the position of the value when the generic map is positional)
+def find_port_maps(vhdl_code) :
+    port_map_pattern = r'(\w+)\s*:\s*(\w+)\s+(?:generic\s+map\s*\((.*?)\)\s*)?port\s+map\s*\((.*?)\)\s*;'
 
     matches = re.findall(port_map_pattern, vhdl_code, re.IGNORECASE | re.DOTALL)
     port_maps = []
-    for instance_name, component_name, ports in matches:
+    for instance_name, component_name, generics, ports in matches:
+        overrides = []
+        generic_lines = generics.split(',') if generics.strip() else []
+        for i in range(len(generic_lines)):
+            if '=>' in generic_lines[i] :
+                generic, value = generic_lines[i].split('=>',maxsplit=1)
+                overrides.append([generic.strip().lower(),value.strip()])
+            else :
+                overrides.append([i,generic_lines[i].strip()])
         port_mapping = []
         port_lines = ports.split(',')
         for i in range(len(port_lines)):
@@ -333,132 +542,527 @@ def extract_port_map(vhdl_code, component_list) :
                 port, signal_full = [item.strip().lower() for item in port_lines[i].split('=>',maxsplit=1)]
                 
             else : # Case where the port map is assigned in this manner: port map (clk, in_a, out_b, ...)"
-                signal_full = port_lines[i]
-                for component_name_i, component_ports in component_list : 
-                    if (component_name_i==component_name) : 
-                        port = component_ports[i][0] # Use only the order of the component's ports to associate them with signals"
-                        break
+                port, signal_full = None, port_lines[i]
             signal_match = re.match(r'(\w+)', signal_full)
             signal = signal_match.group(1) if signal_match else signal_full
-            port_mapping.append([port,signal.strip().lower(),dir_finding(component_name.lower(),port,component_list)])
+            port_mapping.append([port,signal.strip().lower()])
         port_maps.append([
             instance_name.lower(),
             component_name.lower(),
-            port_mapping 
+            port_mapping,
+            overrides
         ])
     return port_maps
 
-def find_package (vhdl_code,directory_path):
+# Resolve the ports of the instances found by find_port_maps : [[instance,component,[port,signal,dir(in/out/inout)],...],...]
+def extract_port_map(port_maps, component_list) :
+    port_map_list = []
+    for instance_name, component_name, ports, overrides in port_maps:
+        port_mapping = []
+        for i in range(len(ports)):
+            port, signal = ports[i]
+            if port == None :
+                port = ''
+                for component_name_i, component_ports in component_list : 
+                    if (component_name_i==component_name) : 
+                        if i < len(component_ports) :
+                            port = component_ports[i][0] # Use only the order of the component's ports to associate them with signals"
+                        break
+            port_mapping.append([port,signal,dir_finding(component_name,port,component_list)])
+        port_map_list.append([
+            instance_name,
+            component_name,
+            port_mapping 
+        ])
+    return port_map_list
+
+# Return the names of the packages used by the code (library x; use x.package_name.all;)
+def find_package_names(vhdl_code) :
     library_pattern = r'library\s*\w+\s*;\s*use\s*\w+\.(\w+)\.all;'
-    matches = re.findall(library_pattern,vhdl_code,re.DOTALL|re.IGNORECASE)
+    return re.findall(library_pattern,vhdl_code,re.DOTALL|re.IGNORECASE)
+
+# Index the package files of the directory once : {package_name : [file_path,...]} (a package is looked up in package_name.vhd files)
+def build_package_index(directory_path) :
+    package_index = {}
+    for root, dirs, files in os.walk(directory_path):
+        dirs[:] = [d for d in dirs if d not in package_excluded_directories]   
+        for file_name in files:
+            if file_name.lower().endswith('.vhd'):
+                package_index.setdefault(file_name.lower()[:-len('.vhd')],[]).append(os.path.join(root, file_name))
+    return package_index
+
+# Set the package index used by find_package for the whole run
+def set_package_index(index) :
+    global package_index, package_components
+    package_index = index
+    package_components = {}
+
+# Return the components declared in the packages, the components of each package are extracted once per run
+def find_package (package_names,cache_directory=None):
     components=[]
-    for match in matches :
-        for root, dirs, files in os.walk(directory_path):
-                dirs[:] = [d for d in dirs if d not in ['bench', 'sim', 'testbench']]   
-                for file_name in files:
-                    if (file_name.lower()==(match.lower()+'.vhd')):
-                        file_path = os.path.join(root, file_name)
-                        try : 
-                            with open(file_path, "r") as file:
-                                vhdl_code_full = file.read()
-                                vhdl_code = remove_comments(vhdl_code_full) 
-                                components = components + extract_component_ports(vhdl_code)  
-                        except FileNotFoundError:
-                            print(f"Error: File '{file_path}' not found.")
+    for match in package_names :
+        package_name = match.lower()
+        if package_name not in package_components :
+            package_components[package_name] = []
+            for file_path in package_index.get(package_name,[]) :
+                try : 
+                    package_components[package_name] = package_components[package_name] + parse_file(file_path,cache_directory)[1]
+                except FileNotFoundError:
+                    print(f"Error: File '{file_path}' not found.")
+        components = components + package_components[package_name]
     return components
 
 
-def convert_to_csv_string(value): # (eg : [a,b,c] => "a,b,c")
-    if isinstance(value, (list, tuple)):
-        return ",".join(map(str, value))  
-    return str(value)
+# Return the signal records of a parsed vhdl file (see parse_code) : [SignalRecord,...] (see sdf_records) or None if no entity is found
+# The sizes are the ones of the default generic values, the generic maps of the instances are given to the hierarchy graph
+def extract_signal_records(file_name,parsed_file,components_list_extended) :
+    entity_name, components, module, port_maps, signal_declarations, variables, package_names, parameters = parsed_file
+    if (entity_name==None) :
+        return None
+    constants = sdf_parameters.module_constants(parameters)
+    component_list = components+components_list_extended
+    port_map_list = extract_port_map(port_maps,component_list)
+    if hierarchy_graph is not None :
+        hierarchy_graph.add_module(file_name,entity_name,port_map_list,parameters,module,[sdf_parameters.evaluate_overrides(port_map[3],constants) for port_map in port_maps])
+    net_index = build_net_index(port_map_list)
+    external_signals = extract_external_signals(module,net_index, entity_name,constants,port_object_sizes(module,constants))
+    internal_signals = extract_internal_signals(signal_declarations,net_index, entity_name)
+    signal_records = []
+    for signal in external_signals:
+        signal_records.append(sdf_records.SignalRecord(file_name,entity_name,signal[0],signal[1],signal[2],signal[3],signal[4],signal[5],signal[6]))
+    for signal in internal_signals:
+        signal_records.append(sdf_records.SignalRecord(file_name,"Internal",signal[0],signal[1],signal[2],signal[3],signal[4],signal[5],signal[6]))
+    for variable in variables : 
+        signal_records.append(sdf_records.SignalRecord(file_name,"Variable",variable[0],variable[1],variable[2],(variable[3],),(variable[3],),(variable[3],),(variable[3],)))
+    return signal_records
 
-def write_signals_to_csv(input_file_name,output_file_path, vhdl_code,components_list_extended):
-    if (find_entity_name(vhdl_code)==None) :
+def write_signals_to_csv(input_file_name,writer, signal_records):
+    if (signal_records==None) :
         if(DEBUG) :
             print(f"Warning : No entity found in {input_file_name}")
     else :
-        entity_name = find_entity_name(vhdl_code)
-        component_list = extract_component_ports(vhdl_code)+components_list_extended
-        module = extract_module_ports(vhdl_code)
-        port_map_list = extract_port_map(vhdl_code,component_list)
-        external_signals = extract_external_signals(module,port_map_list, entity_name)
-        internal_signals = extract_internal_signals(vhdl_code,port_map_list, entity_name)
-        variables = extract_variables(extract_functions(vhdl_code)+extract_process(vhdl_code))
-        with open(output_file_path, mode='a', newline='') as file_csv:
-            writer = csv.writer(file_csv)
-            writer = csv.writer(file_csv,delimiter= ';')
-            writer.writerow([f"file_name({input_file_name})"])
-            writer.writerow(["component", "signal_name", "type", "size","instance src", "component_src", "instance_dst", "component_dst"])
-            
-            for signal in external_signals:
-                writer.writerow([
-                entity_name,
-                signal[0],
-                signal[1],
-                signal[2],
-                convert_to_csv_string(signal[3]),
-                convert_to_csv_string(signal[4]),
-                convert_to_csv_string(signal[5]),
-                convert_to_csv_string(signal[6])
-            ])
-            for signal in internal_signals:
-                writer.writerow([
-                    "Internal",
-                    signal[0],
-                    signal[1],
-                    signal[2],
-                    convert_to_csv_string(signal[3]),
-                    convert_to_csv_string(signal[4]),
-                    convert_to_csv_string(signal[5]),
-                    convert_to_csv_string(signal[6])
-                ])
-            for variable in variables : 
-                writer.writerow([
-                    "Variable",
-                    variable[0],
-                    variable[1],
-                    variable[2],
-                    variable[3],
-                    variable[3],
-                    variable[3],
-                    variable[3]
-                ])
+        write_file_block(writer,input_file_name,signal_records)
+
+# Write the block of a file (file name row, header row and the rows of its signal records) with a csv writer
+def write_file_block(writer, input_file_name, signal_records) :
+    writer.writerow([f"file_name({input_file_name})"])
+    writer.writerow(sdf_records.csv_header)
+    writer.writerows(map(sdf_records.csv_row, signal_records))
 
 # Process all signals extractions in vhdl file       
 def extract (input_file_name,input_file_path,output_file_path) : 
     try:
         with open(input_file_path, "r") as file:
             vhdl_code_full = file.read()
-            vhdl_code = remove_comments(vhdl_code_full)
-            write_signals_to_csv(input_file_name,output_file_path, vhdl_code) 
+        with open(output_file_path, mode='a', newline='') as file_csv:
+            write_signals_to_csv(input_file_name,csv.writer(file_csv,delimiter= ';'), extract_signal_records(input_file_name,parse_code(vhdl_code_full),[])) 
     except FileNotFoundError:
         print(f"Error: File '{input_file_path}' not found.")
 
-def process_files_in_directory(directory_path, output_txt_path, excluded_directories,excluded_files):
+# Parse the code of a .vhd file : return [entity_name,components,ports,port_maps,signal_declarations,variables,package_names,parameters] (entity_name is None
+# if no entity is found), parameters are the generics of the entity and the constants of the file (see sdf_parameters), the sizes use their default values
+# The strings of the parsed form are interned (see sdf_records.intern_strings)
+def parse_code(vhdl_code_full) :
+    vhdl_code = remove_comments(vhdl_code_full)
+    units = scan_design_units(vhdl_code) # Each extractor only reads the units where its declarations can be found
+    entities = unit_sources(vhdl_code, units, ['entity'])
+    entity_name = find_entity_name(entities[0]) if entities else None
+    components = [component for code in unit_sources(vhdl_code, units, ['component']) for component in extract_component_ports(code)]
+    package_names = [package_name for code in context_sources(vhdl_code, units) for package_name in find_package_names(code)]
+    if (entity_name==None) :
+        return sdf_records.intern_strings([None,components,[],[],[],[],package_names,[]])
+    functions = [function for code in unit_sources(vhdl_code, units, ['function']) for function in extract_functions(code)]
+    processes = [process for code in unit_sources(vhdl_code, units, ['process']) for process in extract_process(code)]
+    parameters = extract_generics(entities[0]) + [constant for code in unit_sources(vhdl_code, units, ['architecture', 'package']) for constant in find_constants(code)]
+    constants = sdf_parameters.module_constants(parameters)
+    ports = extract_module_ports(entities[0])
+    object_sizes = port_object_sizes(ports,constants)
+    return sdf_records.intern_strings([
+        entity_name,
+        components,
+        ports,
+        [port_map for code in unit_sources(vhdl_code, units, ['instance']) for port_map in find_port_maps(code)],
+        [signal for code in unit_sources(vhdl_code, units, ['entity', 'architecture', 'package']) for signal in find_signal_declarations(code,constants,object_sizes)],
+        extract_variables(functions+processes,constants,object_sizes),
+        package_names,
+        parameters])
+
+# Read and parse a .vhd file once, the parsed form (and its warnings) is reused from the cache directory when the content of the file is unchanged
+def parse_file(file_path, cache_directory=None) :
+    global captured_warnings
+    vhdl_code_full, content_hash = sdf_cache.read_source(file_path,bool(cache_directory))
+    key = None
+    cached = None
+    if cache_directory :
+        key = sdf_cache.cache_key(content_hash,parser_version)
+        cached = sdf_cache.load(cache_directory,key)
+    if cached is None :
+        outer_warnings, captured_warnings = captured_warnings, []
+        try :
+            parsed_file = parse_code(vhdl_code_full)
+        finally :
+            warnings, captured_warnings = captured_warnings, outer_warnings
+        cached = [parsed_file,warnings]
+        if key :
+            sdf_cache.store(cache_directory,key,cached)
+    for warning in cached[1] :
+        log_warning(warning)
+    return cached[0]
+
+# Run parse_file in a worker : return [parsed_file,warnings] (parsed_file is None if the file is not found), the warnings are logged by the main process
+def parse_file_task(task) :
+    global captured_warnings
+    file_path, cache_directory = task
+    captured_warnings = []
+    try:
+        parsed_file = parse_file(file_path,cache_directory)
+    except FileNotFoundError:
+        parsed_file = None
+    warnings, captured_warnings = captured_warnings, None
+    return [parsed_file,warnings]
+
+# Return False if the file has no entity and no component declaration, without decoding it (package files of constants and types, ...) :
+# it is not parsed (see skipped_parse_result), the files are counted in prefilter_counts
+def prefilter_file(file_path) :
+    has_design_unit = sdf_cache.contains_keywords(file_path,design_unit_keywords)
+    prefilter_counts[0] += 1
+    prefilter_counts[1] += not has_design_unit
+    return has_design_unit
+
+# Return the parse result of a file skipped by prefilter_file (see parse_file_task), its parsed form is the one of a file without entity
+def skipped_parse_result() :
+    return [[None,[],[],[],[],[],[],[]],[]]
+
+# Yield the parse results of the files in the order of parse_flags : the next one of parse_results for a parsed file, skipped_parse_result()
+# for a file skipped by prefilter_file
+def merge_skipped_files(parse_flags, parse_results) :
+    for parsed in parse_flags :
+        yield next(parse_results) if parsed else skipped_parse_result()
+
+# Parse the files with a pool of jobs processes : yield [parsed_file,warnings] for each file in the order of file_paths
+def parse_files(file_paths, jobs=1, cache_directory=None) :
+    parse_flags = [prefilter_file(file_path) for file_path in file_paths]
+    tasks = [(file_path,cache_directory) for file_path,parsed in zip(file_paths,parse_flags) if parsed]
+    if jobs > 1 and len(tasks) > 1 :
+        with multiprocessing.Pool(min(jobs,len(tasks))) as pool :
+            yield from merge_skipped_files(parse_flags,pool.imap(parse_file_task, tasks, chunksize=max(1,len(tasks)//(jobs*4))))
+    else :
+        yield from merge_skipped_files(parse_flags,map(parse_file_task, tasks))
+
+# Return the .vhd files of the directory in os.walk order : [[file_name,file_path],...]
+def find_files(directory_path, excluded_directories, excluded_files) :
+    file_list = []
+    for root, dirs, files in os.walk(directory_path):
+        dirs[:] = [d for d in dirs if d not in excluded_directories]
+        files[:] = [f for f in files if f not in excluded_files]     
+        for file_name in files:
+            if file_name.lower().endswith('.vhd'):                                                           
+                file_list.append([file_name,os.path.join(root, file_name)])
+    return file_list
+
+# Walk the directory once : return the .vhd files (see find_files) and the package index of the directory (see build_package_index), the files are
+# not listed in the excluded directories, the packages are not indexed in package_excluded_directories, a directory excluded for both is not walked
+def find_files_and_packages(directory_path, excluded_directories, excluded_files) :
+    file_list = []
+    package_index = {}
+    walked_directories = {directory_path : [True, True]} # {directory : [files are listed,packages are indexed]}
+    for root, dirs, files in os.walk(directory_path):
+        files_listed, packages_indexed = walked_directories.pop(root)
+        kept_dirs = []
+        for d in dirs :
+            flags = [files_listed and d not in excluded_directories, packages_indexed and d not in package_excluded_directories]
+            if flags[0] or flags[1] :
+                walked_directories[os.path.join(root, d)] = flags
+                kept_dirs.append(d)
+        dirs[:] = kept_dirs
+        for file_name in files :
+            if file_name.lower().endswith('.vhd') :
+                if packages_indexed :
+                    package_index.setdefault(file_name.lower()[:-len('.vhd')],[]).append(os.path.join(root, file_name))
+                if files_listed and file_name not in excluded_files :
+                    file_list.append([file_name,os.path.join(root, file_name)])
+    return file_list, package_index
+
+# Resolve the packages and the port maps of the parsed files (parse_results in the order of file_list)
+# Yield [file_name,signal_records] for each parsed file (signal_records is None if no entity is found)
+def resolve_parsed_files(file_list, parse_results, directory_path, cache_directory=None) :
+    sdf_records.new_name_table()
+    set_package_index(build_package_index(directory_path))
+    for (file_name,file_path),(parsed_file,warnings) in zip(file_list,parse_results) :
+        for warning in warnings :
+            log_warning(warning)
+        if parsed_file == None :
+            print(f"Error: File '{file_path}' not found.")
+        elif parsed_file[0] == None :
+            yield [file_name,None]
+        else :
+            components_list_extended = find_package(parsed_file[6],cache_directory)
+            yield [file_name,extract_signal_records(file_name,parsed_file,components_list_extended)]
+
+# Return the record sinks of a project : columnar file (see sdf_columnar) and SQLite database (see sdf_sqlite), each one receives the signal records of the files with add and is closed at the end
+# (or discarded with discard when the run is interrupted)
+def open_record_sinks(project, columnar_path=None, database_path=None) :
+    record_sinks = []
+    if columnar_path :
+        record_sinks.append(sdf_columnar.ColumnarTable(columnar_path))
+    if database_path :
+        record_sinks.append(sdf_sqlite.SignalDatabase(database_path,project,"vhdl"))
+    return record_sinks
+
+# Write the signals of the parsed files (parse_results in the order of file_list) to the csv file (see sdf_output.CsvSink), and to the record sinks (see open_record_sinks)
+# On Ctrl+C the csv file and the record sinks are discarded (the previous outputs are kept) and KeyboardInterrupt is raised again
+def write_parsed_files(file_list, parse_results, output_txt_path, directory_path, cache_directory=None, record_sinks=()) :
+    file_name = None
+    try :
+        with sdf_output.CsvSink(output_txt_path) as csv_sink:
+            for file_name,signal_records in resolve_parsed_files(file_list,parse_results,directory_path,cache_directory) :
+                write_signals_to_csv(file_name,csv_sink.writer, signal_records) 
+                if signal_records is not None :
+                    for record_sink in record_sinks :
+                        record_sink.add(signal_records)
+    except KeyboardInterrupt :
+        print (f"Signals of file : {file_name} are extacted")
+        for record_sink in record_sinks :
+            record_sink.discard()
+        raise
+    for record_sink in record_sinks :
+        record_sink.close()
+
+# Library API : yield the signal records (see sdf_records.SignalRecord) of a .vhd file, or of the .vhd files of a directory, in the order of the sdf.csv rows
+# The packages are looked up in the directory (or in the directory of the file), e.g. for record in extract_vhdl("rtl/vhdl") : print(record.component, record.signal_name)
+def extract_vhdl(path, excluded_directories=(), excluded_files=(), jobs=1, cache_directory=None) :
+    if os.path.isdir(path) :
+        directory_path = path
+        file_list = find_files(path,list(excluded_directories),list(excluded_files))
+    else :
+        directory_path = os.path.dirname(path) or "."
+        file_list = [[os.path.basename(path),path]]
+    parse_results = parse_files([file_path for file_name,file_path in file_list],jobs,cache_directory)
+    for file_name,signal_records in resolve_parsed_files(file_list,parse_results,directory_path,cache_directory) :
+        if signal_records is not None :
+            yield from signal_records
+
+# Incremental mode : only the files changed since the previous run are parsed again, the blocks of the other files are copied from the previous csv file
+# The files using a package whose files changed (or were added or removed) are parsed again too, since find_package feeds their port directions
+# The byte range of each file block is kept in the manifest of the csv file (see sdf_incremental), without manifest every file is parsed
+# Return the new manifest, it can be given back as manifest to skip reading it from the disk (watch mode)
+# watch_state is the state kept in memory by the watch mode between two regenerations (see watch_directory), None otherwise
+def process_files_incremental(file_list, output_txt_path, directory_path, jobs=1, cache_directory=None, manifest=None, watch_state=None) :
+    global package_components
+    sdf_records.new_name_table()
+    context = [parser_version]
+    manifest = sdf_incremental.load_manifest(output_txt_path,context,manifest) or {'sources' : {}, 'blocks' : []}
+    previous_blocks = {block[1] : block for block in manifest['blocks']} # [file_name,file_path,start,end,{package_name : [package_file_path,...]}]
+    if watch_state is None :
+        set_package_index(build_package_index(directory_path))
+    else :
+        # The components of the packages whose files are unchanged since the previous regeneration are kept
+        set_package_index(watch_state['package_index'])
+        package_states = lambda package_name: [watch_state['snapshot'].get(file_path) for file_path in package_index.get(package_name,[])]
+        package_components = {package_name : components for package_name,(states,components) in watch_state['package_components'].items() if states == package_states(package_name)}
+
+    sources = {}
+    for file_name,file_path in file_list :
+        try :
+            sources[file_path] = sdf_incremental.source_state(file_path,manifest['sources'].get(file_path))
+        except OSError :
+            print(f"Error: File '{file_path}' not found.")
+    changed_files = set(file_path for file_name,file_path in file_list if file_path in sources and (file_path not in previous_blocks or sdf_incremental.source_changed(sources[file_path],manifest['sources'].get(file_path))))
+    for file_name,file_path in file_list :
+        if file_path in sources and file_path not in changed_files :
+            for package_name,package_files in previous_blocks[file_path][4].items() :
+                if package_index.get(package_name,[]) != package_files :
+                    changed_files.add(file_path)
+                for package_file in package_index.get(package_name,[]) :
+                    if package_file not in sources :
+                        try :
+                            sources[package_file] = sdf_incremental.source_state(package_file,manifest['sources'].get(package_file))
+                        except OSError :
+                            continue
+                    if sdf_incremental.source_changed(sources[package_file],manifest['sources'].get(package_file)) :
+                        changed_files.add(file_path)
+    parsed_files = {} # {file_path : parsed_file} of the files parsed in this run
+    parse_paths = [file_path for file_name,file_path in file_list if file_path in changed_files]
+    if watch_state is not None :
+        # The files unchanged since they were parsed (the users of a changed package) are resolved again from their parsed form in memory
+        parsed_files, parse_paths = sdf_incremental.split_kept_files(watch_state['parsed_files'],watch_state['snapshot'],parse_paths)
+    kept_count = len(parsed_files)
+    for file_path,(parsed_file,warnings) in zip(parse_paths,parse_files(parse_paths,jobs,cache_directory)) :
+        for warning in warnings :
+            log_warning(warning)
+        if parsed_file == None :
+            print(f"Error: File '{file_path}' not found.")
+        else :
+            parsed_files[file_path] = parsed_file
+            if watch_state is not None and file_path in watch_state['snapshot'] :
+                watch_state['parsed_files'][file_path] = [watch_state['snapshot'][file_path],parsed_file]
+    if watch_state is None :
+        print(f"Incremental : {len(parsed_files)} of {len(file_list)} files parsed")
+    else :
+        print(f"Incremental : {len(parsed_files)-kept_count} of {len(file_list)} files parsed, {kept_count} resolved again from memory")
+
+    blocks = []
+    # The previous output file is closed before the sink replaces it
+    with sdf_output.CsvSink(output_txt_path) as csv_sink:
+        previous_output = open(output_txt_path,'rb') if manifest['blocks'] else None
+        try :
+            file_csv = csv_sink.file
+            writer = csv_sink.writer
+            for file_name,file_path in file_list :
+                start = file_csv.tell()
+                if file_path in parsed_files :
+                    parsed_file = parsed_files[file_path]
+                    package_files = {}
+                    if parsed_file[0] == None :
+                        write_signals_to_csv(file_name,writer,None)
+                    else :
+                        for package_name in parsed_file[6] :
+                            package_files[package_name.lower()] = package_index.get(package_name.lower(),[])
+                            for package_file in package_files[package_name.lower()] :
+                                if package_file not in sources :
+                                    try :
+                                        sources[package_file] = sdf_incremental.source_state(package_file)
+                                    except OSError :
+                                        pass
+                        write_file_block(writer,file_name,extract_signal_records(file_name,parsed_file,find_package(parsed_file[6],cache_directory)))
+                elif file_path in sources and file_path in previous_blocks :
+                    previous_block = previous_blocks[file_path]
+                    sdf_incremental.copy_block(previous_output,file_csv,previous_block[2],previous_block[3])
+                    package_files = previous_block[4]
+                else :
+                    continue
+                blocks.append([file_name,file_path,start,file_csv.tell(),package_files])
+        finally :
+            if previous_output :
+                previous_output.close()
+    if watch_state is not None :
+        watch_state['parsed_files'] = {file_path : kept_file for file_path,kept_file in watch_state['parsed_files'].items() if file_path in sources}
+        watch_state['package_components'] = {package_name : [package_states(package_name),components] for package_name,components in package_components.items()}
+    return sdf_incremental.store_manifest(output_txt_path,context,sources,blocks)
+
+# Watch mode : regenerate the csv file incrementally each time .vhd files (or package files) are added, changed or removed, until Ctrl+C
+# The manifest (package files and block ranges), the parsed forms of the files and the components of the packages stay in memory between two
+# regenerations : only the changed files are parsed again (even without parse cache), the users of a changed package are resolved again from
+# their parsed form in memory. The directory is walked once per poll (files and package index), a regeneration uses the walk of its snapshot
+# The output is replaced atomically
+def watch_directory(directory_path, output_txt_path, excluded_directories, excluded_files, jobs=1, cache_directory=None, cache_size=sdf_cache.default_cache_size) :
+    walk = [[], {}] # [file_list,package_index] of the last walk
+    def list_files() :
+        walk[:] = find_files_and_packages(directory_path,excluded_directories,excluded_files)
+        return [file_path for file_name,file_path in walk[0]] + [file_path for file_paths in walk[1].values() for file_path in file_paths]
+    manifest = None
+    # parsed_files : {file_path : [state,parsed_file]} (see sdf_incremental.split_kept_files), package_components : {package_name : [states of its files,components]}
+    watch_state = {'snapshot' : None, 'package_index' : {}, 'parsed_files' : {}, 'package_components' : {}}
+    try :
+        watch_state['snapshot'] = sdf_incremental.snapshot(list_files())
+        while True :
+            file_list, watch_state['package_index'] = walk
+            manifest = process_files_incremental(file_list,output_txt_path,directory_path,jobs,cache_directory,manifest,watch_state)
+            if cache_directory :
+                sdf_cache.evict(cache_directory,cache_size)
+            print_summary(output_txt_path)
+            print(f"Watching {directory_path} (Ctrl+C to stop)")
+            watch_state['snapshot'] = sdf_incremental.wait_for_changes(list_files,watch_state['snapshot'])
+    except KeyboardInterrupt :
+        print ("Watch mode is stopped")
+
+def process_files_in_directory(directory_path, output_txt_path, excluded_directories,excluded_files,jobs=1,cache_directory=None,cache_size=sdf_cache.default_cache_size,incremental=False,watch=False,columnar_path=None,database_path=None,hierarchy_path=None):
+    global hierarchy_graph
     if not os.path.exists(directory_path):
         print(f"The specified directory {directory_path} does not exist.\n")
+    elif watch :
+        watch_directory(directory_path,output_txt_path,excluded_directories,excluded_files,jobs,cache_directory,cache_size)
+    elif incremental :
+        process_files_incremental(find_files(directory_path,excluded_directories,excluded_files),output_txt_path,directory_path,jobs,cache_directory)
+        if cache_directory :
+            sdf_cache.evict(cache_directory,cache_size)
+        print_summary(output_txt_path)
     else:
-        open(output_txt_path, 'w').close()                                                                             
-        for root, dirs, files in os.walk(directory_path):
-            dirs[:] = [d for d in dirs if d not in excluded_directories]
-            files[:] = [f for f in files if f not in excluded_files]     
-            for file_name in files:
-                if file_name.lower().endswith('.vhd'):                                                           
-                    file_path = os.path.join(root, file_name)
-                    try:
-                        with open(file_path, "r") as file:
-                            vhdl_code_full = file.read()
-                            vhdl_code = remove_comments(vhdl_code_full)
-                            components_list_extended = find_package(vhdl_code,directory_path)
-                            write_signals_to_csv(file_name,output_txt_path, vhdl_code,components_list_extended) 
-                    except FileNotFoundError:
-                        print(f"Error: File '{file_path}' not found.")
-                                            
-        if os.path.getsize(output_txt_path) == 0 :
-            print(f".vhd files was not found. Or there is simply no .vhd file in project.\n")
+        file_list = find_files(directory_path,excluded_directories,excluded_files)
+        # Files are parsed in parallel when jobs > 1, packages and port maps are resolved and written in os.walk order
+        parse_results = parse_files([file_path for file_name,file_path in file_list],jobs,cache_directory)
+        if hierarchy_path :
+            hierarchy_graph = sdf_hierarchy.HierarchyGraph(hierarchy_path)
+        try :
+            write_parsed_files(file_list,parse_results,output_txt_path,directory_path,cache_directory,open_record_sinks(os.path.abspath(directory_path),columnar_path,database_path))
+        except KeyboardInterrupt :
+            print (f"Extraction is interrupted, {output_txt_path} is not replaced")
+            hierarchy_graph = None
+            return
+        if hierarchy_graph is not None :
+            hierarchy_graph.close()
+            hierarchy_graph = None
+        if cache_directory :
+            sdf_cache.evict(cache_directory,cache_size)
+        print_summary(output_txt_path)
+
+# Print the number of files skipped by prefilter_file since the previous summary
+def print_prefilter_summary() :
+    if prefilter_counts[0] :
+        print(f"Pre-filter : {prefilter_counts[1]} of {prefilter_counts[0]} .vhd files have neither entity nor component, they are not parsed")
+        prefilter_counts[:] = [0, 0]
+
+def print_summary(output_txt_path) :
+    print_prefilter_summary()
+    if not os.path.exists(output_txt_path) or os.path.getsize(output_txt_path) == 0 :
+        print(f".vhd files was not found. Or there is simply no .vhd file in project.\n")
+    else :
+        print(f".vhd parsing done successfully\n")    
+
+# Remove the options from the arguments : return arguments, options ({'jobs' : number of parsing processes, 'cache_directory' : parse cache directory or None, 'cache_size' : cache size limit in MB, 'incremental' : incremental mode, 'watch' : watch mode, 'columnar' : columnar output path or None, 'sqlite' : SQLite database path or None, 'write_buffer' : write buffer size of the csv file in KB, 'profile' : instrumentation of the run, 'profile_top' : number of slowest files reported, 'profile_file' : file name of the cProfile dump or None, 'hierarchy' : hierarchy graph path or None})
+def extract_options(arguments) :
+    options = {'jobs' : 1, 'cache_directory' : sdf_cache.default_cache_directory, 'cache_size' : sdf_cache.default_cache_size, 'incremental' : False, 'watch' : False, 'columnar' : None, 'sqlite' : None, 'write_buffer' : sdf_output.default_buffer_size, 'profile' : False, 'profile_top' : sdf_profile.slowest_file_count, 'profile_file' : None, 'hierarchy' : None}
+    remaining_arguments = []
+    i = 0
+    while i < len(arguments) :
+        if arguments[i] in ("--jobs", "-j", "--cache-size", "--write-buffer", "--profile-top") :
+            if i+1 >= len(arguments) or not arguments[i+1].isdigit() :
+                print (f"{arguments[i]} must be followed by a number")
+                sys.exit(1)
+            if arguments[i] == "--cache-size" :
+                options['cache_size'] = int(arguments[i+1])
+            elif arguments[i] == "--write-buffer" :
+                options['write_buffer'] = int(arguments[i+1])
+            elif arguments[i] == "--profile-top" :
+                options['profile_top'] = int(arguments[i+1])
+            else :
+                options['jobs'] = int(arguments[i+1]) or os.cpu_count() or 1 # 0 : one job per cpu
+            i += 2
+        elif arguments[i] == "--cache-dir" :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a directory")
+                sys.exit(1)
+            options['cache_directory'] = arguments[i+1]
+            i += 2
+        elif arguments[i] in ("--columnar", "--sqlite", "--hierarchy") :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a file path")
+                sys.exit(1)
+            options[arguments[i][2:]] = arguments[i+1]
+            i += 2
+        elif arguments[i] == "--profile-file" :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a file name")
+                sys.exit(1)
+            options['profile'] = True
+            options['profile_file'] = arguments[i+1]
+            i += 2
+        elif arguments[i] == "--profile" :
+            options['profile'] = True
+            i += 1
+        elif arguments[i] == "--no-cache" :
+            options['cache_directory'] = None
+            i += 1
+        elif arguments[i] == "--incremental" :
+            options['incremental'] = True
+            i += 1
+        elif arguments[i] == "--watch" :
+            options['watch'] = True
+            i += 1
         else :
-            print(f".vhd parsing done successfully\n")    
+            remaining_arguments.append(arguments[i])
+            i += 1
+    return remaining_arguments, options
 
 
 # Main program entry point
@@ -469,19 +1073,20 @@ def main():
         print('DEBUG Mode enable')
     else : 
         print('DEBUG Mode disable')
-    if len(sys.argv) > 1 :
-        if (sys.argv[1] == "-help") :
+    arguments, options = extract_options(sys.argv)
+    if len(arguments) > 1 :
+        if (arguments[1] == "-help") :
             help()
             return 0
-        for arg in sys.argv :
+        for arg in arguments :
             if arg.endswith(".txt") :
                 print (f"Config file : {arg}")
                 config=extract_config(arg,config)
         input_directory,output_file,excluded_directories,excluded_files=config
-        for arg in sys.argv :
+        for arg in arguments :
             if arg.endswith(".csv") :
                 output_file=arg
-        for arg in sys.argv : 
+        for arg in arguments : 
             if not (arg.endswith(".txt")|arg.endswith(".csv")|arg.endswith(".py")) :
                 input_directory = arg
         config = (input_directory,output_file,excluded_directories,excluded_files)
@@ -495,7 +1100,27 @@ def main():
     print(f"Output File Path: {output_file}")
     print (f"Excluded_directories {excluded_directories}")
     print (f"Excluded_files {excluded_files}")   
-    process_files_in_directory(input_directory,output_file,excluded_directories,excluded_files)
+    print (f"Jobs : {options['jobs']}")
+    print (f"Parse cache : {options['cache_directory'] or 'disabled'}")
+    print (f"Incremental mode : {options['incremental']}")
+    print (f"Watch mode : {options['watch']}")
+    for option in ('columnar', 'sqlite', 'hierarchy') :
+        if options[option] and (options['incremental'] or options['watch']) :
+            print (f"--{option} is not supported with --incremental or --watch, it is ignored")
+            options[option] = None
+    print (f"Columnar output : {options['columnar'] or 'disabled'}")
+    print (f"SQLite output : {options['sqlite'] or 'disabled'}")
+    print (f"Hierarchy graph : {options['hierarchy'] or 'disabled'}")
+    sdf_output.buffer_size = options['write_buffer']
+    print (f"Profile : {options['profile']}")
+    if options['profile'] :
+        if options['jobs'] > 1 :
+            print ("--profile parses the files in the main process, --jobs is ignored")
+            options['jobs'] = 1
+        sdf_profile.enable(sys.modules[__name__],profile_stages,options['profile_file'])
+    process_files_in_directory(input_directory,output_file,excluded_directories,excluded_files,options['jobs'],options['cache_directory'],options['cache_size'],options['incremental'],options['watch'],options['columnar'],options['sqlite'],options['hierarchy'])
+    if options['profile'] :
+        sdf_profile.report(output_file+".profile.json",f"{output_file}.{options['profile_file']}.prof",options['profile_top'])
         
 
 
@@ -0,0 +1,245 @@
+import os
+import sys
+import multiprocessing
+import sdf_cache
+import sdf_output
+import sdf_records
+import sdf_columnar
+import sdf_sqlite
+import sdf_hierarchy
+import gen_sdf_from_verilog
+import gen_sdf_from_vhdl
+
+generators = {'verilog' : gen_sdf_from_verilog, 'vhdl' : gen_sdf_from_vhdl}
+extensions = {'.v' : 'verilog', '.vhd' : 'vhdl'}
+verilog_to_vhdl_directions = {'input' : 'in', 'output' : 'out', 'inout' : 'inout'}
+vhdl_to_verilog_directions = {'in' : 'input', 'out' : 'output', 'inout' : 'inout'}
+
+def help ():
+    print("""
+Usage:
+------
+
+Process a project mixing Verilog (.v) and VHDL (.vhd) files into one sdf.csv file. The directory is
+walked once, the files of both languages are parsed by one pool of worker processes, and the
+instances are resolved against the modules and entities of both languages.
+
+   Example:
+   python gen_sdf_mixed.py <input_directory_path> [sdf_csv_output_path] [config_file_path]
+                           [--jobs N] [--cache-dir DIR] [--cache-size MB] [--no-cache]
+                           [--write-buffer KB] [--columnar PATH] [--sqlite PATH] [--hierarchy PATH]
+
+   - <input_directory_path>: Directory of the project.
+   - [sdf_csv_output_path]: Optional. Path to the output sdf.csv file, the default is
+     '<input_directory_path>/sdf.csv'.
+   - [config_file_path]: Optional. Configuration file in the format of gen_sdf_from_verilog.py
+     (excluded_directories and excluded_files apply to both languages, define_list to the .v files).
+   - The options are the ones of gen_sdf_from_verilog.py (--jobs defaults to one process per CPU),
+     --stream, --incremental, --watch and --profile are not available. The hierarchy graph of
+     --hierarchy PATH holds the modules and entities of both languages.
+
+Cross-language resolution:
+--------------------------
+- A Verilog instance of a VHDL entity gets the directions of the entity ports.
+- A VHDL port map of a Verilog module gets the directions of the module ports, the components declared in
+  VHDL (in the architecture or in the used packages) are looked up first.
+- In the hierarchy graph, a Verilog #(...) override of a VHDL entity sets its generics, and a VHDL generic map of a
+  Verilog module sets its parameters (the parameter names are not case sensitive).
+- When a Verilog module and a VHDL entity have the same name, the Verilog module is used by the Verilog
+  instances (the VHDL entity is registered under its own name and in lower case).
+- The file blocks of sdf.csv are in the order of the directory walk, in the format of each language.
+""")
+
+# Walk the directory once : return the source files [[language,file_name,file_path],...] in os.walk order, and the package index of the .vhd files
+# (see gen_sdf_from_vhdl.build_package_index) : the sources are not listed in the excluded directories, the packages are not indexed in the
+# package excluded directories of gen_sdf_from_vhdl, a directory excluded for both is not walked
+def find_files(directory_path, excluded_directories, excluded_files) :
+    file_list = []
+    package_index = {}
+    walked_directories = {directory_path : [True, True]} # {directory : [sources are listed,packages are indexed]}
+    for root, dirs, files in os.walk(directory_path):
+        sources_listed, packages_indexed = walked_directories.pop(root)
+        kept_dirs = []
+        for d in dirs :
+            flags = [sources_listed and d not in excluded_directories, packages_indexed and d not in gen_sdf_from_vhdl.package_excluded_directories]
+            if flags[0] or flags[1] :
+                walked_directories[os.path.join(root, d)] = flags
+                kept_dirs.append(d)
+        dirs[:] = kept_dirs
+        for file_name in files :
+            language = extensions.get(os.path.splitext(file_name.lower())[1])
+            if language == 'vhdl' and packages_indexed :
+                package_index.setdefault(file_name.lower()[:-len('.vhd')], []).append(os.path.join(root, file_name))
+            if language and sources_listed and file_name not in excluded_files :
+                file_list.append([language, file_name, os.path.join(root, file_name)])
+    return file_list, package_index
+
+# Parse a file in a worker : return [file_index,parse_result] (see parse_file_task of the generators)
+def mixed_parse_task(task) :
+    file_index, language, file_path, define_list, cache_directory = task
+    if language == 'verilog' :
+        return [file_index, gen_sdf_from_verilog.parse_file_task((file_path, define_list, cache_directory))]
+    return [file_index, gen_sdf_from_vhdl.parse_file_task((file_path, cache_directory))]
+
+# Parse the files of both languages with one pool of jobs processes : return the parse results in the order of file_list
+# The files without design unit are skipped before they are sent to the pool
+def parse_files(file_list, define_list, jobs=1, cache_directory=None) :
+    tasks = []
+    parse_results = [None]*len(file_list)
+    for file_index, (language, file_name, file_path) in enumerate(file_list) :
+        if not generators[language].prefilter_file(file_path) :
+            parse_results[file_index] = generators[language].skipped_parse_result()
+            continue
+        try :
+            file_size = os.path.getsize(file_path)
+        except OSError :
+            file_size = 0
+        tasks.append([file_size, (file_index, language, file_path, define_list, cache_directory)])
+    # Largest files first, so that the pool stays busy until the end of the run
+    tasks = [task for file_size, task in sorted(tasks, key=lambda task: -task[0])]
+    if jobs > 1 and len(tasks) > 1 :
+        with multiprocessing.Pool(min(jobs, len(tasks))) as pool :
+            for file_index, parse_result in pool.imap_unordered(mixed_parse_task, tasks) :
+                parse_results[file_index] = parse_result
+    else :
+        for file_index, parse_result in map(mixed_parse_task, tasks) :
+            parse_results[file_index] = parse_result
+    return parse_results
+
+# Build the combined registry of the parsed files (parse_results in the order of file_list), then resolve their connectivity
+# The Verilog module registry also holds the VHDL entities (with Verilog directions), the Verilog modules are added to the components of
+# each VHDL file (with VHDL directions) after its own and package components
+# Yield [language,file_name,signal_records] for each file with a module or an entity (signal_records is None for a .vhd file without entity)
+def resolve_parsed_files(file_list, parse_results, package_index, cache_directory=None) :
+    sdf_records.new_name_table()
+    module_registry = {}
+    verilog_components = []
+    for (language, file_name, file_path), (parsed_file, warnings) in zip(file_list, parse_results) :
+        if language == 'verilog' and parsed_file :
+            for module_name, ports, submodules, signal_declarations, parameters, port_order in parsed_file :
+                ports = gen_sdf_from_verilog.ordered_ports(ports, port_order)
+                gen_sdf_from_verilog.register_module(module_registry, module_name, ports)
+                verilog_components.append([module_name.lower(), [[port_name.lower(), verilog_to_vhdl_directions.get(direction, direction), port_type] for port_name, direction, port_type in ports]])
+    for (language, file_name, file_path), (parsed_file, warnings) in zip(file_list, parse_results) :
+        if language == 'vhdl' and parsed_file and parsed_file[0] :
+            entity_ports = [[port_name, vhdl_to_verilog_directions.get(direction, direction), port_type] for port_name, direction, port_type in parsed_file[2]]
+            gen_sdf_from_verilog.register_module(module_registry, parsed_file[0], entity_ports)
+            gen_sdf_from_verilog.register_module(module_registry, parsed_file[0].lower(), entity_ports)
+    gen_sdf_from_vhdl.set_package_index(package_index)
+    for (language, file_name, file_path), (parsed_file, warnings) in zip(file_list, parse_results) :
+        for warning in warnings :
+            generators[language].log_warning(warning)
+        if parsed_file is None :
+            print(f"Error: File '{file_path}' not found.")
+        elif language == 'verilog' :
+            if parsed_file :
+                yield [language, file_name, gen_sdf_from_verilog.extract_signal_records(file_name, parsed_file, module_registry)]
+        elif parsed_file[0] is None :
+            yield [language, file_name, None]
+        else :
+            components_list_extended = gen_sdf_from_vhdl.find_package(parsed_file[6], cache_directory) + verilog_components
+            yield [language, file_name, gen_sdf_from_vhdl.extract_signal_records(file_name, parsed_file, components_list_extended)]
+
+# Return the record sinks of the project (see gen_sdf_from_verilog.open_record_sinks)
+def open_record_sinks(project, columnar_path=None, database_path=None) :
+    record_sinks = []
+    if columnar_path :
+        record_sinks.append(sdf_columnar.ColumnarTable(columnar_path))
+    if database_path :
+        record_sinks.append(sdf_sqlite.SignalDatabase(database_path, project, "mixed"))
+    return record_sinks
+
+# Write the signals of the parsed files (parse_results in the order of file_list) to the csv file (see sdf_output.CsvSink), and to the record sinks (see open_record_sinks)
+# On Ctrl+C the csv file and the record sinks are discarded (the previous outputs are kept) and KeyboardInterrupt is raised again
+def write_parsed_files(file_list, parse_results, package_index, output_txt_path, cache_directory=None, record_sinks=()) :
+    file_name = None
+    try :
+        with sdf_output.CsvSink(output_txt_path) as csv_sink:
+            for language, file_name, signal_records in resolve_parsed_files(file_list, parse_results, package_index, cache_directory) :
+                generators[language].write_signals_to_csv(file_name, csv_sink.writer, signal_records)
+                if signal_records is not None :
+                    for record_sink in record_sinks :
+                        record_sink.add(signal_records)
+    except KeyboardInterrupt :
+        print(f"Signals of file : {file_name} are extacted")
+        for record_sink in record_sinks :
+            record_sink.discard()
+        raise
+    for record_sink in record_sinks :
+        record_sink.close()
+
+def process_files_in_directory(directory_path, output_txt_path, define_list, excluded_directories, excluded_files, jobs=1, cache_directory=None, cache_size=sdf_cache.default_cache_size, columnar_path=None, database_path=None, hierarchy_path=None) :
+    if not os.path.exists(directory_path):
+        print(f"The specified directory {directory_path} does not exist.\n")
+        return
+    file_list, package_index = find_files(directory_path, excluded_directories, excluded_files)
+    file_counts = {language : sum(1 for file in file_list if file[0] == language) for language in generators}
+    print(f"Files : {file_counts['verilog']} .v, {file_counts['vhdl']} .vhd")
+    try :
+        parse_results = parse_files(file_list, define_list, jobs, cache_directory)
+        if hierarchy_path :
+            gen_sdf_from_verilog.hierarchy_graph = gen_sdf_from_vhdl.hierarchy_graph = sdf_hierarchy.HierarchyGraph(hierarchy_path)
+        write_parsed_files(file_list, parse_results, package_index, output_txt_path, cache_directory, open_record_sinks(os.path.abspath(directory_path), columnar_path, database_path))
+    except KeyboardInterrupt :
+        print(f"Extraction is interrupted, {output_txt_path} is not replaced")
+        gen_sdf_from_verilog.hierarchy_graph = gen_sdf_from_vhdl.hierarchy_graph = None
+        return
+    if hierarchy_path :
+        gen_sdf_from_verilog.hierarchy_graph.close()
+        gen_sdf_from_verilog.hierarchy_graph = gen_sdf_from_vhdl.hierarchy_graph = None
+    if cache_directory :
+        sdf_cache.evict(cache_directory, cache_size)
+    print_summary(output_txt_path)
+
+def print_summary(output_txt_path) :
+    for generator in generators.values() :
+        generator.print_prefilter_summary()
+    if not os.path.exists(output_txt_path) or os.path.getsize(output_txt_path) == 0 :
+        print(f".v and .vhd files were not found. Or there is simply no .v or .vhd file in project.\n")
+    else :
+        print(f".v and .vhd parsing done successfully\n")
+
+# Main program
+def main():
+    config = (0, 0, [], [], [])
+    arguments, options = gen_sdf_from_verilog.extract_options(sys.argv)
+    if len(arguments) < 2 or arguments[1] == "-help" :
+        help()
+        return 0
+    if "-j" not in sys.argv and "--jobs" not in sys.argv :
+        options['jobs'] = os.cpu_count() or 1
+    for option in ('stream', 'incremental', 'watch', 'profile') :
+        if options[option] :
+            print(f"--{option} is not supported by the mixed-language front end, it is ignored")
+    for arg in arguments[1:] :
+        if arg.endswith(".txt") :
+            print(f"Config file : {arg}")
+            config = gen_sdf_from_verilog.extract_config(arg, config)
+    input_directory, output_file, excluded_directories, excluded_files, define_list = config
+    for arg in arguments[1:] :
+        if arg.endswith(".csv") :
+            output_file = arg
+        elif not arg.endswith(".txt") :
+            input_directory = arg
+    if input_directory == 0 :
+        print("Put input_directory_file on argument")
+        sys.exit(1)
+    if output_file == 0 :
+        output_file = os.path.join(input_directory, "sdf.csv")
+    print(f"Input Directory: {input_directory}")
+    print(f"Output File Path: {output_file}")
+    print(f"Excluded_directories {excluded_directories}")
+    print(f"Excluded_files {excluded_files}")
+    print(f"Define list : {define_list}")
+    print(f"Jobs : {options['jobs']}")
+    print(f"Parse cache : {options['cache_directory'] or 'disabled'}")
+    print(f"Columnar output : {options['columnar'] or 'disabled'}")
+    print(f"SQLite output : {options['sqlite'] or 'disabled'}")
+    print(f"Hierarchy graph : {options['hierarchy'] or 'disabled'}")
+    sdf_output.buffer_size = options['write_buffer']
+    process_files_in_directory(input_directory, output_file, define_list, excluded_directories, excluded_files, options['jobs'], options['cache_directory'], options['cache_size'], options['columnar'], options['sqlite'], options['hierarchy'])
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import contextlib
+import multiprocessing
+import sdf_profile
+import gen_sdf_from_verilog
+import gen_sdf_from_vhdl
+
+try :
+    import resource # Peak RSS, not available on Windows
+except ImportError :
+    resource = None
+
+generators = {'verilog' : gen_sdf_from_verilog, 'vhdl' : gen_sdf_from_vhdl}
+benchmark_version = 1
+
+# Scale of the synthetic projects and of the runs, each value can be set with --name N (e.g. --ifdef-depth 3)
+default_scale = {'files' : 200, 'modules' : 4, 'ports' : 16, 'instances' : 4, 'ifdef_depth' : 2, 'packages' : 4, 'package_uses' : 2, 'repeat' : 3, 'jobs' : 1}
+
+
+# Widths of the ports and nets, cycled over the port numbers
+verilog_widths = ['', '[7:0] ', '[WIDTH-1:0] ', '[31:0] ']
+vhdl_widths = ['std_logic', 'std_logic_vector(7 downto 0)', 'std_logic_vector(W-1 downto 0)', 'std_logic_vector(31 downto 0)']
+
+def help ():
+    print("""
+Usage:
+------
+
+Generate synthetic Verilog and VHDL projects and measure the throughput of process_files_in_directory
+of gen_sdf_from_verilog.py and gen_sdf_from_vhdl.py on them.
+
+   Example:
+   python sdf_benchmark.py [--language verilog|vhdl|both] [--files N] [--modules N] [--ports N]
+                           [--instances N] [--ifdef-depth N] [--packages N] [--package-uses N]
+                           [--repeat N] [--jobs N] [--cache-dir DIR] [--directory DIR]
+                           [--output FILE] [--compare FILE]
+
+   --language      : Generator to measure (default: both).
+   --files N       : Number of source files of each project (default: 200).
+   --modules N     : Number of modules per Verilog file (default: 4), a VHDL file has one entity.
+   --ports N       : Number of ports per module or entity (default: 16).
+   --instances N   : Number of instances per module or architecture (default: 4).
+   --ifdef-depth N : Nesting depth of the `ifdef sections around the Verilog instances (default: 2).
+   --packages N    : Number of VHDL packages declaring the components (default: 4).
+   --package-uses N: Number of use clauses per VHDL file (default: 2).
+   --repeat N      : Number of runs per language, the fastest one is reported (default: 3).
+   --jobs N        : Number of parsing processes (default: 1).
+   --cache-dir DIR : Use a parse cache (the first run fills it), the default is to parse every file.
+   --directory DIR : Generate the projects in DIR and keep them (default: a temporary directory).
+   --output FILE   : JSON file of the results (default: sdf_benchmark.json).
+   --compare FILE  : JSON file of a previous benchmark, the speed ratios are printed.
+
+Each run is done in a new process : files/s, MB/s (size of the source files), peak RSS of the
+process and of the parsing workers, and the time and number of calls of each stage are reported.
+""")
+
+# Return the port declarations of the synthetic modules : [[direction,width index,port_name],...]
+def synthetic_ports(port_count) :
+    ports = [['input', 0, 'clk']]
+    for port_number in range(1, port_count) :
+        direction = 'input' if port_number % 2 else 'output'
+        ports.append([direction, port_number % len(verilog_widths), f"{'in' if direction == 'input' else 'out'}_{port_number}"])
+    return ports
+
+# Return the code of a Verilog file of the synthetic project
+def generate_verilog_file(file_index, scale) :
+    ports = synthetic_ports(scale['ports'])
+    lines = ["`timescale 1ns/1ps", f"// Synthetic file {file_index}"]
+    for module_index in range(scale['modules']) :
+        lines.append(f"module bench_f{file_index}_m{module_index} #(parameter WIDTH = 16) (")
+        lines.append(",\n".join(f"    {direction} {'wire ' if direction == 'input' else 'reg '}{verilog_widths[width]}{port_name}" for direction,width,port_name in ports))
+        lines.append(");")
+        lines.append("  reg [WIDTH-1:0] state;")
+        lines.append("  wire [7:0] ctrl;")
+        instance_lines = []
+        for instance_index in range(scale['instances']) :
+            target = f"bench_f{(file_index+1+instance_index) % scale['files']}_m{module_index}"
+            for direction,width,port_name in ports[1:] :
+                instance_lines.append(f"  wire {verilog_widths[width]}n{instance_index}_{port_name};")
+            connections = ", ".join([".clk(clk)"] + [f".{port_name}(n{instance_index}_{port_name})" for direction,width,port_name in ports[1:]])
+            instance_lines.append(f"  {target} #(.WIDTH(WIDTH)) u_{instance_index} ({connections});")
+        # Nested `ifdef/`ifndef sections around the instances : BENCH_D0, BENCH_D2, ... are defined (see synthetic_defines), so the instances are kept
+        for depth in reversed(range(scale['ifdef_depth'])) :
+            instance_lines = [f"`{'ifdef' if depth % 2 == 0 else 'ifndef'} BENCH_D{depth}"] + instance_lines + ["`else", f"  wire [3:0] alt_{depth};", "`endif"]
+        lines.extend(instance_lines)
+        lines.append("  always @(posedge clk) state <= state + 1;")
+        lines.append("endmodule")
+        lines.append("")
+    return "\n".join(lines)
+
+# Return the define_list of the synthetic Verilog project
+def synthetic_defines(scale) :
+    return [f"BENCH_D{depth}" for depth in range(0, scale['ifdef_depth'], 2)]
+
+# Return the port clause of a synthetic VHDL entity or component
+def vhdl_port_clause(ports, indent) :
+    declarations = [f"{port_name} : {'in' if direction == 'input' else 'out'} {vhdl_widths[width]}" for direction,width,port_name in ports]
+    return f"{indent}port (\n" + ";\n".join(f"{indent}  {declaration}" for declaration in declarations) + f"\n{indent});"
+
+# Return the code of a VHDL package of the synthetic project : it declares the components of the entities file_index % packages == package_index
+def generate_vhdl_package(package_index, scale) :
+    ports = synthetic_ports(scale['ports'])
+    lines = ["library ieee;", "use ieee.std_logic_1164.all;", f"package bench_pkg_{package_index} is"]
+    for file_index in range(package_index, scale['files'], scale['packages']) :
+        lines.append(f"  component bench_e{file_index} is")
+        lines.append("    generic (W : integer := 16);")
+        lines.append(vhdl_port_clause(ports, "    "))
+        lines.append("  end component;")
+    lines.append("end package;")
+    return "\n".join(lines) + "\n"
+
+# Return the code of a VHDL file of the synthetic project (one entity and its architecture)
+def generate_vhdl_file(file_index, scale) :
+    ports = synthetic_ports(scale['ports'])
+    packages = sorted(set((file_index+use) % scale['packages'] for use in range(scale['package_uses']))) if scale['packages'] else []
+    lines = ["library ieee;", "use ieee.std_logic_1164.all;"]
+    for package_index in packages :
+        lines.append("library work;")
+        lines.append(f"use work.bench_pkg_{package_index}.all;")
+    lines.append(f"-- Synthetic file {file_index}")
+    lines.append(f"entity bench_e{file_index} is")
+    lines.append("  generic (W : integer := 16);")
+    lines.append(vhdl_port_clause(ports, "  "))
+    lines.append(f"end bench_e{file_index};")
+    lines.append("")
+    lines.append(f"architecture rtl of bench_e{file_index} is")
+    targets = [(file_index+1+instance_index) % scale['files'] for instance_index in range(scale['instances'])]
+    for target in sorted(set(targets)) :
+        if not scale['packages'] or target % scale['packages'] not in packages : # Components which are not declared in the used packages
+            lines.append(f"  component bench_e{target}")
+            lines.append(vhdl_port_clause(ports, "    "))
+            lines.append("  end component;")
+    for instance_index in range(scale['instances']) :
+        for direction,width,port_name in ports[1:] :
+            lines.append(f"  signal n{instance_index}_{port_name} : {vhdl_widths[width]};")
+    lines.append("  signal state : integer range 0 to 255;")
+    lines.append("begin")
+    for instance_index,target in enumerate(targets) :
+        connections = ", ".join(["clk => clk"] + [f"{port_name} => n{instance_index}_{port_name}" for direction,width,port_name in ports[1:]])
+        lines.append(f"  u_{instance_index} : bench_e{target} generic map (W => W) port map ({connections});")
+    lines.append("  main_proc : process(clk)")
+    lines.append("    variable count : integer;")
+    lines.append("  begin")
+    lines.append("    if rising_edge(clk) then")
+    lines.append("      state <= state + 1;")
+    lines.append("    end if;")
+    lines.append("  end process main_proc;")
+    lines.append("end rtl;")
+    return "\n".join(lines) + "\n"
+
+# Write the synthetic project of a language in directory_path : return [number of source files,size of the source files in bytes]
+def generate_project(language, directory_path, scale) :
+    if os.path.exists(directory_path) :
+        shutil.rmtree(directory_path)
+    files = {}
+    for file_index in range(scale['files']) :
+        # 10 files per sub directory, as in a real source tree
+        if language == 'verilog' :
+            files[os.path.join(f"block_{file_index // 10}", f"bench_f{file_index}.v")] = generate_verilog_file(file_index, scale)
+        else :
+            files[os.path.join(f"block_{file_index // 10}", f"bench_e{file_index}.vhd")] = generate_vhdl_file(file_index, scale)
+    if language == 'vhdl' :
+        for package_index in range(scale['packages']) :
+            files[os.path.join("pkg", f"bench_pkg_{package_index}.vhd")] = generate_vhdl_package(package_index, scale)
+    total_size = 0
+    for relative_path,code in files.items() :
+        file_path = os.path.join(directory_path, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as file:
+            file.write(code)
+        total_size += os.path.getsize(file_path)
+    return [len(files), total_size]
+
+# Return the peak RSS in MB of the process (who='self') or of its finished child processes (who='children'), None if it is not available
+def peak_rss(who) :
+    if resource is None :
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024*1024 if sys.platform == 'darwin' else 1024), 1) # Bytes on macOS, KB elsewhere
+
+# Run process_files_in_directory once in this process (a new process per run, see measure) and send the measures to connection
+# The stages are the profile_stages of the generator (see sdf_profile), the regular expressions are not counted
+# With --jobs N > 1 the files are parsed by the workers, the parsing stages are then only seen as 'other' (the wait for the workers)
+def run_once(language, directory_path, output_path, scale, cache_directory, connection) :
+    generator = generators[language]
+    sdf_profile.enable(generator, generator.profile_stages, count_regex=False)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) : # The warnings of the generators are not part of the benchmark output
+        if language == 'verilog' :
+            generator.process_files_in_directory(directory_path, output_path, synthetic_defines(scale), [], [], scale['jobs'], cache_directory)
+        else :
+            generator.process_files_in_directory(directory_path, output_path, [], [], scale['jobs'], cache_directory)
+    wall_time = time.perf_counter() - start
+    stage_times = sdf_profile.stage_table(sdf_profile.stages)
+    stage_times['other'] = {'time' : round(max(wall_time - sum(stage[0] for stage in sdf_profile.stages.values()), 0.0), 6), 'calls' : 1}
+    connection.send({'wall_time' : round(wall_time, 4), 'peak_rss_mb' : peak_rss('self'), 'peak_rss_workers_mb' : peak_rss('children'), 'output_size' : os.path.getsize(output_path), 'stages' : stage_times})
+    connection.close()
+
+# Measure a language : generate its project, run it repeat times in new processes and return the results
+def measure(language, directory_path, scale, cache_directory) :
+    project_path = os.path.join(directory_path, language)
+    file_count, total_size = generate_project(language, project_path, scale)
+    output_path = os.path.join(directory_path, f"sdf_{language}.csv")
+    runs = []
+    for run_index in range(scale['repeat']) :
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=run_once, args=(language, project_path, output_path, scale, cache_directory, sender))
+        process.start()
+        sender.close()
+        try :
+            runs.append(receiver.recv())
+        except EOFError :
+            print(f"Error: run {run_index+1} of {language} failed")
+        process.join()
+    if not runs :
+        return None
+    best = min(runs, key=lambda run: run['wall_time'])
+    return {'files' : file_count, 'bytes' : total_size,
+        'files_per_s' : round(file_count / best['wall_time'], 1), 'mb_per_s' : round(total_size / (1024*1024) / best['wall_time'], 3),
+        'best' : best, 'runs' : runs}
+
+# Return the commit of the working tree, None outside of a git repository
+def current_commit() :
+    try :
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) :
+        return None
+
+def print_results(language, results) :
+    best = results['best']
+    print(f"{language} : {results['files']} files, {results['bytes'] / (1024*1024):.2f} MB in {best['wall_time']:.3f} s (best of {len(results['runs'])})"
+        f" : {results['files_per_s']} files/s, {results['mb_per_s']} MB/s, peak RSS {best['peak_rss_mb']} MB (workers {best['peak_rss_workers_mb']} MB)")
+    for stage_name,stage in best['stages'].items() :
+        print(f"   {stage_name:<24} {stage['time']:>9.3f} s {100 * stage['time'] / best['wall_time'] if best['wall_time'] else 0:>6.1f} % {stage['calls']:>8} calls")
+
+# Print the speed ratios of the results against a previous benchmark file
+def compare_results(benchmark, previous_path) :
+    try :
+        with open(previous_path, "r") as file:
+            previous = json.load(file)
+    except (OSError, ValueError) as error :
+        print(f"Error: {previous_path} can not be read ({error})")
+        return
+    if previous.get('scale') != benchmark['scale'] :
+        print(f"Warning : {previous_path} was measured with another scale {previous.get('scale')}")
+    for language,results in benchmark['results'].items() :
+        previous_results = previous.get('results', {}).get(language)
+        if not results or not previous_results :
+            continue
+        ratio = previous_results['best']['wall_time'] / results['best']['wall_time']
+        print(f"{language} : {ratio:.2f}x the speed of {previous_path} ({previous.get('commit')}), {previous_results['best']['wall_time']:.3f} s -> {results['best']['wall_time']:.3f} s")
+
+# Remove the options from the arguments : return arguments, scale (see default_scale), options
+def extract_options(arguments) :
+    scale = dict(default_scale)
+    options = {'language' : 'both', 'cache_directory' : None, 'directory' : None, 'output' : "sdf_benchmark.json", 'compare' : None}
+    remaining_arguments = []
+    i = 0
+    while i < len(arguments) :
+        name = arguments[i][2:].replace('-', '_')
+        if arguments[i].startswith("--") and (name in scale or name in options) :
+            if i+1 >= len(arguments) :
+                print (f"{arguments[i]} must be followed by a value")
+                sys.exit(1)
+            if name in scale :
+                if not arguments[i+1].isdigit() :
+                    print (f"{arguments[i]} must be followed by a number")
+                    sys.exit(1)
+                scale[name] = int(arguments[i+1])
+            else :
+                options[name] = arguments[i+1]
+            i += 2
+        else :
+            remaining_arguments.append(arguments[i])
+            i += 1
+    scale['files'] = max(scale['files'], 1)
+    scale['repeat'] = max(scale['repeat'], 1)
+    scale['jobs'] = scale['jobs'] or os.cpu_count() or 1
+    return remaining_arguments, scale, options
+
+# Main program
+def main():
+    arguments, scale, options = extract_options(sys.argv)
+    if len(arguments) > 1 :
+        help()
+        return 0
+    languages = ['verilog', 'vhdl'] if options['language'] == 'both' else [options['language']]
+    if any(language not in generators for language in languages) :
+        print(f"Error: Unknown language '{options['language']}', it must be verilog, vhdl or both")
+        sys.exit(1)
+    directory_path = options['directory'] or tempfile.mkdtemp(prefix="sdf_benchmark_")
+    benchmark = {'version' : benchmark_version, 'commit' : current_commit(), 'python' : platform.python_version(), 'platform' : platform.platform(),
+        'cpu_count' : os.cpu_count(), 'cache' : bool(options['cache_directory']), 'scale' : scale, 'results' : {}}
+    print(f"Scale : {scale}")
+    try :
+        for language in languages :
+            benchmark['results'][language] = measure(language, directory_path, scale, options['cache_directory'])
+            if benchmark['results'][language] :
+                print_results(language, benchmark['results'][language])
+    finally :
+        if not options['directory'] :
+            shutil.rmtree(directory_path, ignore_errors=True)
+    with open(options['output'], "w") as file:
+        json.dump(benchmark, file, indent=1)
+    print(f"Results : {options['output']}")
+    if options['compare'] :
+        compare_results(benchmark, options['compare'])
+
+
+
+if __name__ == "__main__":
+    main()
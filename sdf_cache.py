@@ -0,0 +1,95 @@
+import hashlib
+import io
+import mmap
+import os
+import pickle
+
+default_cache_directory = os.path.join(os.path.expanduser("~"), ".cache", "sdf_generator")
+default_cache_size = 512 # Maximum size of the cache directory in MB
+cache_extension = ".pkl"
+prefilter_chunk_size = 64*1024 # Bytes lowered at a time by contains_keywords (a file with a keyword near its start is accepted after one chunk)
+
+# Read a source file once : return its text (decoded like open(file_path,"r")) and the sha256 hash of its content (None unless hashed, the hash
+# is only needed for the cache key)
+def read_source(file_path, hashed=True) :
+    with open(file_path, "rb") as file:
+        data = file.read()
+    return io.TextIOWrapper(io.BytesIO(data)).read(), hashlib.sha256(data).hexdigest() if hashed else None
+
+# Return True if the content of a source file contains one of the keywords (lower case bytes, found in any case), without reading it as text :
+# the file is memory mapped and lowered chunk by chunk with bytes.lower, then searched with bytes.find (a case-insensitive regular expression
+# is several times slower over the files without keyword), the chunks overlap so that a keyword across two chunks is found
+# A file which can not be read returns True, so that the error is reported when it is parsed
+def contains_keywords(file_path, keywords) :
+    overlap = max(map(len, keywords)) - 1
+    try :
+        with open(file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0 :
+                return False
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data :
+                for start in range(0, len(data), prefilter_chunk_size) :
+                    chunk = data[max(0, start-overlap):start+prefilter_chunk_size].lower()
+                    if any(chunk.find(keyword) != -1 for keyword in keywords) :
+                        return True
+                return False
+    except (OSError, ValueError) :
+        return True
+
+# Return the cache key of a parsed file from the hash of its content, the parser version and the parse context (e.g. define_list)
+def cache_key(content_hash, parser_version, context=()) :
+    key = hashlib.sha256()
+    for element in [content_hash, parser_version] + sorted(context) :
+        key.update(str(element).encode())
+        key.update(b"\0")
+    return key.hexdigest()
+
+# Return the value stored for key in the cache directory, or None if it is not found
+# An entry which can not be unpickled (corrupt, truncated or written by another program) is removed, the file is then parsed again
+def load(cache_directory, key) :
+    entry_path = os.path.join(cache_directory, key + cache_extension)
+    try :
+        with open(entry_path, "rb") as file:
+            value = pickle.load(file)
+        os.utime(entry_path) # The modification time is used as last access time by evict
+        return value
+    except OSError :
+        return None
+    except Exception : # pickle.load can raise nearly any exception on foreign data (ValueError, ModuleNotFoundError, AttributeError, ...)
+        try :
+            os.remove(entry_path)
+        except OSError :
+            pass
+        return None
+
+# Store value for key in the cache directory (the entry is written to a temporary file and renamed, so concurrent workers never read a partial entry)
+def store(cache_directory, key, value) :
+    entry_path = os.path.join(cache_directory, key + cache_extension)
+    temporary_path = f"{entry_path}.{os.getpid()}.tmp"
+    try :
+        os.makedirs(cache_directory, exist_ok=True)
+        with open(temporary_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, entry_path)
+    except OSError as error :
+        print(f"Error: parse cache entry '{entry_path}' can not be written ({error})")
+
+# Remove the least recently used entries until the cache directory is smaller than size_limit MB
+def evict(cache_directory, size_limit=default_cache_size) :
+    entries = []
+    try :
+        with os.scandir(cache_directory) as directory_entries :
+            for entry in directory_entries :
+                if entry.name.endswith(cache_extension) :
+                    entry_stat = entry.stat()
+                    entries.append([entry_stat.st_mtime, entry_stat.st_size, entry.path])
+    except OSError :
+        return
+    cache_size = sum(entry[1] for entry in entries)
+    for modification_time, entry_size, entry_path in sorted(entries) :
+        if cache_size <= size_limit*1024*1024 :
+            break
+        try :
+            os.remove(entry_path)
+            cache_size -= entry_size
+        except OSError :
+            pass
@@ -0,0 +1,118 @@
+import array
+
+# Columnar output of the signal records (see sdf_records.SignalRecord), written next to sdf.csv with --columnar PATH
+# The format is chosen by the extension of PATH :
+#   .parquet          : Parquet file (requires pyarrow)
+#   .arrow, .feather  : Arrow IPC file, it can be memory mapped and loaded without copy (requires pyarrow)
+#   .npz              : NumPy archive of the code, offset and string table arrays (requires numpy)
+# The string columns are dictionary encoded and the src/dst columns are real list columns (instead of the comma-joined strings of sdf.csv)
+# The file_name column replaces the file_name(...) and header rows of sdf.csv
+string_columns = ['file_name', 'component', 'signal_name', 'type', 'size']
+list_columns = ['instance_src', 'component_src', 'instance_dst', 'component_dst']
+columnar_extensions = ['.parquet', '.arrow', '.feather', '.npz']
+
+# Return an Arrow int32 array sharing the memory of an array('i')
+def int32_array(pyarrow, values) :
+    return pyarrow.Array.from_buffers(pyarrow.int32(), len(values), [None, pyarrow.py_buffer(values)])
+
+# Columns of the signal records, filled with add : the strings are stored as int32 codes in a dictionary, the lists as int32 offsets and
+# int32 values (the codes of names, the dictionary shared by the four list columns : only the names of the table)
+# It is a record sink of the generators (add the records of each file, then close writes the table to output_path)
+class ColumnarTable :
+    def __init__(self, output_path=None) :
+        self.output_path = output_path
+        self.row_count = 0
+        self.codes = {column : array.array('i') for column in string_columns}
+        self.dictionaries = {column : {} for column in string_columns} # {value : code}
+        self.offsets = {column : array.array('i', [0]) for column in list_columns}
+        self.values = {column : array.array('i') for column in list_columns}
+        self.names = [] # Dictionary of the list columns : [name,...] in code order
+        self.name_codes = {} # {name : code}
+
+    # Add the signal records of a file
+    def add(self, signal_records) :
+        for signal_record in signal_records :
+            for column in string_columns :
+                dictionary = self.dictionaries[column]
+                value = getattr(signal_record, column)
+                code = dictionary.get(value)
+                if code is None :
+                    code = dictionary[value] = len(dictionary)
+                self.codes[column].append(code)
+            endpoints = signal_record.endpoints
+            names = signal_record.name_table.names
+            start = 4
+            for index, column in enumerate(list_columns) :
+                end = start + endpoints[index]
+                self.values[column].extend(self.name_code(names[name_id]) for name_id in endpoints[start:end])
+                self.offsets[column].append(len(self.values[column]))
+                start = end
+            self.row_count += 1
+
+    # Return the code of a name, the name is added to the dictionary of the list columns
+    def name_code(self, name) :
+        code = self.name_codes.get(name)
+        if code is None :
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    # Write the table to output_path
+    def close(self) :
+        if self.write(self.output_path) :
+            print (f"Columnar output : {self.output_path} ({self.row_count} rows)")
+
+    # Drop the table of an interrupted run : nothing is written before close
+    def discard(self) :
+        pass
+
+    # Return the dictionary of a string column : [value,...] in code order
+    def dictionary_values(self, column) :
+        return list(self.dictionaries[column])
+
+    # Write the table to output_path, the format is chosen by its extension (see above), return False if the format is not available
+    def write(self, output_path) :
+        extension = output_path[output_path.rfind('.'):].lower() if '.' in output_path else ''
+        if extension not in columnar_extensions :
+            print(f"Error: Unknown columnar format '{output_path}', the extension must be one of {', '.join(columnar_extensions)}")
+            return False
+        try :
+            if extension == '.npz' :
+                self.write_npz(output_path)
+            else :
+                self.write_arrow(output_path, extension == '.parquet')
+        except ImportError as error :
+            print(f"Error: {output_path} can not be written, {error.name} is not installed (pip install {'numpy' if extension == '.npz' else 'pyarrow'})")
+            return False
+        return True
+
+    def write_arrow(self, output_path, parquet) :
+        import pyarrow
+        import pyarrow.ipc
+        names = pyarrow.array(self.names, type=pyarrow.string())
+        columns = {}
+        for column in string_columns :
+            columns[column] = pyarrow.DictionaryArray.from_arrays(int32_array(pyarrow, self.codes[column]), pyarrow.array(self.dictionary_values(column), type=pyarrow.string()))
+        for column in list_columns :
+            columns[column] = pyarrow.ListArray.from_arrays(int32_array(pyarrow, self.offsets[column]), pyarrow.DictionaryArray.from_arrays(int32_array(pyarrow, self.values[column]), names))
+        table = pyarrow.table(columns)
+        if parquet :
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(table, output_path)
+        else :
+            with pyarrow.OSFile(output_path, 'wb') as sink :
+                with pyarrow.ipc.new_file(sink, table.schema) as writer :
+                    writer.write_table(table)
+
+    def write_npz(self, output_path) :
+        import numpy
+        arrays = {}
+        for column in string_columns :
+            arrays[column + '_codes'] = numpy.frombuffer(self.codes[column], dtype=numpy.int32)
+            arrays[column + '_dictionary'] = numpy.array(self.dictionary_values(column), dtype=str)
+        for column in list_columns :
+            arrays[column + '_offsets'] = numpy.frombuffer(self.offsets[column], dtype=numpy.int32)
+            arrays[column + '_values'] = numpy.frombuffer(self.values[column], dtype=numpy.int32)
+        arrays['names'] = numpy.array(self.names, dtype=str)
+        with open(output_path, 'wb') as file :
+            numpy.savez(file, **arrays)
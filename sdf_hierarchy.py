@@ -0,0 +1,328 @@
+import array
+import pickle
+import sys
+import sdf_parameters
+
+# Design hierarchy graph of a project, written next to sdf.csv with --hierarchy PATH : module nodes, instance edges and the port bindings
+# of the instances (instance port -> net of the parent module), built from the resolved instances of extract_submodule_list (Verilog)
+# and extract_port_map (VHDL)
+# The graph is stored in integer arrays (array('i')) in CSR form, every name is an ID in the string table names :
+#   module m          : module_names[m], module_files[m] (-1 : module instantiated but not defined in the project)
+#   instances of m    : instance_offsets[m] .. instance_offsets[m+1]-1, instance e is instance_names[e] of module instance_modules[e]
+#   bindings of e     : binding_offsets[e] .. binding_offsets[e+1]-1, binding b connects port binding_ports[b] (direction
+#                       binding_directions[b], see directions) to net binding_nets[b], binding_widths[b] is the size of the port with the
+#                       parameter overrides of the instance (see sdf_parameters), -1 when it is not a number
+#   nets of m         : net_offsets[m] .. net_offsets[m+1]-1, net n is the signal net_names[n] of module m
+# The defined modules come first (in the order the generator resolves them), then the modules which are only instantiated
+hierarchy_format = 2
+directions = ['in', 'out', 'inout'] # Direction codes of binding_directions, -1 : port not found
+direction_codes = {'input' : 0, 'in' : 0, 'output' : 1, 'out' : 1, 'inout' : 2}
+stored_arrays = ['module_names', 'module_files', 'instance_offsets', 'instance_names', 'instance_components', 'binding_offsets', 'binding_ports', 'binding_nets', 'binding_directions', 'binding_widths', 'net_offsets', 'net_names']
+
+class HierarchyGraph :
+    def __init__(self, output_path=None) :
+        self.output_path = output_path
+        self.names = []
+        self.name_ids = {} # {name : name ID}
+        self.module_ids = {} # {module_name : module ID} of the defined modules
+        self.module_names = array.array('i')
+        self.module_files = array.array('i')
+        self.instance_offsets = array.array('i', [0])
+        self.instance_names = array.array('i')
+        self.instance_components = array.array('i') # Name ID of the instantiated module, resolved to instance_modules by finalize
+        self.instance_modules = None
+        self.binding_offsets = array.array('i', [0])
+        self.binding_ports = array.array('i')
+        self.binding_nets = array.array('i')
+        self.binding_directions = array.array('b')
+        self.binding_widths = None # Computed by finalize
+        self.net_offsets = array.array('i', [0])
+        self.net_names = array.array('i')
+        self.parameter_resolver = sdf_parameters.ParameterResolver() # Parameters and ports of the defined modules
+        self.instance_overrides = [] # Evaluated parameter overrides of each instance (see sdf_parameters.evaluate_overrides)
+
+    def name_id(self, name) :
+        identifier = self.name_ids.get(name)
+        if identifier is None :
+            identifier = self.name_ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return identifier
+
+    # Add a module and its resolved instances : [[instance,module_name,[[port,signal,direction],...]],...], a module defined twice keeps
+    # its first definition (as the module registry of the generators)
+    # parameters and ports ([[port_name,direction,type],...]) size the ports of its instances, instance_overrides are the evaluated parameter
+    # overrides of each instance (see sdf_parameters)
+    def add_module(self, file_name, module_name, instances, parameters=(), ports=(), instance_overrides=None) :
+        if module_name in self.module_ids :
+            return
+        self.remove_undefined_modules()
+        self.parameter_resolver.register(module_name, parameters, ports)
+        self.instance_overrides.extend(instance_overrides if instance_overrides is not None else [[]]*len(instances))
+        self.module_ids[module_name] = len(self.module_names)
+        self.module_names.append(self.name_id(module_name))
+        self.module_files.append(self.name_id(file_name))
+        net_ids = {} # {signal : net ID} of the module
+        for instance_name, component_name, ports in instances :
+            self.instance_names.append(self.name_id(instance_name))
+            self.instance_components.append(self.name_id(component_name))
+            for port, signal, direction in ports :
+                net_id = net_ids.get(signal)
+                if net_id is None :
+                    net_id = net_ids[signal] = len(self.net_names)
+                    self.net_names.append(self.name_id(signal))
+                self.binding_ports.append(self.name_id(port or ''))
+                self.binding_nets.append(net_id)
+                self.binding_directions.append(direction_codes.get(direction, -1))
+            self.binding_offsets.append(len(self.binding_ports))
+        self.instance_offsets.append(len(self.instance_names))
+        self.net_offsets.append(len(self.net_names))
+
+    # Resolve the instantiated module of each instance to a module ID : the defined module of the same name, else of the same name in
+    # lower case (VHDL names are not case sensitive), else a module node without file is added
+    # The modules which are only instantiated get empty instance and net ranges
+    # The bound ports are then sized once per module and override set (see sdf_parameters.ParameterResolver)
+    def finalize(self) :
+        if self.instance_modules is not None :
+            return self
+        lower_ids = {}
+        for module_name, module_id in self.module_ids.items() :
+            lower_ids.setdefault(module_name.lower(), module_id)
+        component_ids = {}
+        self.instance_modules = array.array('i')
+        for component in self.instance_components :
+            module_id = component_ids.get(component)
+            if module_id is None :
+                component_name = self.names[component]
+                module_id = self.module_ids.get(component_name)
+                if module_id is None :
+                    module_id = lower_ids.get(component_name.lower())
+                if module_id is None :
+                    module_id = lower_ids[component_name.lower()] = len(self.module_names)
+                    self.module_names.append(component)
+                    self.module_files.append(-1)
+                    self.instance_offsets.append(len(self.instance_names))
+                    self.net_offsets.append(len(self.net_names))
+                component_ids[component] = module_id
+            self.instance_modules.append(module_id)
+        self.binding_widths = array.array('i')
+        for instance, module_id in enumerate(self.instance_modules) :
+            module_name = self.module_name(module_id)
+            port_widths = self.parameter_resolver.port_widths(module_name, self.parameter_resolver.override_set(module_name, self.instance_overrides[instance]))
+            for binding in range(self.binding_offsets[instance], self.binding_offsets[instance+1]) :
+                width = port_widths.get(self.names[self.binding_ports[binding]], '')
+                self.binding_widths.append(int(width) if width.isdigit() else -1)
+        return self
+
+    # Remove the module nodes added by finalize, before a new module is added
+    def remove_undefined_modules(self) :
+        defined_count = len(self.module_ids)
+        del self.module_names[defined_count:]
+        del self.module_files[defined_count:]
+        del self.instance_offsets[defined_count+1:]
+        del self.net_offsets[defined_count+1:]
+        self.instance_modules = None
+        self.binding_widths = None
+
+    # Write the graph to output_path
+    def close(self) :
+        self.finalize()
+        try :
+            self.save(self.output_path)
+        except OSError as error :
+            print(f"Error: {self.output_path} can not be written ({error})")
+            return
+        print(f"Hierarchy graph : {self.output_path} ({len(self.module_names)} modules, {len(self.instance_names)} instances, {len(self.binding_ports)} bindings)")
+
+    # Write the string table and the arrays of the graph with pickle (an array is stored as its raw bytes)
+    def save(self, output_path) :
+        self.finalize()
+        graph = {'format' : hierarchy_format, 'names' : self.names, 'instance_modules' : self.instance_modules}
+        for name in stored_arrays :
+            graph[name] = getattr(self, name)
+        with open(output_path, 'wb') as file :
+            pickle.dump(graph, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def module_name(self, module_id) :
+        return self.names[self.module_names[module_id]]
+
+    # Return the module ID of a module name (or of the same name in lower case), None if the module is not in the graph
+    def find_module(self, module_name) :
+        self.finalize()
+        for module_id, name in enumerate(self.module_names) :
+            if self.names[name] == module_name :
+                return module_id
+        for module_id, name in enumerate(self.module_names) :
+            if self.names[name].lower() == module_name.lower() :
+                return module_id
+        return None
+
+    # Return the number of instances of each module : array indexed by module ID
+    def instance_counts(self) :
+        self.finalize()
+        counts = array.array('i', bytes(4*len(self.module_names)))
+        for module_id in self.instance_modules :
+            counts[module_id] += 1
+        return counts
+
+    # Return the IDs of the modules reachable from the modules root_ids (root_ids included)
+    def reachable_modules(self, root_ids) :
+        self.finalize()
+        reached = bytearray(len(self.module_names))
+        pending = list(root_ids)
+        for module_id in pending :
+            reached[module_id] = 1
+        while pending :
+            module_id = pending.pop()
+            for instance in range(self.instance_offsets[module_id], self.instance_offsets[module_id+1]) :
+                child = self.instance_modules[instance]
+                if not reached[child] :
+                    reached[child] = 1
+                    pending.append(child)
+        return [module_id for module_id in range(len(self.module_names)) if reached[module_id]]
+
+    # Return the top modules : the defined modules which are not instantiated, sorted by decreasing number of modules in their hierarchy
+    def top_modules(self) :
+        counts = self.instance_counts()
+        roots = [module_id for module_id in range(len(self.module_names)) if counts[module_id] == 0 and self.module_files[module_id] != -1]
+        return sorted(roots, key=lambda module_id: (-len(self.reachable_modules([module_id])), self.module_name(module_id)))
+
+    # Return the defined modules which are not in the hierarchy of the top modules top_ids (default : the top module with the largest hierarchy)
+    def unused_modules(self, top_ids=None) :
+        if top_ids is None :
+            top_ids = self.top_modules()[:1]
+        reached = set(self.reachable_modules(top_ids))
+        return [module_id for module_id in range(len(self.module_names)) if module_id not in reached and self.module_files[module_id] != -1]
+
+    # Return the modules which are instantiated but not defined in the project
+    def undefined_modules(self) :
+        self.finalize()
+        return [module_id for module_id in range(len(self.module_names)) if self.module_files[module_id] == -1]
+
+    # Return the fan-out of each net : number of instance input ports it drives (inout ports included), array indexed by net ID
+    def net_fanouts(self) :
+        fanouts = array.array('i', bytes(4*len(self.net_names)))
+        for net_id, direction in zip(self.binding_nets, self.binding_directions) :
+            if direction == 0 or direction == 2 :
+                fanouts[net_id] += 1
+        return fanouts
+
+    # Return the instances of a module : [[instance_name,module_name,[[port,net,width],...]],...] (width : see binding_widths)
+    def module_instances(self, module_id) :
+        self.finalize()
+        instances = []
+        for instance in range(self.instance_offsets[module_id], self.instance_offsets[module_id+1]) :
+            bindings = [[self.names[self.binding_ports[binding]], self.names[self.net_names[self.binding_nets[binding]]], self.binding_widths[binding]] for binding in range(self.binding_offsets[instance], self.binding_offsets[instance+1])]
+            instances.append([self.names[self.instance_names[instance]], self.module_name(self.instance_modules[instance]), bindings])
+        return instances
+
+    # Return the module ID of each net : array indexed by net ID
+    def net_modules(self) :
+        self.finalize()
+        modules = array.array('i')
+        for module_id in range(len(self.module_names)) :
+            modules.extend([module_id]*(self.net_offsets[module_id+1]-self.net_offsets[module_id]))
+        return modules
+
+# Read a graph written by HierarchyGraph.save, return None if the file can not be read
+def load(input_path) :
+    try :
+        with open(input_path, 'rb') as file :
+            graph = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError) as error :
+        print(f"Error: {input_path} can not be read ({error})")
+        return None
+    if not isinstance(graph, dict) or graph.get('format') != hierarchy_format :
+        print(f"Error: {input_path} is not a hierarchy graph of format {hierarchy_format}")
+        return None
+    hierarchy = HierarchyGraph()
+    hierarchy.names = graph['names']
+    hierarchy.name_ids = {name : name_id for name_id, name in enumerate(hierarchy.names)}
+    for name in stored_arrays :
+        setattr(hierarchy, name, graph[name])
+    hierarchy.instance_modules = graph['instance_modules']
+    hierarchy.module_ids = {hierarchy.module_name(module_id) : module_id for module_id in range(len(hierarchy.module_names)) if hierarchy.module_files[module_id] != -1}
+    return hierarchy
+
+def help() :
+    print("""
+Usage:
+------
+
+Analyse a hierarchy graph written by gen_sdf_from_verilog.py, gen_sdf_from_vhdl.py or gen_sdf_mixed.py with --hierarchy PATH.
+
+   Example:
+   python sdf_hierarchy.py <graph_path> [--top] [--unused [TOP_MODULE]] [--undefined] [--fanout N] [--instances MODULE]
+
+   - --top              : Top modules (defined modules not instantiated), largest hierarchy first.
+   - --unused [TOP]     : Defined modules not in the hierarchy of TOP (default: the first top module).
+   - --undefined        : Modules instantiated but not defined in the project.
+   - --fanout N         : The N nets with the largest fan-out (number of instance input ports driven).
+   - --instances MODULE : Instances of MODULE with their port bindings, the ports are sized with the parameter
+                          overrides of each instance (? : the size is not a number).
+   Without option, the counts of the graph and the top modules are printed.
+""")
+
+def main() :
+    arguments = sys.argv[1:]
+    if not arguments or arguments[0] == "-help" :
+        help()
+        return 0
+    hierarchy = load(arguments[0])
+    if hierarchy is None :
+        sys.exit(1)
+    print(f"Hierarchy graph : {arguments[0]} ({len(hierarchy.module_names)} modules, {len(hierarchy.instance_names)} instances, {len(hierarchy.binding_ports)} bindings, {len(hierarchy.net_names)} nets)")
+    options = arguments[1:] or ["--top"]
+    i = 0
+    while i < len(options) :
+        if options[i] == "--top" :
+            print("Top modules :")
+            for module_id in hierarchy.top_modules() :
+                print(f"   {hierarchy.module_name(module_id)} ({len(hierarchy.reachable_modules([module_id]))} modules in its hierarchy)")
+        elif options[i] == "--unused" :
+            top_ids = None
+            if i+1 < len(options) and not options[i+1].startswith("--") :
+                i += 1
+                top_id = hierarchy.find_module(options[i])
+                if top_id is None :
+                    print(f"Error: module {options[i]} is not in the graph")
+                    sys.exit(1)
+                top_ids = [top_id]
+            print("Unused modules :")
+            for module_id in hierarchy.unused_modules(top_ids) :
+                print(f"   {hierarchy.module_name(module_id)} ({hierarchy.names[hierarchy.module_files[module_id]]})")
+        elif options[i] == "--undefined" :
+            print("Undefined modules :")
+            for module_id in hierarchy.undefined_modules() :
+                print(f"   {hierarchy.module_name(module_id)}")
+        elif options[i] == "--fanout" :
+            if i+1 >= len(options) or not options[i+1].isdigit() :
+                print(f"{options[i]} must be followed by a number")
+                sys.exit(1)
+            i += 1
+            fanouts = hierarchy.net_fanouts()
+            net_modules = hierarchy.net_modules()
+            print("Largest fan-out :")
+            for net_id in sorted(range(len(fanouts)), key=lambda net_id: -fanouts[net_id])[:int(options[i])] :
+                print(f"   {hierarchy.module_name(net_modules[net_id])}.{hierarchy.names[hierarchy.net_names[net_id]]} : {fanouts[net_id]}")
+        elif options[i] == "--instances" :
+            if i+1 >= len(options) :
+                print(f"{options[i]} must be followed by a module name")
+                sys.exit(1)
+            i += 1
+            module_id = hierarchy.find_module(options[i])
+            if module_id is None :
+                print(f"Error: module {options[i]} is not in the graph")
+                sys.exit(1)
+            print(f"Instances of {hierarchy.module_name(module_id)} :")
+            for instance_name, module_name, bindings in hierarchy.module_instances(module_id) :
+                print(f"   {instance_name} ({module_name}) : " + ", ".join(f"{port}={net}[{width if width >= 0 else '?'}]" for port, net, width in bindings))
+        else :
+            print(f"Unknown option {options[i]}")
+            help()
+            sys.exit(1)
+        i += 1
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+
+manifest_extension = ".manifest" # The manifest of output.csv is output.csv.manifest
+manifest_version = 1
+copy_chunk_size = 1024*1024
+watch_interval = 1.0 # Seconds between two polls of the source files in watch mode
+watch_debounce = 0.5 # Seconds without change before a burst of saves is processed
+
+# Return the state of a source file : [modification_time_ns,size,sha256 of the content]
+# The content is only hashed when the modification time or the size differ from previous_state
+def source_state(file_path, previous_state=None) :
+    file_stat = os.stat(file_path)
+    if previous_state and previous_state[0] == file_stat.st_mtime_ns and previous_state[1] == file_stat.st_size :
+        return [file_stat.st_mtime_ns, file_stat.st_size, previous_state[2]]
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(copy_chunk_size), b"") :
+            content_hash.update(chunk)
+    return [file_stat.st_mtime_ns, file_stat.st_size, content_hash.hexdigest()]
+
+# Return True if the source file changed since previous_state (see source_state)
+def source_changed(state, previous_state) :
+    return previous_state is None or state[2] != previous_state[2]
+
+# Return the manifest of the previous run for output_path : {'sources' : {file_path : state},'blocks' : [[file_name,file_path,start,end,...],...]}
+# The manifest is read from the disk unless it is given (watch mode keeps it in memory)
+# None is returned if there is no manifest, if it was written for another context (parser version, define_list) or if the output file was modified since
+def load_manifest(output_path, context, manifest=None) :
+    try :
+        if manifest is None :
+            with open(output_path + manifest_extension, "r") as file:
+                manifest = json.load(file)
+        output_stat = os.stat(output_path)
+    except (OSError, ValueError) :
+        return None
+    if manifest.get('version') != manifest_version or manifest.get('context') != context :
+        return None
+    if manifest.get('output') != [output_stat.st_mtime_ns, output_stat.st_size] :
+        return None
+    return manifest
+
+# Write the manifest of output_path and return it, the blocks are the byte ranges [start,end) of the files in the output file
+def store_manifest(output_path, context, sources, blocks) :
+    output_stat = os.stat(output_path)
+    manifest = {'version' : manifest_version, 'context' : context, 'output' : [output_stat.st_mtime_ns, output_stat.st_size], 'sources' : sources, 'blocks' : blocks}
+    manifest_path = output_path + manifest_extension
+    temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+    try :
+        with open(temporary_path, "w") as file:
+            json.dump(manifest, file)
+        os.replace(temporary_path, manifest_path)
+    except OSError as error :
+        print(f"Error: manifest '{manifest_path}' can not be written ({error})")
+    return manifest
+
+# Copy the bytes [start,end) of the previous output file (opened in binary mode) to the new output file (opened in text mode)
+def copy_block(previous_output, output, start, end) :
+    previous_output.seek(start)
+    output.flush() # The text written before the block must reach the file first
+    while start < end :
+        chunk = previous_output.read(min(copy_chunk_size, end-start))
+        if not chunk :
+            break
+        output.buffer.write(chunk)
+        start += len(chunk)
+
+# Return the modification time and the size of the files : {file_path : [modification_time_ns,size]} (missing files are left out)
+def snapshot(file_paths) :
+    states = {}
+    for file_path in file_paths :
+        try :
+            file_stat = os.stat(file_path)
+        except OSError :
+            continue
+        states[file_path] = [file_stat.st_mtime_ns, file_stat.st_size]
+    return states
+
+# Watch mode : the parsed forms stay in memory between two regenerations, kept_files is {file_path : [state,parsed_form]} with the state of
+# the file in the snapshot of the regeneration where it was parsed (see snapshot)
+# Return {file_path : parsed_form} of the files of file_paths unchanged in current_snapshot since they were parsed, and the other file paths
+def split_kept_files(kept_files, current_snapshot, file_paths) :
+    parsed_forms = {}
+    changed_paths = []
+    for file_path in file_paths :
+        kept_file = kept_files.get(file_path)
+        if kept_file and kept_file[0] == current_snapshot.get(file_path) :
+            parsed_forms[file_path] = kept_file[1]
+        else :
+            changed_paths.append(file_path)
+    return parsed_forms, changed_paths
+
+# Poll the files returned by list_files() until their snapshot differs from previous_snapshot, then wait until it stays unchanged
+# for debounce seconds, so that a burst of saves is processed once : return the new snapshot
+def wait_for_changes(list_files, previous_snapshot, interval=watch_interval, debounce=watch_debounce) :
+    current_snapshot = previous_snapshot
+    while current_snapshot == previous_snapshot :
+        time.sleep(interval)
+        current_snapshot = snapshot(list_files())
+    while True :
+        time.sleep(debounce)
+        latest_snapshot = snapshot(list_files())
+        if latest_snapshot == current_snapshot :
+            return latest_snapshot
+        current_snapshot = latest_snapshot
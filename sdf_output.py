@@ -0,0 +1,39 @@
+import csv
+import os
+
+default_buffer_size = 1024 # Size of the write buffer of the csv file in KB (--write-buffer KB)
+buffer_size = default_buffer_size
+
+# Output csv file of a run, kept open from the first row to the last one : the rows are written with one csv writer and a large write buffer
+# to a temporary file next to the output file, which replaces the output file when the sink is committed
+# Used as a context manager, the sink is committed at the end of the block, or removed if an exception is raised, so a crashed or interrupted
+# run leaves the previous output file untouched instead of a half-written one
+class CsvSink :
+    def __init__(self, output_path) :
+        self.output_path = output_path
+        self.temporary_path = f"{output_path}.{os.getpid()}.tmp"
+        self.file = open(self.temporary_path, mode='w', newline='', buffering=max(buffer_size,8)*1024)
+        self.writer = csv.writer(self.file, delimiter=';')
+
+    # Close the temporary file and rename it to the output file
+    def commit(self) :
+        self.file.close()
+        os.replace(self.temporary_path, self.output_path)
+
+    # Close and remove the temporary file
+    def discard(self) :
+        self.file.close()
+        try :
+            os.remove(self.temporary_path)
+        except OSError :
+            pass
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, exception_type, exception, traceback) :
+        if exception_type is None :
+            self.commit()
+        else :
+            self.discard()
+        return False
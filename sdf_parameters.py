@@ -0,0 +1,79 @@
+import sdf_width
+
+# Parameter and generic resolution, shared by the Verilog and VHDL generators and the hierarchy graph (see sdf_hierarchy)
+# The parameters of a module are [[name,expression,overridable],...] in their declaration order (name in lower case, expression : text of the
+# default value) : Verilog parameter (overridable) and localparam, VHDL generic (overridable) and constant
+# The constant table of a module is {name : value} of the parameters whose value is an integer, a parameter can use the previous ones :
+# localparam DEPTH = 1 << W is not an integer expression (see sdf_width.parse_expression) and is left out, the sizes using it stay symbolic
+# An instance overrides parameters with #(...) or generic map : its override set is ((name,value),...) sorted by name, value is None when
+# the override expression has no integer value in the scope of the parent module
+
+# Return the integer value of an expression with the constants of its scope, None if it is not constant
+def constant_value(expression, constants) :
+    terms = sdf_width.parse_expression(expression, constants)
+    if terms is None or not sdf_width.is_constant(terms) :
+        return None
+    return terms.get('', 0)
+
+# Return the constant table of a module, override_values ({name : value}) replaces the default value of its overridable parameters
+def module_constants(parameters, override_values=None) :
+    constants = {}
+    for name, expression, overridable in parameters :
+        if overridable and override_values and name in override_values :
+            value = override_values[name]
+        else :
+            value = constant_value(expression, constants)
+        if value is not None :
+            constants[name] = value
+    return constants
+
+# Evaluate the overrides of an instance ([[name or position,expression],...]) with the constants of its parent : [[name or position,value],...]
+def evaluate_overrides(overrides, constants) :
+    return [[parameter, constant_value(expression, constants)] for parameter, expression in overrides]
+
+# Constant tables and port sizes of the modules of a run, computed once per module and override set
+class ParameterResolver :
+    def __init__(self) :
+        self.modules = {} # {module_name : [parameters,ports]}, the first definition of a module is kept
+        self.constant_tables = {} # {(module_name,override_set) : constants}
+        self.port_sizes = {} # {(module_name,override_set) : {port_name : size}}
+
+    def register(self, module_name, parameters, ports) :
+        self.modules.setdefault(module_name, [parameters, ports])
+
+    # Return the override set of an instance of module_name from its evaluated overrides (see evaluate_overrides) : a positional override
+    # is given to the overridable parameters in their declaration order, the overrides of other names are dropped
+    def override_set(self, module_name, overrides) :
+        if not overrides or module_name not in self.modules :
+            return ()
+        overridable = [name for name, expression, is_overridable in self.modules[module_name][0] if is_overridable]
+        override_values = {}
+        for parameter, value in overrides :
+            if isinstance(parameter, int) :
+                parameter = overridable[parameter] if parameter < len(overridable) else None
+            if parameter in overridable :
+                override_values[parameter] = value
+        return tuple(sorted(override_values.items()))
+
+    # Return the constant table of module_name with an override set
+    def constants(self, module_name, override_set=()) :
+        key = (module_name, override_set)
+        constants = self.constant_tables.get(key)
+        if constants is None :
+            parameters = self.modules.get(module_name, [[], []])[0]
+            constants = self.constant_tables[key] = module_constants(parameters, dict(override_set))
+        return constants
+
+    # Return the sizes of the ports of module_name with an override set : {port_name : size} (see sdf_width.signal_width)
+    def port_widths(self, module_name, override_set=()) :
+        key = (module_name, override_set)
+        port_sizes = self.port_sizes.get(key)
+        if port_sizes is None :
+            constants = self.constants(module_name, override_set)
+            port_sizes = self.port_sizes[key] = {}
+            for port_name, direction, port_type in self.modules.get(module_name, [[], []])[1] :
+                port_sizes.setdefault(port_name, sdf_width.signal_width(port_type, constants))
+            for port_name, size in port_sizes.items() : # The size of x'range is the one of the port x
+                if size.endswith(' size') and port_sizes.get(size[:-len(' size')].lower(), 'unknown') != 'unknown' :
+                    port_sizes[port_name] = port_sizes[size[:-len(' size')].lower()]
+        return port_sizes
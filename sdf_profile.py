@@ -0,0 +1,235 @@
+import os
+import re
+import sys
+import json
+import time
+import cProfile
+
+# Instrumentation of a run (--profile) : wall time and calls of the stages, per stage and per file, and match counts of the regular expressions
+# Nothing is instrumented until enable is called : the stage functions of the generator are then replaced by timed functions, so a run
+# without --profile has no cost at all
+slowest_file_count = 10 # Number of files of the slowest files table (--profile-top N)
+regex_count = 15 # Number of regular expressions of the regex table
+run_file_name = "(run)" # File of the stages which are not called for a file (find_files, evict, ...)
+
+enabled = False
+start_time = None
+stages = {} # {stage_name : [time,calls]}, the time of a stage excludes the time of the stages it calls
+file_stages = {} # {file_name : {stage_name : [time,calls]}}
+regex_counts = {} # {pattern : [calls,matches,time]}
+running_stages = [] # [stage_name,file_name,time of the called stages] of the stage calls in progress, innermost last
+profiled_file = None # File name of the cProfile dump (--profile-file NAME)
+profiler = None
+profiler_depth = 0
+
+# Return the file name of a stage argument (a file path is reduced to its file name, as in the file_name(...) rows of sdf.csv)
+def file_key(argument) :
+    return os.path.basename(argument) if isinstance(argument, str) else None
+
+def add_time(stage_times, stage_name, elapsed) :
+    stage = stage_times.get(stage_name)
+    if stage is None :
+        stage = stage_times[stage_name] = [0.0, 0]
+    stage[0] += elapsed
+    stage[1] += 1
+
+# Return a function calling function and adding its wall time to the stage stage_name, for the file of its argument number file_argument
+# (None : the file of the calling stage), the calls of the profiled file are also recorded by cProfile
+def timed(stage_name, function, file_argument) :
+    def timed_function(*arguments, **keyword_arguments) :
+        global profiler_depth
+        if file_argument is not None and len(arguments) > file_argument :
+            file_name = file_key(arguments[file_argument])
+        else :
+            file_name = running_stages[-1][1] if running_stages else None
+        running_stage = [stage_name, file_name, 0.0]
+        running_stages.append(running_stage)
+        profiling = profiler is not None and file_name == profiled_file
+        if profiling :
+            profiler_depth += 1
+            if profiler_depth == 1 :
+                profiler.enable()
+        start = time.perf_counter()
+        try :
+            return function(*arguments, **keyword_arguments)
+        finally :
+            elapsed = time.perf_counter() - start
+            if profiling :
+                profiler_depth -= 1
+                if profiler_depth == 0 :
+                    profiler.disable()
+            running_stages.pop()
+            add_time(stages, stage_name, elapsed - running_stage[2])
+            add_time(file_stages.setdefault(file_name or run_file_name, {}), stage_name, elapsed - running_stage[2])
+            if running_stages :
+                running_stages[-1][2] += elapsed
+    return timed_function
+
+# Return the key of a compiled regular expression in regex_counts : its pattern on one line
+def pattern_key(pattern) :
+    key = " ".join(str(pattern.pattern).split())
+    return key if len(key) <= 80 else key[:77] + "..."
+
+# Compiled regular expression counting its calls, matches and time in regex_counts
+class CountingPattern :
+    def __init__(self, pattern) :
+        self.compiled_pattern = pattern
+        self.counts = regex_counts.setdefault(pattern_key(pattern), [0, 0, 0.0])
+
+    def __getattr__(self, name) :
+        return getattr(self.compiled_pattern, name)
+
+    def count(self, matches, start) :
+        self.counts[0] += 1
+        self.counts[1] += matches
+        self.counts[2] += time.perf_counter() - start
+
+    def search(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        match = self.compiled_pattern.search(*arguments, **keyword_arguments)
+        self.count(match is not None, start)
+        return match
+
+    def match(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        match = self.compiled_pattern.match(*arguments, **keyword_arguments)
+        self.count(match is not None, start)
+        return match
+
+    def fullmatch(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        match = self.compiled_pattern.fullmatch(*arguments, **keyword_arguments)
+        self.count(match is not None, start)
+        return match
+
+    def findall(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        matches = self.compiled_pattern.findall(*arguments, **keyword_arguments)
+        self.count(len(matches), start)
+        return matches
+
+    # Only the time spent in the regular expression is counted, not the time of the loop body of the caller
+    def finditer(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        iterator = self.compiled_pattern.finditer(*arguments, **keyword_arguments)
+        self.count(0, start)
+        while True :
+            start = time.perf_counter()
+            match = next(iterator, None)
+            self.counts[2] += time.perf_counter() - start
+            if match is None :
+                return
+            self.counts[1] += 1
+            yield match
+
+    def subn(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        result = self.compiled_pattern.subn(*arguments, **keyword_arguments)
+        self.count(result[1], start)
+        return result
+
+    def sub(self, *arguments, **keyword_arguments) :
+        return self.subn(*arguments, **keyword_arguments)[0]
+
+    def split(self, *arguments, **keyword_arguments) :
+        start = time.perf_counter()
+        parts = self.compiled_pattern.split(*arguments, **keyword_arguments)
+        self.count((len(parts)-1) // (self.compiled_pattern.groups+1), start)
+        return parts
+
+# Replacement of the re module in the instrumented generator : the module functions use counting compiled patterns (re caches the compiled patterns)
+class CountingRe :
+    def __getattr__(self, name) :
+        return getattr(re, name)
+
+    def compile(self, pattern, flags=0) :
+        return CountingPattern(re.compile(pattern, flags))
+
+    def search(self, pattern, string, flags=0) :
+        return self.compile(pattern, flags).search(string)
+
+    def match(self, pattern, string, flags=0) :
+        return self.compile(pattern, flags).match(string)
+
+    def fullmatch(self, pattern, string, flags=0) :
+        return self.compile(pattern, flags).fullmatch(string)
+
+    def findall(self, pattern, string, flags=0) :
+        return self.compile(pattern, flags).findall(string)
+
+    def finditer(self, pattern, string, flags=0) :
+        return self.compile(pattern, flags).finditer(string)
+
+    def sub(self, pattern, repl, string, count=0, flags=0) :
+        return self.compile(pattern, flags).sub(repl, string, count)
+
+    def subn(self, pattern, repl, string, count=0, flags=0) :
+        return self.compile(pattern, flags).subn(repl, string, count)
+
+    def split(self, pattern, string, maxsplit=0, flags=0) :
+        return self.compile(pattern, flags).split(string, maxsplit)
+
+# Instrument the stage functions of a generator module : stage_functions is [[function_name,file_argument],...] (see timed), the functions of
+# the helper modules are prefixed with their module name (e.g. sdf_cache.read_source)
+# The regular expressions of the module are counted too if count_regex, profile_file is the file name of the cProfile dump (see report)
+def enable(module, stage_functions, profile_file=None, count_regex=True) :
+    global enabled, start_time, profiled_file, profiler
+    enabled = True
+    start_time = time.perf_counter()
+    for function_name, file_argument in stage_functions :
+        owner = sys.modules[function_name.rsplit('.', 1)[0]] if '.' in function_name else module
+        attribute = function_name.rsplit('.', 1)[-1]
+        setattr(owner, attribute, timed(function_name, getattr(owner, attribute), file_argument))
+    if count_regex :
+        for name, value in list(vars(module).items()) :
+            if isinstance(value, re.Pattern) :
+                setattr(module, name, CountingPattern(value))
+        module.re = CountingRe()
+    if profile_file :
+        profiled_file = profile_file
+        profiler = cProfile.Profile()
+
+# Return the stages as a dictionary {stage_name : {'time' : time,'calls' : calls}} sorted by decreasing time
+def stage_table(stage_times) :
+    return {stage_name : {'time' : round(stage[0], 6), 'calls' : stage[1]} for stage_name, stage in sorted(stage_times.items(), key=lambda item: -item[1][0])}
+
+# Return the measures of the run : wall time, stages, files (slowest first) and regular expressions (slowest first)
+def results() :
+    wall_time = time.perf_counter() - start_time if start_time is not None else 0.0
+    files = sorted(([file_name, sum(stage[0] for stage in stage_times.values()), stage_times] for file_name, stage_times in file_stages.items() if file_name != run_file_name), key=lambda item: -item[1])
+    return {'wall_time' : round(wall_time, 6),
+        'stages' : stage_table(stages),
+        'files' : [{'file_name' : file_name, 'time' : round(file_time, 6), 'stages' : stage_table(stage_times)} for file_name, file_time, stage_times in files],
+        'regex' : [{'pattern' : pattern, 'calls' : counts[0], 'matches' : counts[1], 'time' : round(counts[2], 6)} for pattern, counts in sorted(regex_counts.items(), key=lambda item: -item[1][2])]}
+
+# Print the summary tables of the run and write its measures to json_path, and the cProfile statistics of the profiled file to prof_path
+def report(json_path=None, prof_path=None, top=slowest_file_count) :
+    measures = results()
+    wall_time = measures['wall_time']
+    print(f"Profile : {wall_time:.3f} s")
+    print(f"   {'stage':<28} {'time (s)':>10} {'%':>6} {'calls':>9}")
+    for stage_name, stage in measures['stages'].items() :
+        print(f"   {stage_name:<28} {stage['time']:>10.3f} {100 * stage['time'] / wall_time if wall_time else 0:>6.1f} {stage['calls']:>9}")
+    print("Slowest files :")
+    for file_measures in measures['files'][:top] :
+        main_stages = ", ".join(f"{stage_name} {stage['time']:.3f} s" for stage_name, stage in list(file_measures['stages'].items())[:3])
+        print(f"   {file_measures['file_name']:<40} {file_measures['time']:>8.3f} s ({main_stages})")
+    if measures['regex'] :
+        print("Regular expressions :")
+        print(f"   {'time (s)':>10} {'calls':>9} {'matches':>9}  pattern")
+        for regex in measures['regex'][:regex_count] :
+            print(f"   {regex['time']:>10.3f} {regex['calls']:>9} {regex['matches']:>9}  {regex['pattern']}")
+    if json_path :
+        try :
+            with open(json_path, "w") as file:
+                json.dump(measures, file, indent=1)
+            print(f"Profile : {json_path}")
+        except OSError as error :
+            print(f"Error: {json_path} can not be written ({error})")
+    if profiler is not None :
+        if profiled_file not in file_stages :
+            print(f"Warning : {profiled_file} was not processed, no cProfile statistics are written")
+        elif prof_path :
+            profiler.dump_stats(prof_path)
+            print(f"cProfile statistics of {profiled_file} : {prof_path} (python -m pstats {prof_path})")
+    return measures
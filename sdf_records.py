@@ -0,0 +1,122 @@
+import array
+import sys
+
+# Name table of the instances and components of the src/dst fields : {name : name_id}, names[name_id], table[name] adds a new name to the table
+class NameTable(dict) :
+    def __init__(self) :
+        self.names = []
+
+    def __missing__(self, name) :
+        identifier = self[name] = len(self.names)
+        self.names.append(sys.intern(name))
+        return identifier
+
+name_table = NameTable() # Name table of the current run, the new records use it
+
+# Start the name table of a new run (a project of a batch, a call of the library API, ...) : the table of the previous run is released
+# with its last record, the names do not pile up in a long-running process
+def new_name_table() :
+    global name_table
+    name_table = NameTable()
+
+# Intern the strings of a parsed form (nested lists), the names repeated across ports, instances and rows are then stored once
+# (pickle keeps a single copy of each shared string, so the parse cache entries and the results of the workers get smaller too)
+def intern_strings(value) :
+    if isinstance(value, str) :
+        return sys.intern(value)
+    if isinstance(value, list) :
+        return [intern_strings(element) for element in value]
+    return value
+
+# A signal row of sdf.csv, returned by the library API (extract_verilog / extract_vhdl)
+# component is the module/entity name, "Internal" or "Variable", the src/dst fields are tuples of names
+# The strings are interned and the four src/dst fields are stored in one array of name IDs of the name table of the run (see new_name_table) :
+# [4 lengths, instance_src IDs, component_src IDs, instance_dst IDs, component_dst IDs]
+# A record behaves as a named tuple of its fields (comparison, unpacking, indexing, _asdict, _replace), the name IDs are internal to the
+# process : a record is pickled with its names
+class SignalRecord :
+    __slots__ = ('file_name', 'component', 'signal_name', 'type', 'size', 'endpoints', 'name_table')
+    _fields = ('file_name', 'component', 'signal_name', 'type', 'size', 'instance_src', 'component_src', 'instance_dst', 'component_dst')
+
+    def __init__(self, file_name, component, signal_name, signal_type, size, instance_src, component_src, instance_dst, component_dst) :
+        self.file_name = sys.intern(file_name)
+        self.component = sys.intern(component)
+        self.signal_name = sys.intern(signal_name)
+        self.type = sys.intern(signal_type)
+        self.size = sys.intern(size)
+        self.name_table = name_table
+        endpoints = [len(instance_src), len(component_src), len(instance_dst), len(component_dst)]
+        for endpoint_names in (instance_src, component_src, instance_dst, component_dst) :
+            endpoints.extend(map(name_table.__getitem__, endpoint_names))
+        self.endpoints = array.array('i', endpoints)
+
+    # Return the names of the src/dst field number column (0 : instance_src, 1 : component_src, 2 : instance_dst, 3 : component_dst)
+    def endpoint_names(self, column) :
+        start = 4 + sum(self.endpoints[:column])
+        return tuple(map(self.name_table.names.__getitem__, self.endpoints[start:start+self.endpoints[column]]))
+
+    @property
+    def instance_src(self) :
+        return self.endpoint_names(0)
+
+    @property
+    def component_src(self) :
+        return self.endpoint_names(1)
+
+    @property
+    def instance_dst(self) :
+        return self.endpoint_names(2)
+
+    @property
+    def component_dst(self) :
+        return self.endpoint_names(3)
+
+    def __repr__(self) :
+        return "SignalRecord(" + ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields) + ")"
+
+    def __iter__(self) :
+        return iter((self.file_name, self.component, self.signal_name, self.type, self.size, self.instance_src, self.component_src, self.instance_dst, self.component_dst))
+
+    def __len__(self) :
+        return len(self._fields)
+
+    def __getitem__(self, index) :
+        return tuple(self)[index]
+
+    def __eq__(self, other) :
+        if isinstance(other, (SignalRecord, tuple)) :
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) :
+        return hash(tuple(self))
+
+    def __reduce__(self) :
+        return (SignalRecord, tuple(self))
+
+    def _asdict(self) :
+        return dict(zip(self._fields, self))
+
+    def _replace(self, **changes) :
+        return SignalRecord(*[changes.pop(field, value) for field, value in zip(self._fields, self)])
+
+    @classmethod
+    def _make(cls, values) :
+        return cls(*values)
+
+# Header row of the file blocks of sdf.csv, written by both generators before the rows of each file (see csv_row)
+csv_header = ["component", "signal_name", "type", "size","instance src", "component_src", "instance_dst", "component_dst"]
+
+# Return the csv row of a signal record : [component,signal_name,type,size,instance src,component_src,instance_dst,component_dst] (the name tuples are joined with ',')
+def csv_row(record) :
+    names = record.name_table.names
+    endpoints = record.endpoints
+    component_src_start = 4 + endpoints[0]
+    instance_dst_start = component_src_start + endpoints[1]
+    component_dst_start = instance_dst_start + endpoints[2]
+    component_dst_end = component_dst_start + endpoints[3]
+    return [record.component, record.signal_name, record.type, record.size,
+        ",".join(map(names.__getitem__, endpoints[4:component_src_start])),
+        ",".join(map(names.__getitem__, endpoints[component_src_start:instance_dst_start])),
+        ",".join(map(names.__getitem__, endpoints[instance_dst_start:component_dst_start])),
+        ",".join(map(names.__getitem__, endpoints[component_dst_start:component_dst_end]))]
@@ -0,0 +1,119 @@
+import itertools
+import sqlite3
+
+# SQLite output of the signal records (see sdf_records.SignalRecord), written with --sqlite PATH
+# Several projects (Verilog and VHDL) can be written to the same database, each project is written in one transaction which replaces its previous rows
+# in the same language (a directory with .v and .vhd files keeps the rows of both generators)
+#   files     : id, project (input directory), language, file_name
+#   modules   : id, name (the components of the signals and of the src/dst endpoints : module/entity names, "Internal", "Variable", "input", "output", ...)
+#   signals   : id, file_id, component_id, name, type, size
+#   endpoints : signal_id, direction ('src' or 'dst'), position, instance, module_id
+# e.g. the nets driven by module X and loaded by module Y :
+#   SELECT DISTINCT files.project, signals.name FROM signals JOIN files ON files.id = signals.file_id
+#   JOIN endpoints src ON src.signal_id = signals.id AND src.direction = 'src' JOIN modules msrc ON msrc.id = src.module_id AND msrc.name = 'X'
+#   JOIN endpoints dst ON dst.signal_id = signals.id AND dst.direction = 'dst' JOIN modules mdst ON mdst.id = dst.module_id AND mdst.name = 'Y'
+database_schema = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, project TEXT NOT NULL, language TEXT NOT NULL, file_name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS modules (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS signals (id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL REFERENCES files(id), component_id INTEGER NOT NULL REFERENCES modules(id), name TEXT NOT NULL, type TEXT, size TEXT);
+CREATE TABLE IF NOT EXISTS endpoints (signal_id INTEGER NOT NULL REFERENCES signals(id), direction TEXT NOT NULL, position INTEGER NOT NULL, instance TEXT, module_id INTEGER REFERENCES modules(id));
+CREATE INDEX IF NOT EXISTS files_project ON files(project);
+CREATE INDEX IF NOT EXISTS signals_file ON signals(file_id);
+CREATE INDEX IF NOT EXISTS signals_name ON signals(name);
+CREATE INDEX IF NOT EXISTS signals_component ON signals(component_id);
+CREATE INDEX IF NOT EXISTS signals_size ON signals(size);
+CREATE INDEX IF NOT EXISTS endpoints_signal ON endpoints(signal_id);
+CREATE INDEX IF NOT EXISTS endpoints_module ON endpoints(module_id, direction);
+CREATE VIEW IF NOT EXISTS signal_rows AS
+    SELECT files.project, files.language, files.file_name, modules.name AS component, signals.name AS signal_name, signals.type, signals.size, signals.id AS signal_id
+    FROM signals JOIN files ON files.id = signals.file_id JOIN modules ON modules.id = signals.component_id;
+"""
+
+# Writer of the signal records of one project : add the records of each file, then close to commit the project
+class SignalDatabase :
+    def __init__(self, database_path, project, language) :
+        self.database_path = database_path
+        self.project = project
+        self.language = language
+        self.connection = None
+        self.row_count = 0
+        try :
+            self.connection = sqlite3.connect(database_path, timeout=60)
+            self.connection.executescript(database_schema)
+            self.connection.execute("BEGIN")
+            # The rows of the previous run of the project in the same language are replaced, the other languages of the project are kept
+            project_files = "SELECT id FROM files WHERE project = ? AND language = ?"
+            self.connection.execute(f"DELETE FROM endpoints WHERE signal_id IN (SELECT id FROM signals WHERE file_id IN ({project_files}))", (project, language))
+            self.connection.execute(f"DELETE FROM signals WHERE file_id IN ({project_files})", (project, language))
+            self.connection.execute("DELETE FROM files WHERE project = ? AND language = ?", (project, language))
+            self.next_file_id = self.connection.execute("SELECT COALESCE(MAX(id),0)+1 FROM files").fetchone()[0]
+            self.next_signal_id = self.connection.execute("SELECT COALESCE(MAX(id),0)+1 FROM signals").fetchone()[0]
+            self.module_ids = dict((name, identifier) for identifier, name in self.connection.execute("SELECT id, name FROM modules"))
+        except sqlite3.Error as error :
+            self.fail(error)
+
+    def fail(self, error) :
+        print(f"Error: SQLite database '{self.database_path}' can not be written ({error})")
+        if self.connection :
+            self.connection.close()
+        self.connection = None
+
+    # Return the ID of a module name (None for None), the new names are inserted
+    def module_id(self, name) :
+        if name is None :
+            return None
+        identifier = self.module_ids.get(name)
+        if identifier is None :
+            identifier = self.module_ids[name] = self.connection.execute("INSERT INTO modules (name) VALUES (?)", (name,)).lastrowid
+        return identifier
+
+    # Insert the signal records of a file (one executemany per table), each call adds its own files row : the files of the same name
+    # in different directories of the project are kept apart
+    def add(self, signal_records) :
+        if self.connection is None :
+            return
+        file_rows = []
+        signal_rows = []
+        endpoint_rows = []
+        file_id = None
+        try :
+            for signal_record in signal_records :
+                if file_id is None :
+                    file_id = self.next_file_id
+                    self.next_file_id += 1
+                    file_rows.append((file_id, self.project, self.language, signal_record.file_name))
+                signal_id = self.next_signal_id
+                self.next_signal_id += 1
+                signal_rows.append((signal_id, file_id, self.module_id(signal_record.component), signal_record.signal_name, signal_record.type, signal_record.size))
+                for direction, instances, modules in (('src', signal_record.instance_src, signal_record.component_src), ('dst', signal_record.instance_dst, signal_record.component_dst)) :
+                    for position, (instance, module) in enumerate(itertools.zip_longest(instances, modules)) :
+                        endpoint_rows.append((signal_id, direction, position, instance, self.module_id(module)))
+            self.connection.executemany("INSERT INTO files (id, project, language, file_name) VALUES (?,?,?,?)", file_rows)
+            self.connection.executemany("INSERT INTO signals (id, file_id, component_id, name, type, size) VALUES (?,?,?,?,?,?)", signal_rows)
+            self.connection.executemany("INSERT INTO endpoints (signal_id, direction, position, instance, module_id) VALUES (?,?,?,?,?)", endpoint_rows)
+            self.row_count += len(signal_rows)
+        except sqlite3.Error as error :
+            self.fail(error)
+
+    # Roll back the rows of the project, the previous rows are kept
+    def discard(self) :
+        if self.connection is None :
+            return
+        try :
+            self.connection.rollback()
+            self.connection.close()
+        except sqlite3.Error :
+            pass
+        self.connection = None
+
+    # Commit the project
+    def close(self) :
+        if self.connection is None :
+            return
+        try :
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+            print(f"SQLite output : {self.database_path} ({self.row_count} rows of {self.project})")
+        except sqlite3.Error as error :
+            self.fail(error)
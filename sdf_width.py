@@ -0,0 +1,269 @@
+import re
+
+# Size in bits of a signal type, shared by the Verilog and VHDL generators : the size column of sdf.csv
+#   wire, reg, std_logic, ...                    : '1' (byte : '8', integer : '32')
+#   wire [7:0], std_logic_vector(7 downto 0)     : '8'
+#   wire [W-1:0], std_logic_vector(W-1 downto 0) : 'W', the bounds are evaluated as constant expressions (+ - * / % ** $clog2 and parentheses),
+#                                                  the names stay symbolic : [(W*2)-1:0] -> 'W*2', [N:0] -> 'N+1', [2*8-1:0] -> '16'
+#                                                  unless their value is given in constants (see sdf_parameters) : [W-1:0] with W=8 -> '8'
+#   unsigned(din'range)                          : 'din size'
+#   anything else                                : 'unknown'
+# The sizes are memoized per type string (with its white spaces normalized), the type strings repeat across ports and signals
+width_cache_size = 4096 # Maximum number of memoized type strings, the memo is cleared when it is full
+width_cache = {} # {normalized type string : [size,range difference]} (see evaluate_signal_type)
+
+scalar_sizes = {'wire' : '1', 'reg' : '1', 'logic' : '1', 'std_logic' : '1', 'std_ulogic' : '1', 'bit' : '1', 'byte' : '8'}
+scalar_qualifiers = {'signed', 'unsigned'} # Qualifiers of a Verilog scalar type (reg signed, ...)
+integer_pattern = re.compile(r'\binteger\b', re.IGNORECASE)
+verilog_range_pattern = re.compile(r'\[([^\[\]:]+):([^\[\]]+)\]')
+vhdl_vector_pattern = re.compile(r'\b(?:std_logic_vector|std_ulogic_vector|unsigned|signed|bit_vector)\s*\(', re.IGNORECASE)
+vhdl_direction_pattern = re.compile(r'\b(downto|to)\b', re.IGNORECASE)
+vhdl_range_attribute_pattern = re.compile(r"^\s*(\w+)'range\s*$", re.IGNORECASE)
+token_pattern = re.compile(r"\s*(?:(\d*'[sS]?[bBoOdDhH][0-9a-fA-F_xzXZ?]+|\d[\d_]*)|(`?[A-Za-z_$][\w$.]*)|(\*\*|[-+*/%(),]))")
+based_literal_pattern = re.compile(r"\d*'[sS]?([bBoOdDhH])([0-9a-fA-F_]+)$")
+literal_bases = {'b' : 2, 'o' : 8, 'd' : 10, 'h' : 16}
+
+# Return the size of a signal type (see above), the names of its range are replaced by their value in constants ({name : value}, the
+# names in lower case)
+def signal_width(signal_type, constants=None) :
+    key = ' '.join(signal_type.split())
+    width = width_cache.get(key)
+    if width is None :
+        if len(width_cache) >= width_cache_size :
+            width_cache.clear()
+        width = width_cache[key] = evaluate_signal_type(key)
+    signal_size, difference = width
+    if constants and difference is not None and not is_constant(difference) :
+        return range_size(substitute_constants(difference, constants))
+    return signal_size
+
+# Return [size,difference] : difference is the linear form of msb-lsb for a range type, else None
+def evaluate_signal_type(signal_type) :
+    words = signal_type.lower().split()
+    if len(words) == 1 and words[0] in scalar_sizes :
+        return [scalar_sizes[words[0]], None]
+    if words and words[0] in ('wire', 'reg', 'logic') and all(word in scalar_qualifiers for word in words[1:]) :
+        return ['1', None]
+    if integer_pattern.search(signal_type) :
+        return ['32', None]
+    match = verilog_range_pattern.search(signal_type)
+    if match :
+        return range_width(match.group(1), match.group(2))
+    match = vhdl_vector_pattern.search(signal_type)
+    if match :
+        constraint = parenthesized(signal_type, match.end()-1)
+        if constraint is not None :
+            attribute = vhdl_range_attribute_pattern.match(constraint)
+            if attribute :
+                return [f"{attribute.group(1)} size", None]
+            parts = vhdl_direction_pattern.split(constraint, maxsplit=1)
+            if len(parts) == 3 :
+                left, direction, right = parts
+                if direction.lower() == 'to' :
+                    return range_width(right, left)
+                return range_width(left, right)
+    return ['unknown', None]
+
+# Return the text between the parenthesis at position start and its closing parenthesis, None if it is not closed
+def parenthesized(text, start) :
+    depth = 0
+    for position in range(start, len(text)) :
+        if text[position] == '(' :
+            depth += 1
+        elif text[position] == ')' :
+            depth -= 1
+            if depth == 0 :
+                return text[start+1:position]
+    return None
+
+# Return [size,difference] of the range [msb:lsb] (msb downto lsb), the size is 'unknown' if a bound is not an expression
+def range_width(msb, lsb) :
+    msb_value = parse_expression(msb)
+    lsb_value = parse_expression(lsb)
+    if msb_value is None or lsb_value is None :
+        return ['unknown', None]
+    difference = add_terms(msb_value, lsb_value, -1)
+    return [range_size(difference), difference]
+
+# Return the size of a range from the linear form of msb-lsb as a string
+# A range is sized in both directions : [0:7] is 8 bits, and a symbolic ascending range [0:W-1] (its first name has a negative
+# coefficient in msb-lsb) is sized lsb-msb+1 : 'W'
+def range_size(difference) :
+    if is_constant(difference) :
+        return str(abs(difference.get('', 0)) + 1)
+    leading_coefficient = next(coefficient for name, coefficient in difference.items() if name and coefficient)
+    if leading_coefficient < 0 :
+        difference = scale_terms(difference, -1)
+    return format_terms(add_terms(difference, {'' : 1}, 1))
+
+# Replace the names of a linear form by their value in constants, a name which is the text of a sub-expression (W*H, $clog2(N), ...)
+# is evaluated again with the constants
+def substitute_constants(terms, constants) :
+    substituted = {'' : terms.get('', 0)}
+    for name, coefficient in terms.items() :
+        if name :
+            value = parse_expression(name, constants)
+            substituted = add_terms(substituted, value if value is not None else {name : 1}, coefficient)
+    return substituted
+
+# An expression is evaluated to a linear form {name : coefficient, '' : constant}, where a name is an identifier or the text of a
+# sub-expression which is not linear (W*H, $clog2(N), ...)
+def is_constant(terms) :
+    return all(name == '' or coefficient == 0 for name, coefficient in terms.items())
+
+def add_terms(left, right, sign) :
+    terms = dict(left)
+    for name, coefficient in right.items() :
+        terms[name] = terms.get(name, 0) + sign * coefficient
+    return terms
+
+def scale_terms(terms, factor) :
+    return {name : coefficient * factor for name, coefficient in terms.items()}
+
+# Integer division rounded toward zero, as in Verilog and VHDL
+def divide(dividend, divisor) :
+    quotient = abs(dividend) // abs(divisor)
+    return quotient if (dividend < 0) == (divisor < 0) else -quotient
+
+# Return the expression as a string : the names in their first order with their coefficient (W*2), then the constant
+def format_terms(terms) :
+    text = ''
+    for name, coefficient in terms.items() :
+        if name == '' or coefficient == 0 :
+            continue
+        term = name if abs(coefficient) == 1 else f"{name}*{abs(coefficient)}"
+        text += ('-' if coefficient < 0 else ('+' if text else '')) + term
+    constant = terms.get('', 0)
+    if constant or not text :
+        text += f"{constant:+d}" if text else str(constant)
+    return text
+
+# Return the tokens of an expression : [[kind,text],...] (kind : 'number', 'name' or 'operator'), None if the expression has another character
+def tokenize(expression) :
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression) :
+        match = token_pattern.match(expression, position)
+        if not match :
+            return None
+        kind = 'number' if match.group(1) else ('name' if match.group(2) else 'operator')
+        tokens.append([kind, match.group(1) or match.group(2) or match.group(3)])
+        position = match.end()
+    return tokens
+
+def literal_value(text) :
+    match = based_literal_pattern.match(text)
+    if match :
+        return int(match.group(2).replace('_', ''), literal_bases[match.group(1).lower()])
+    return int(text.replace('_', ''))
+
+# Return ceil(log2(value)) as $clog2 (0 for 0 and 1)
+def clog2(value) :
+    return max(value - 1, 0).bit_length()
+
+# Return the linear form of an expression (see is_constant), None if it can not be parsed
+# The names found in constants ({name : value}, the names in lower case) are replaced by their value
+def parse_expression(expression, constants=None) :
+    tokens = tokenize(expression)
+    if not tokens :
+        return None
+    parser = ExpressionParser(tokens, constants)
+    try :
+        terms, text = parser.sum()
+    except (ValueError, IndexError, ZeroDivisionError) :
+        return None
+    return terms if parser.position == len(tokens) else None
+
+# Recursive descent parser of the bound expressions, each rule returns [terms,text] (text : the expression without white spaces,
+# used as the name of a sub-expression which is not linear)
+class ExpressionParser :
+    def __init__(self, tokens, constants=None) :
+        self.tokens = tokens
+        self.constants = constants
+        self.position = 0
+
+    def peek(self) :
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def take(self, expected=None) :
+        kind, text = self.tokens[self.position]
+        if expected is not None and text != expected :
+            raise ValueError(expected)
+        self.position += 1
+        return kind, text
+
+    def sum(self) :
+        terms, text = self.product()
+        while self.peek() in ('+', '-') :
+            operator = self.take()[1]
+            right_terms, right_text = self.product()
+            terms = add_terms(terms, right_terms, 1 if operator == '+' else -1)
+            text = text + operator + right_text
+        return terms, text
+
+    def product(self) :
+        terms, text = self.unary()
+        while self.peek() in ('*', '/', '%') :
+            operator = self.take()[1]
+            right_terms, right_text = self.unary()
+            text = text + operator + right_text
+            if operator in ('/', '%') and is_constant(right_terms) and not right_terms.get('', 0) :
+                raise ZeroDivisionError(text)
+            if operator == '*' and is_constant(right_terms) :
+                terms = scale_terms(terms, right_terms.get('', 0))
+            elif operator == '*' and is_constant(terms) :
+                terms = scale_terms(right_terms, terms.get('', 0))
+            elif operator == '/' and is_constant(right_terms) and right_terms.get('', 0) and all(coefficient % right_terms[''] == 0 for name, coefficient in terms.items() if name) :
+                terms = {name : divide(coefficient, right_terms['']) for name, coefficient in terms.items()}
+            elif operator == '%' and is_constant(terms) and is_constant(right_terms) :
+                dividend, divisor = terms.get('', 0), right_terms.get('', 0)
+                terms = {'' : dividend - divisor * divide(dividend, divisor)}
+            else :
+                terms = {text : 1}
+        return terms, text
+
+    def unary(self) :
+        if self.peek() in ('+', '-') :
+            operator = self.take()[1]
+            terms, text = self.unary()
+            return (terms if operator == '+' else scale_terms(terms, -1)), operator + text
+        return self.power()
+
+    def power(self) :
+        terms, text = self.primary()
+        if self.peek() == '**' :
+            self.take()
+            exponent_terms, exponent_text = self.unary()
+            text = text + '**' + exponent_text
+            if is_constant(terms) and is_constant(exponent_terms) and exponent_terms.get('', 0) >= 0 :
+                terms = {'' : terms.get('', 0) ** exponent_terms.get('', 0)}
+            else :
+                terms = {text : 1}
+        return terms, text
+
+    def primary(self) :
+        kind, text = self.take()
+        if kind == 'number' :
+            return {'' : literal_value(text)}, text
+        if kind == 'name' :
+            if self.peek() == '(' : # Function call, it is kept as a name : $clog2(N), unless it is $clog2 of a constant
+                self.take()
+                arguments = []
+                while self.peek() != ')' :
+                    arguments.append(self.sum())
+                    if self.peek() == ',' :
+                        self.take()
+                self.take(')')
+                function_name = text
+                text = f"{text}({','.join(argument_text for argument_terms, argument_text in arguments)})"
+                if function_name == '$clog2' and len(arguments) == 1 and is_constant(arguments[0][0]) :
+                    return {'' : clog2(arguments[0][0].get('', 0))}, text
+            elif self.constants and text.lower() in self.constants :
+                return {'' : self.constants[text.lower()]}, text
+            return {text : 1}, text
+        if text == '(' :
+            terms, inner_text = self.sum()
+            self.take(')')
+            return terms, f"({inner_text})"
+        raise ValueError(text)
@@ -0,0 +1,257 @@
+import contextlib
+import csv
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import sdf_cache
+import sdf_columnar
+import gen_sdf_from_verilog
+import gen_sdf_from_vhdl
+
+# Checks of the run modes of the generators against the serial run : python -m unittest test_sdf_generators
+# Each mode must write the same rows as a serial run without cache on a small project written to a temporary directory
+verilog_files = {
+    os.path.join("rtl", "top.v") : """// top level
+module top #(parameter WIDTH = 8) (
+  input clk,
+  input [WIDTH-1:0] din,
+  output [WIDTH-1:0] dout
+);
+  wire [WIDTH-1:0] stage;
+  sub #(.W(WIDTH)) u_sub (.clk(clk), .a(din), .y(stage));
+  sub u_pos (clk, stage, dout);
+`ifdef USE_DBG
+  dbg u_dbg (.probe(stage));
+`endif
+endmodule
+""",
+    os.path.join("rtl", "sub", "sub.v") : """module sub #(parameter W = 4) (
+  input clk,
+  input [W-1:0] a,
+  output reg [W-1:0] y
+);
+  reg [W*2-1:0] acc;
+  always @(posedge clk) y <= a;
+endmodule
+""",
+    os.path.join("rtl", "sub", "dbg.v") : """module dbg (
+  input [7:0] probe
+);
+endmodule
+""",
+    os.path.join("rtl", "empty.v") : "// no module in this file\n",
+    os.path.join("sim", "tb.v") : "module tb;\n  top u_top ();\nendmodule\n",
+}
+vhdl_files = {
+    os.path.join("rtl", "pkg", "my_pkg.vhd") : """library ieee;
+use ieee.std_logic_1164.all;
+package my_pkg is
+  component adder is
+    generic (N : integer := 8);
+    port (
+      a, b : in std_logic_vector(N-1 downto 0);
+      s    : out std_logic_vector(N downto 0)
+    );
+  end component;
+end package;
+""",
+    os.path.join("rtl", "reg8.vhd") : """library ieee;
+use ieee.std_logic_1164.all;
+entity reg8 is
+  port (
+    d   : in std_logic_vector(7 downto 0);
+    q   : out std_logic_vector(d'range);
+    clk : in std_logic
+  );
+end reg8;
+architecture rtl of reg8 is
+begin
+end rtl;
+""",
+    os.path.join("rtl", "top.vhd") : """library ieee;
+use ieee.std_logic_1164.all;
+library work;
+use work.my_pkg.all;
+entity top is
+  generic (W : integer := 8);
+  port (
+    clk  : in std_logic;
+    din  : in std_logic_vector(7 downto 0);
+    dout : out std_logic_vector(W-1 downto 0)
+  );
+end top;
+architecture rtl of top is
+  component reg8
+    port (
+      d   : in std_logic_vector(7 downto 0);
+      q   : out std_logic_vector(7 downto 0);
+      clk : in std_logic
+    );
+  end component;
+  signal s1, s2 : std_logic_vector(7 downto 0);
+  signal sum : std_logic_vector(8 downto 0);
+begin
+  u_reg : reg8 port map (d => din, q => s1, clk => clk);
+  u_add : adder generic map (N => 8) port map (a => s1, b => s2, s => sum);
+  u_pos : reg8 port map (s2, s1, clk);
+end rtl;
+""",
+}
+define_list = ["USE_DBG"]
+excluded_directories = ["sim"]
+
+def write_files(directory, files) :
+    for file_path, code in files.items() :
+        os.makedirs(os.path.dirname(os.path.join(directory, file_path)), exist_ok=True)
+        with open(os.path.join(directory, file_path), "w") as file :
+            file.write(code)
+
+# Return the signal rows of a sdf.csv file, without the file_name(...) and header rows
+def csv_rows(output_path) :
+    with open(output_path, newline='') as file :
+        return [row for row in csv.reader(file, delimiter=';') if not row[0].startswith("file_name(") and row[0] != "component"]
+
+def read_bytes(output_path) :
+    with open(output_path, "rb") as file :
+        return file.read()
+
+class GeneratorTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.directory = tempfile.mkdtemp()
+        self.project = os.path.join(self.directory, "project")
+        gen_sdf_from_verilog.warnings_set.clear()
+        gen_sdf_from_vhdl.warnings_set.clear()
+
+    def tearDown(self) :
+        shutil.rmtree(self.directory)
+
+    def output(self, name) :
+        return os.path.join(self.directory, name)
+
+    def run_verilog(self, output_path, **options) :
+        with contextlib.redirect_stdout(io.StringIO()) :
+            gen_sdf_from_verilog.process_files_in_directory(self.project, output_path, define_list, excluded_directories, [], **options)
+        return output_path
+
+    def run_vhdl(self, output_path, **options) :
+        with contextlib.redirect_stdout(io.StringIO()) :
+            gen_sdf_from_vhdl.process_files_in_directory(self.project, output_path, excluded_directories, [], **options)
+        return output_path
+
+class VerilogModesTest(GeneratorTestCase) :
+    def setUp(self) :
+        super().setUp()
+        write_files(self.project, verilog_files)
+        self.serial_path = self.run_verilog(self.output("serial.csv"))
+        self.serial_rows = csv_rows(self.serial_path)
+
+    def test_serial_run(self) :
+        self.assertIn(["top", "clk", "wire", "1", "input", "input", "u_sub,u_pos", "sub,sub"], self.serial_rows)
+        self.assertIn(["Internal", "stage", "wire [width-1:0]", "8", "u_sub", "sub", "u_pos,u_dbg", "sub,dbg"], self.serial_rows)
+        self.assertIn(["Internal", "acc", "reg [w*2-1:0]", "8", "sub", "sub", "sub", "sub"], self.serial_rows)
+        self.assertNotIn("tb", [row[0] for row in self.serial_rows])
+
+    def test_jobs(self) :
+        self.assertEqual(read_bytes(self.run_verilog(self.output("jobs.csv"), jobs=3)), read_bytes(self.serial_path))
+
+    def test_stream(self) :
+        self.assertEqual(read_bytes(self.run_verilog(self.output("stream.csv"), stream=True)), read_bytes(self.serial_path))
+
+    def test_incremental(self) :
+        output_path = self.output("incremental.csv")
+        self.assertEqual(read_bytes(self.run_verilog(output_path, incremental=True)), read_bytes(self.serial_path))
+        self.assertEqual(read_bytes(self.run_verilog(output_path, incremental=True)), read_bytes(self.serial_path))
+        # A change of the ports of sub also changes the rows of top, which is not parsed again from its own content
+        sub_path = os.path.join(self.project, "rtl", "sub", "sub.v")
+        write_files(self.project, {os.path.join("rtl", "sub", "sub.v") : verilog_files[os.path.join("rtl", "sub", "sub.v")].replace("input clk", "inout clk")})
+        file_stat = os.stat(sub_path)
+        os.utime(sub_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000))
+        self.assertEqual(read_bytes(self.run_verilog(output_path, incremental=True)), read_bytes(self.run_verilog(self.output("serial_changed.csv"))))
+
+    def test_sqlite(self) :
+        database_path = self.output("signals.db")
+        self.assertEqual(read_bytes(self.run_verilog(self.output("sqlite.csv"), database_path=database_path)), read_bytes(self.serial_path))
+        self.run_verilog(self.output("sqlite.csv"), database_path=database_path) # The rows of the previous run are replaced
+        connection = sqlite3.connect(database_path)
+        try :
+            rows = {}
+            for signal_id, component, signal_name, signal_type, size in connection.execute("SELECT signals.id, modules.name, signals.name, signals.type, signals.size FROM signals JOIN modules ON modules.id = signals.component_id ORDER BY signals.id") :
+                rows[signal_id] = [component, signal_name, signal_type, size, [], [], [], []]
+            for signal_id, direction, instance, module in connection.execute("SELECT signal_id, direction, instance, modules.name FROM endpoints LEFT JOIN modules ON modules.id = endpoints.module_id ORDER BY signal_id, direction, position") :
+                column = 4 if direction == 'src' else 6
+                if instance is not None :
+                    rows[signal_id][column].append(instance)
+                if module is not None :
+                    rows[signal_id][column+1].append(module)
+        finally :
+            connection.close()
+        self.assertEqual([row[:4] + [",".join(names) for names in row[4:]] for row in rows.values()], self.serial_rows)
+
+    def test_columnar(self) :
+        table = sdf_columnar.ColumnarTable(self.output("signals.npz")) # The table is checked in memory, the file needs numpy
+        file_list = gen_sdf_from_verilog.find_files(self.project, excluded_directories, [])
+        parse_results = gen_sdf_from_verilog.parse_files([file_path for file_name, file_path in file_list], define_list)
+        with contextlib.redirect_stdout(io.StringIO()) :
+            gen_sdf_from_verilog.write_parsed_files(file_list, parse_results, self.output("columnar.csv"), [table])
+        self.assertEqual(read_bytes(self.output("columnar.csv")), read_bytes(self.serial_path))
+        dictionaries = {column : table.dictionary_values(column) for column in sdf_columnar.string_columns}
+        rows = []
+        for row_index in range(table.row_count) :
+            row = [dictionaries[column][table.codes[column][row_index]] for column in sdf_columnar.string_columns[1:]]
+            for column in sdf_columnar.list_columns :
+                name_codes = table.values[column][table.offsets[column][row_index]:table.offsets[column][row_index+1]]
+                row.append(",".join(table.names[code] for code in name_codes))
+            rows.append(row)
+        self.assertEqual(rows, self.serial_rows)
+
+    def test_corrupt_cache_entries(self) :
+        cache_directory = self.output("cache")
+        self.assertEqual(read_bytes(self.run_verilog(self.output("cold.csv"), cache_directory=cache_directory)), read_bytes(self.serial_path))
+        entries = [os.path.join(cache_directory, entry) for entry in os.listdir(cache_directory)]
+        self.assertTrue(entries)
+        for entry_index, entry_path in enumerate(entries) :
+            with open(entry_path, "wb") as file :
+                file.write([b"", b"not a pickle", b"\x80\x05\x95"][entry_index % 3])
+        self.assertEqual(read_bytes(self.run_verilog(self.output("corrupt.csv"), cache_directory=cache_directory)), read_bytes(self.serial_path))
+        # The corrupt entries are treated as misses : they are removed and stored again by the run
+        for entry_path in entries :
+            self.assertIsNotNone(sdf_cache.load(cache_directory, os.path.basename(entry_path)[:-len(sdf_cache.cache_extension)]))
+
+class VhdlModesTest(GeneratorTestCase) :
+    def setUp(self) :
+        super().setUp()
+        write_files(self.project, vhdl_files)
+        self.serial_path = self.run_vhdl(self.output("serial.csv"))
+
+    def test_serial_run(self) :
+        rows = csv_rows(self.serial_path)
+        self.assertIn(["reg8", "q", "std_logic_vector(d'range)", "8", "reg8", "reg8", "output", "output"], rows)
+        self.assertIn(["Internal", "sum", "std_logic_vector(8 downto 0)", "9", "u_add", "adder", "top", "top"], rows)
+
+    def test_jobs(self) :
+        self.assertEqual(read_bytes(self.run_vhdl(self.output("jobs.csv"), jobs=3)), read_bytes(self.serial_path))
+
+    def test_incremental(self) :
+        output_path = self.output("incremental.csv")
+        self.assertEqual(read_bytes(self.run_vhdl(output_path, incremental=True)), read_bytes(self.serial_path))
+        self.assertEqual(read_bytes(self.run_vhdl(output_path, incremental=True)), read_bytes(self.serial_path))
+        # A change of a package changes the rows of the files using it
+        package_path = os.path.join(self.project, "rtl", "pkg", "my_pkg.vhd")
+        write_files(self.project, {os.path.join("rtl", "pkg", "my_pkg.vhd") : vhdl_files[os.path.join("rtl", "pkg", "my_pkg.vhd")].replace("s    : out", "s    : inout")})
+        file_stat = os.stat(package_path)
+        os.utime(package_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000))
+        self.assertEqual(read_bytes(self.run_vhdl(output_path, incremental=True)), read_bytes(self.run_vhdl(self.output("serial_changed.csv"))))
+
+    def test_corrupt_cache_entries(self) :
+        cache_directory = self.output("cache")
+        self.run_vhdl(self.output("cold.csv"), cache_directory=cache_directory)
+        for entry in os.listdir(cache_directory) :
+            with open(os.path.join(cache_directory, entry), "wb") as file :
+                file.write(b"not a pickle")
+        self.assertEqual(read_bytes(self.run_vhdl(self.output("corrupt.csv"), cache_directory=cache_directory)), read_bytes(self.serial_path))
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sdf_width
+
+# Checks of the width evaluator (see sdf_width) : python -m unittest test_sdf_width
+class ParseExpressionTest(unittest.TestCase) :
+    def test_constant_expressions(self) :
+        self.assertEqual(sdf_width.parse_expression("2*8-1"), {'' : 15})
+        self.assertEqual(sdf_width.parse_expression("(3+1)**2 % 5"), {'' : 1})
+        self.assertEqual(sdf_width.parse_expression("-7/2"), {'' : -3})
+        self.assertEqual(sdf_width.parse_expression("8'hFF"), {'' : 255})
+        self.assertEqual(sdf_width.parse_expression("$clog2(17)"), {'' : 5})
+
+    def test_symbolic_expressions(self) :
+        self.assertEqual(sdf_width.parse_expression("W-1"), {'W' : 1, '' : -1})
+        self.assertEqual(sdf_width.parse_expression("(W*2)-1"), {'W' : 2, '' : -1})
+        self.assertEqual(sdf_width.parse_expression("W*H"), {'W*H' : 1})
+        self.assertEqual(sdf_width.parse_expression("$clog2(N)"), {'$clog2(N)' : 1})
+
+    def test_constants(self) :
+        self.assertEqual(sdf_width.parse_expression("W*H-1", {'w' : 4}), {'H' : 4, '' : -1})
+        self.assertEqual(sdf_width.parse_expression("$clog2(D)", {'d' : 8}), {'' : 3})
+
+    def test_invalid_expressions(self) :
+        self.assertIsNone(sdf_width.parse_expression(""))
+        self.assertIsNone(sdf_width.parse_expression("W-"))
+        self.assertIsNone(sdf_width.parse_expression("(W-1"))
+        self.assertIsNone(sdf_width.parse_expression("W << 1"))
+        self.assertIsNone(sdf_width.parse_expression("8/0"))
+
+class SignalWidthTest(unittest.TestCase) :
+    def test_scalar_types(self) :
+        self.assertEqual(sdf_width.signal_width("wire"), '1')
+        self.assertEqual(sdf_width.signal_width("reg signed"), '1')
+        self.assertEqual(sdf_width.signal_width("integer"), '32')
+        self.assertEqual(sdf_width.signal_width("std_logic"), '1')
+        self.assertEqual(sdf_width.signal_width("my_record_t"), 'unknown')
+
+    def test_verilog_ranges(self) :
+        self.assertEqual(sdf_width.signal_width("wire [7:0]"), '8')
+        self.assertEqual(sdf_width.signal_width("wire [0:7]"), '8')
+        self.assertEqual(sdf_width.signal_width("wire [W-1:0]"), 'W')
+        self.assertEqual(sdf_width.signal_width("wire [0:W-1]"), 'W')
+        self.assertEqual(sdf_width.signal_width("reg [(w*2)-1:0]"), 'w*2')
+        self.assertEqual(sdf_width.signal_width("wire [N:0]"), 'N+1')
+        self.assertEqual(sdf_width.signal_width("wire [2*8-1:0]"), '16')
+        self.assertEqual(sdf_width.signal_width("wire [W-1:B]"), 'W-B')
+
+    def test_vhdl_ranges(self) :
+        self.assertEqual(sdf_width.signal_width("std_logic_vector(7 downto 0)"), '8')
+        self.assertEqual(sdf_width.signal_width("std_logic_vector(0 to 7)"), '8')
+        self.assertEqual(sdf_width.signal_width("unsigned(N downto 0)"), 'N+1')
+        self.assertEqual(sdf_width.signal_width("std_logic_vector(0 to W-1)"), 'W')
+        self.assertEqual(sdf_width.signal_width("unsigned(din'range)"), 'din size')
+
+    def test_constants(self) :
+        self.assertEqual(sdf_width.signal_width("wire [W-1:0]", {'w' : 8}), '8')
+        self.assertEqual(sdf_width.signal_width("wire [0:W-1]", {'w' : 8}), '8')
+        self.assertEqual(sdf_width.signal_width("wire [W*D-1:0]", {'w' : 8}), 'D*8')
+        self.assertEqual(sdf_width.signal_width("std_logic_vector(DEPTH-1 downto 0)", {'depth' : 16}), '16')
+        self.assertEqual(sdf_width.signal_width("wire [$clog2(D)-1:0]", {'d' : 17}), '5')
+        # The memoized symbolic size is not changed by the constants of a previous call
+        self.assertEqual(sdf_width.signal_width("wire [W-1:0]"), 'W')
+
+if __name__ == "__main__" :
+    unittest.main()